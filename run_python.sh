@@ -30,7 +30,7 @@ start_proc() {
       ARGS="--api_web --dst=api_web_output"
       ;;
     rest_api)
-      PY_SRC=${ROOT_PATH}/Python/api_rest_service/api_rest_server.py
+      PY_SRC=${ROOT_PATH}/src/servidor_bingo.py
       #LIB_PATH=$(search_library libcrypto.so.3)
       ARGS="-p 4065"
       ;;
@@ -61,7 +61,7 @@ stop_proc() {
       ARGS=api_web
       ;;
     rest_api)
-      ARGS=api_rest_server
+      ARGS=servidor_bingo
       EXCLUDE=api_web
       ;;
     web)
@@ -93,7 +93,7 @@ get_pidof() {
       ARGS=api_web
       ;;
     rest_api)
-      ARGS=api_rest_server
+      ARGS=servidor_bingo
       EXCLUDE=api_web
       ;;
     web)
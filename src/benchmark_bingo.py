@@ -0,0 +1,156 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# Banco de pruebas de rendimiento: generación, dibujo de cartones, hojas JPG y
+# armado del PDF a distintas escalas. Cada escala corre en un proceso nuevo para
+# que el pico de memoria (RSS) medido sea solo el suyo. Los resultados se guardan
+# en JSON para comparar corridas.
+#
+# El dibujo y el PDF no dependen del total de cartones, así que se miden sobre a
+# lo más `max_hojas` hojas de cada escala; la generación se mide completa.
+
+ESCALAS = (180, 10_000, 100_000)
+CARTONES_POR_HOJA = 6
+
+def _rss_pico_mb():
+    # En Linux ru_maxrss viene en KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _por_segundo(cantidad, segundos):
+    return cantidad / segundos if segundos > 0 else None
+
+def medir_escala(cantidad, max_hojas=30, semilla=0):
+    """Corre todas las mediciones para `cantidad` cartones y devuelve un dict con los resultados."""
+    import numpy as np
+
+    import carton_bingo
+    from carton_bingo import calc_sizes, configuracion_actual, dibujar_carton, generar_carton_bingo, generar_hoja_bingo_jpg
+    from cartones_unicos import generar_cartones_unicos
+    from consolida_pdf import codificar_jpeg, imagenes_a_pdf, letter, pngs_a_pdf_carta
+    from generar_numeros_carton import generar_cartones_lote
+
+    resultado = {'cartones': cantidad}
+    silencio = io.StringIO()
+
+    # --- Generación ---
+    individuales = min(cantidad, 10_000)
+    inicio = time.perf_counter()
+    for _ in range(individuales):
+        generar_carton_bingo()
+    segundos = time.perf_counter() - inicio
+    resultado['generar_carton_bingo'] = {'cartones': individuales, 'segundos': segundos,
+                                         'cartones_por_segundo': _por_segundo(individuales, segundos)}
+
+    rng = np.random.default_rng(semilla)
+    inicio = time.perf_counter()
+    generar_cartones_lote(cantidad, rng)
+    segundos = time.perf_counter() - inicio
+    resultado['generar_cartones_lote'] = {'segundos': segundos, 'cartones_por_segundo': _por_segundo(cantidad, segundos)}
+
+    inicio = time.perf_counter()
+    cartones = generar_cartones_unicos(cantidad, rng=rng)
+    segundos = time.perf_counter() - inicio
+    resultado['generar_cartones_unicos'] = {'segundos': segundos, 'cartones_por_segundo': _por_segundo(cantidad, segundos)}
+
+    # --- Dibujo ---
+    cols, rows = calc_sizes(CARTONES_POR_HOJA, 'letter')
+    config = configuracion_actual(cols, rows)
+    hojas = min(max_hojas, cantidad // CARTONES_POR_HOJA)
+    muestra = cartones[:hojas * CARTONES_POR_HOJA]
+
+    inicio = time.perf_counter()
+    dibujar_carton(muestra[0], config=config)
+    resultado['dibujar_carton_primero_ms'] = (time.perf_counter() - inicio) * 1000
+    inicio = time.perf_counter()
+    for i, carton in enumerate(muestra):
+        dibujar_carton(carton, num_juego=1, serie='A', card_id=i + 1, config=config)
+    segundos = time.perf_counter() - inicio
+    resultado['dibujar_carton'] = {'cartones': len(muestra), 'ms_por_carton': segundos * 1000 / max(1, len(muestra))}
+
+    # --- Hojas JPG y PDF ---
+    with tempfile.TemporaryDirectory() as directorio:
+        os.makedirs(os.path.join(directorio, 'output'))
+        anterior = os.getcwd()
+        os.chdir(directorio)
+        try:
+            archivos = []
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(silencio):
+                for num_hoja in range(1, hojas + 1):
+                    cartones_hoja = muestra[(num_hoja - 1) * CARTONES_POR_HOJA:num_hoja * CARTONES_POR_HOJA]
+                    archivos.append(generar_hoja_bingo_jpg(len(cartones_hoja), num_hoja=num_hoja, num_juego=1,
+                                                           config=config, cartones=cartones_hoja))
+            segundos = time.perf_counter() - inicio
+            resultado['generar_hoja_bingo_jpg'] = {'hojas': hojas, 'ms_por_hoja': segundos * 1000 / max(1, hojas),
+                                                   'ms_por_carton': segundos * 1000 / max(1, len(muestra))}
+
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(silencio):
+                pngs_a_pdf_carta(archivos, 'desde_archivos.pdf', letter)
+            segundos = time.perf_counter() - inicio
+            resultado['pngs_a_pdf_carta'] = {'paginas': hojas, 'segundos': segundos,
+                                             'paginas_por_segundo': _por_segundo(hojas, segundos),
+                                             'bytes': os.path.getsize('desde_archivos.pdf')}
+
+            inicio = time.perf_counter()
+            jpegs = [codificar_jpeg(carton_bingo.componer_hoja(muestra[h * CARTONES_POR_HOJA:(h + 1) * CARTONES_POR_HOJA],
+                                                               config, 'A', h + 1, 1)[0])
+                     for h in range(hojas)]
+            with contextlib.redirect_stdout(silencio):
+                imagenes_a_pdf(jpegs, 'en_memoria.pdf', letter)
+            segundos = time.perf_counter() - inicio
+            resultado['imagenes_a_pdf'] = {'paginas': hojas, 'segundos': segundos,
+                                           'paginas_por_segundo': _por_segundo(hojas, segundos),
+                                           'bytes': os.path.getsize('en_memoria.pdf')}
+        finally:
+            os.chdir(anterior)
+
+    resultado['rss_pico_mb'] = _rss_pico_mb()
+    resultado['fuentes'] = {nombre: getattr(getattr(carton_bingo, nombre), 'path', None)
+                            for nombre in ('FONT_HEADER', 'FONT_NUMBERS', 'FONT_SERIAL')}
+    return resultado
+
+def correr_benchmark(escalas=ESCALAS, max_hojas=30, semilla=0):
+    """Mide cada escala en un proceso propio y devuelve el informe completo."""
+    resultados = []
+    for cantidad in escalas:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            resultados.append(executor.submit(medir_escala, cantidad, max_hojas, semilla).result())
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'max_hojas': max_hojas,
+        'resultados': resultados,
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mide el rendimiento de la generación de cartones y PDF.')
+    parser.add_argument('--escalas', type=int, nargs='+', default=list(ESCALAS), help='Cantidades de cartones a medir')
+    parser.add_argument('--max-hojas', type=int, default=30, help='Hojas a dibujar por escala')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', default='benchmark_bingo.json', help='Archivo JSON de resultados')
+    args = parser.parse_args()
+
+    informe = correr_benchmark(args.escalas, args.max_hojas, args.semilla)
+    with open(args.salida, 'w') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+
+    for r in informe['resultados']:
+        print(f"{r['cartones']:>8} cartones | lote {r['generar_cartones_lote']['cartones_por_segundo']:,.0f} cartones/s"
+              f" | únicos {r['generar_cartones_unicos']['cartones_por_segundo']:,.0f} cartones/s"
+              f" | dibujo {r['dibujar_carton']['ms_por_carton']:.2f} ms/cartón"
+              f" | hoja {r['generar_hoja_bingo_jpg']['ms_por_hoja']:.1f} ms"
+              f" | PDF {r['pngs_a_pdf_carta']['paginas_por_segundo'] or 0:.1f} pág/s, {r['pngs_a_pdf_carta']['bytes']:,} bytes"
+              f" | RSS {r['rss_pico_mb']:.0f} MB")
+    print(f"\nResultados guardados en {args.salida}")
@@ -1,10 +1,12 @@
-import random
-import pandas as pd
 from PIL import Image, ImageDraw, ImageFont, ImageColor
 import logging
+import os
 import string
+from dataclasses import dataclass
+from functools import lru_cache
 
-from consolida_pdf import pngs_a_pdf_carta, letter, legal, OFICIO
+from generar_numeros_carton import derivar_cartones, generar_cartones_lote
+from instrumentacion import contar, etapa
 
 
 # --- 1. Configuración de los cartones y la página ---
@@ -36,34 +38,37 @@ PAGE_HEIGHT_PX = mm_a_pixeles(PAGE_HEIGHT_MM)
 
 PAGE_SIZE = 'letter'
 
-def set_paper_size_letter(paper_size : str = 'letter'):
-    global PAGE_HEIGHT_MM, PAGE_HEIGHT_PX, PAGE_WIDTH_MM, PAGE_WIDTH_PX
+def _fijar_papel(papel):
+    global PAGE_HEIGHT_MM, PAGE_HEIGHT_PX, PAGE_WIDTH_MM, PAGE_WIDTH_PX, PAGE_SIZE
+    from plan_hojas import PAPELES
 
-    PAGE_WIDTH_MM = 216
-    PAGE_HEIGHT_MM = 279
+    PAGE_SIZE = papel
+    (PAGE_WIDTH_MM, PAGE_HEIGHT_MM), _ = PAPELES[papel]
 
     PAGE_WIDTH_PX = mm_a_pixeles(PAGE_WIDTH_MM)
     PAGE_HEIGHT_PX = mm_a_pixeles(PAGE_HEIGHT_MM)
 
-def set_paper_size_office(paper_size : str = 'letter'):
-    global PAGE_HEIGHT_MM, PAGE_HEIGHT_PX, PAGE_WIDTH_MM, PAGE_WIDTH_PX
+def set_paper_size_letter(paper_size : str = 'letter'):
+    _fijar_papel('letter')
 
-    PAGE_WIDTH_MM = 216
-    PAGE_HEIGHT_MM = 3300
+def set_paper_size_legal(paper_size : str = 'legal'):
+    _fijar_papel('legal')
 
-    PAGE_WIDTH_PX = mm_a_pixeles(PAGE_WIDTH_MM)
-    PAGE_HEIGHT_PX = mm_a_pixeles(PAGE_HEIGHT_MM)
+def set_paper_size_office(paper_size : str = 'oficio'):
+    _fijar_papel('oficio')  # 216 x 330 mm
 
 set_paper_size_map = {
     'letter': set_paper_size_letter,
+    'legal': set_paper_size_legal,
+    'oficio': set_paper_size_office,
     'office': set_paper_size_office,
 }
 
 def set_paper_size(paper_size : str = 'letter'):
     if paper_size in set_paper_size_map:
-        set_paper_size_map[paper_size]
+        set_paper_size_map[paper_size]()
     else:
-        PAGE_SIZE = 'letter'
+        set_paper_size_letter()
         logging.info(f"Paper size '{paper_size}' not found. Using by default '{PAGE_SIZE}'")
 
 # Configuración del tamaño de cada cartón (ajustable)
@@ -75,6 +80,47 @@ PAGE_MARGIN_PX = mm_a_pixeles(8) # 10mm de margen en la página
 CARD_SPACING_PX = mm_a_pixeles(6)  # 5mm de espacio entre cartones
 CARD_SPACING_HEIGHT_PX = mm_a_pixeles(7)
 
+@dataclass(frozen=True)
+class ConfiguracionRender:
+    """
+    Parámetros explícitos (y serializables) para dibujar cartones y hojas.
+    Permite renderizar en otros procesos sin depender de las variables globales.
+    """
+    page_width_mm: int
+    page_height_mm: int
+    page_width_px: int
+    page_height_px: int
+    page_margin_px: int
+    card_width_px: int
+    card_height_px: int
+    card_spacing_px: int
+    card_spacing_height_px: int
+    cols: int
+    rows: int
+    border_color: str = 'red'
+    dpi: int = DPI
+    paleta: bool = False  # dibujar en modo 'P' (ver "Modo paleta")
+    codigo: bool = False  # código de reclamo QR en la celda libre (ver codigo_reclamo)
+
+def configuracion_actual(cols=0, rows=0, border_color=None, paleta=False, codigo=False):
+    """Crea una ConfiguracionRender con los valores globales actuales."""
+    return ConfiguracionRender(
+        page_width_mm=PAGE_WIDTH_MM,
+        page_height_mm=PAGE_HEIGHT_MM,
+        page_width_px=PAGE_WIDTH_PX,
+        page_height_px=PAGE_HEIGHT_PX,
+        page_margin_px=PAGE_MARGIN_PX,
+        card_width_px=CARD_WIDTH_PX,
+        card_height_px=CARD_HEIGHT_PX,
+        card_spacing_px=CARD_SPACING_PX,
+        card_spacing_height_px=CARD_SPACING_HEIGHT_PX,
+        cols=cols,
+        rows=rows,
+        border_color=BORDER_COLOR if border_color is None else border_color,
+        paleta=paleta,
+        codigo=codigo,
+    )
+
 # Colores y fuentes
 COLORS_ARRAY = [
     'red',
@@ -109,107 +155,244 @@ FREE_SPACE_TEXT_COLOR = "white" # Cambiado a blanco para mejor contraste en fond
 #    'blue': 'white',
 #}
 
+# Letra de serie de cada juego, en el mismo orden que COLORS_ARRAY
+#                0,   1,   2,   3,   4,   5,   6,   7,   8,   9,   10,  11,  12
+SERIES_JUEGOS = ['L', 'T', 'U', 'A', 'M', 'N', 'O', 'C', 'H', 'X', 'Z', 'E', 'I']
+SERIES_JUEGOS.append('Ɔ')  #13
+SERIES_JUEGOS.append('W')  #14
+SERIES_JUEGOS.append('F')  #15
+
 pen_colour_map = {color: 'white' for color in COLORS_ARRAY}
 for color in ['yellow', 'lime']:
     pen_colour_map[color] = 'black'
 
-# Intentamos cargar una fuente TrueType; si no está disponible, usamos la predeterminada de Pillow
-try:
-    #const fontPath = path.join(__dirname, '../assets/fonts/PottiSreeramulu.ttf');
-    #FONT_PATH = "arial.ttf" # Ruta a una fuente .ttf disponible en tu sistema
-    #FONT_PATH = "/usr/share/code/resources/app/node_modules/katex/dist/fonts/KaTeX_Caligraphic-Regular.ttf"
-    #FONT_PATH = "/usr/share/fonts/truetype/teluguvijayam/PottiSreeramulu.ttf"
-    FONT_PATH = "../assets/fonts/PottiSreeramulu.ttf"
-    SIGN_FONT_PATH = "/usr/share/code/resources/app/node_modules/katex/dist/fonts/KaTeX_SansSerif-Regular.ttf"
-    NUMBER_FONT_PATH = "/usr/share/code/resources/app/node_modules/katex/dist/fonts/KaTeX_SansSerif-Regular.ttf"
-
-    FONT_SIGN = ImageFont.truetype(SIGN_FONT_PATH, size=32) # Tamaño para CPA
-    FONT_SERIAL = ImageFont.truetype(SIGN_FONT_PATH, size=48) # Tamaño para Num Serie
-    FONT_HEADER = ImageFont.truetype(FONT_PATH, size=mm_a_pixeles(12)) # Tamaño para B-I-N-G-O
-    FONT_NUMBERS = ImageFont.truetype(NUMBER_FONT_PATH, size=mm_a_pixeles(10)) # Tamaño para números
-    FONT_FREE = ImageFont.truetype(FONT_PATH, size=mm_a_pixeles(8)) # Tamaño para 'Libre'
-except IOError:
-    print("Advertencia: No se encontró 'arial.ttf'. Usando la fuente predeterminada de Pillow.")
-    FONT_HEADER = ImageFont.load_default()
-    FONT_NUMBERS = ImageFont.load_default()
-    FONT_FREE = ImageFont.load_default()
-
-# Ajuste de tamaño de fuente si se usa la predeterminada
-if FONT_HEADER == ImageFont.load_default():
-    FONT_HEADER = ImageFont.load_default(size=40)
-    FONT_NUMBERS = ImageFont.load_default(size=60)
-    FONT_FREE = ImageFont.load_default(size=40)
+# Recursos del repositorio, resueltos desde este archivo y no desde el directorio de trabajo
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets')
+BUNDLED_FONT_PATH = os.path.join(ASSETS_DIR, 'fonts', 'PottiSreeramulu.ttf')
+
+#const fontPath = path.join(__dirname, '../assets/fonts/PottiSreeramulu.ttf');
+#FONT_PATH = "arial.ttf" # Ruta a una fuente .ttf disponible en tu sistema
+#FONT_PATH = "/usr/share/code/resources/app/node_modules/katex/dist/fonts/KaTeX_Caligraphic-Regular.ttf"
+#FONT_PATH = "/usr/share/fonts/truetype/teluguvijayam/PottiSreeramulu.ttf"
+FONT_PATH = BUNDLED_FONT_PATH
+SIGN_FONT_PATH = "/usr/share/code/resources/app/node_modules/katex/dist/fonts/KaTeX_SansSerif-Regular.ttf"
+NUMBER_FONT_PATH = "/usr/share/code/resources/app/node_modules/katex/dist/fonts/KaTeX_SansSerif-Regular.ttf"
+
+# Registro de fuentes: cada una se abre en su primer uso, no al importar el módulo,
+# así los procesos del pool y los comandos cortos (verificar, reimprimir) no pagan
+# por fuentes que no dibujan. carton_bingo.FONT_HEADER y las demás siguen
+# disponibles como atributos del módulo (ver __getattr__ al final del archivo).
+FUENTES = {
+    'FONT_SIGN': (SIGN_FONT_PATH, 32),                  # Tamaño para CPA
+    'FONT_SERIAL': (SIGN_FONT_PATH, 48),                # Tamaño para Num Serie
+    'FONT_HEADER': (FONT_PATH, mm_a_pixeles(12)),       # Tamaño para B-I-N-G-O
+    'FONT_NUMBERS': (NUMBER_FONT_PATH, mm_a_pixeles(10)),  # Tamaño para números
+    'FONT_FREE': (FONT_PATH, mm_a_pixeles(8)),          # Tamaño para 'Libre'
+}
+
+@lru_cache(maxsize=None)
+def cargar_fuente(ruta, tamano):
+    """
+    Abre la fuente TrueType `ruta` en `tamano` una sola vez por proceso.
+    Si no existe usa la fuente incluida en assets/fonts, y si tampoco, la
+    predeterminada de Pillow en el mismo tamaño.
+    """
+    for candidata in dict.fromkeys((ruta, BUNDLED_FONT_PATH)):
+        try:
+            return ImageFont.truetype(candidata, size=tamano)
+        except OSError:
+            continue
+    print(f"Advertencia: No se encontró '{ruta}'. Usando la fuente predeterminada de Pillow.")
+    return ImageFont.load_default(size=tamano)
+
+def fuente(nombre):
+    """Fuente registrada en FUENTES con ese nombre ('FONT_HEADER', 'FONT_NUMBERS', ...)."""
+    return cargar_fuente(*FUENTES[nombre])
 
 
 # --- 2. Funciones de generación de datos de cartones ---
 
 def generar_carton_bingo():
-    """Genera un cartón de Bingo de 5x5 con 'Libre' en el centro."""
-    carton = {}
-    
-    for columna_letra, (min_val, max_val) in RANGOS_BINGO.items():
-        cantidad_numeros = 5
-        if columna_letra == 'N':
-            cantidad_numeros = 4
-            
-        numeros = random.sample(range(min_val, max_val + 1), k=cantidad_numeros)
-        carton[columna_letra] = numeros
-    
-    carton['N'].insert(2, 'Libre')
-    df_carton = pd.DataFrame(carton)
-    return df_carton
+    """
+    Genera un cartón de Bingo de 5x5 con el espacio libre (0) en el centro.
+    Para muchos cartones usar directamente generar_cartones_lote.
+    """
+    return generar_cartones_lote(1)[0]
 
 # --- 3. Función para dibujar un solo cartón ---
 
-def dibujar_carton(df_carton, num_juego=0, serie = 'A', card_id=0):
+SIGN_TEXT = 'Bingo Solidario 2025 - Centro de Padres Colegio Patrona'
+LOGO_PATH = os.path.join(ASSETS_DIR, 'img', 'logo.png')
+
+# Cache de plantillas: la capa estática del cartón (borde, franja superior,
+# letras B-I-N-G-O, cuadrícula, firma y logo) se dibuja una sola vez por
+# combinación de tamaño, color de borde y fuentes.
+_PLANTILLAS_CARTON = {}
+_LOGO_CACHE = {}
+
+def _clave_fuente(font):
+    """Identifica una fuente por su ruta y tamaño (o por su id si no los tiene)."""
+    path = getattr(font, 'path', None)
+    size = getattr(font, 'size', None)
+    if path is None:
+        return ('default', id(font))
+    return (path, size)
+
+def geometria_carton(card_width, card_height):
     """
-    Dibuja un solo cartón de Bingo como una imagen.
+    Calcula la geometría común de un cartón.
+    Devuelve (grosor_borde, alto_franja, inner_rect, cell_width, cell_height).
     """
-    img = Image.new('RGB', (CARD_WIDTH_PX, CARD_HEIGHT_PX), BACKGROUND_COLOR)
+    border_thickness = mm_a_pixeles(4) # Grosor del borde
+    top_heigh = mm_a_pixeles(15)
+    inner_rect = (
+        border_thickness, top_heigh,
+        card_width - border_thickness, card_height - border_thickness
+    )
+    cell_width = (inner_rect[2] - inner_rect[0]) / 5
+    cell_height = (inner_rect[3] - inner_rect[1]) / 5
+    return border_thickness, top_heigh, inner_rect, cell_width, cell_height
+
+def _cargar_logo(size):
+    """Abre el logo una sola vez por tamaño. Devuelve None si no existe."""
+    if size not in _LOGO_CACHE:
+        try:
+            with etapa('logo'):
+                logo = Image.open(LOGO_PATH).convert("RGBA")
+                # Ajustar tamaño del logo para que encaje en la celda
+                _LOGO_CACHE[size] = logo.resize(size, Image.LANCZOS)
+        except IOError:
+            print("No se encontró logo.png, usando celda roja por defecto")
+            _LOGO_CACHE[size] = None
+    return _LOGO_CACHE[size]
+
+# --- Modo paleta ---
+# Las hojas también se pueden dibujar en modo 'P': un byte por píxel en lugar de
+# tres. Cada índice tiene un papel fijo y la paleta le pone el color:
+#   0-63     rampa fondo -> texto (números sobre el área blanca)
+#   64-127   rampa borde -> pluma (franja, encabezado, serial y firma)
+#   128-159  rampa celda libre -> texto 'Libre'
+#   160      cuadrícula
+#   161-255  logo, cuantizado sobre el fondo
+# Pegar una máscara en modo 'P' interpola los índices igual que se interpolarían
+# los colores, así el antialias del texto queda dentro de su rampa siempre que
+# se pegue sobre el índice inicial de la rampa. La plantilla no depende del
+# color del juego: cambiar de juego es cambiar la paleta.
+# Lo que se gana es memoria, no tiempo: JPEG no admite paleta y la hoja se
+# expande a RGB para codificarla, así que el total queda igual que en RGB.
+RAMPA_TEXTO = (0, 63)
+RAMPA_PLUMA = (64, 127)
+RAMPA_LIBRE = (128, 159)
+INDICE_CUADRICULA = 160
+INDICE_LOGO = 161
+COLORES_LOGO = 256 - INDICE_LOGO
+
+_LOGO_INDICES = {}
+
+def _rampa(desde, hasta, rampa):
+    """Colores RGB de la rampa, de `desde` (primer índice) a `hasta` (último)."""
+    a, b = ImageColor.getrgb(desde)[:3], ImageColor.getrgb(hasta)[:3]
+    niveles = rampa[1] - rampa[0] + 1
+    return [round(a[k] + (b[k] - a[k]) * i / (niveles - 1)) for i in range(niveles) for k in range(3)]
+
+@lru_cache(maxsize=None)
+def _referencia_logo():
+    """Logo completo compuesto sobre el fondo y cuantizado a COLORES_LOGO colores, o None."""
+    try:
+        logo = Image.open(LOGO_PATH).convert("RGBA")
+    except IOError:
+        return None
+    plano = Image.new('RGB', logo.size, BACKGROUND_COLOR)
+    plano.paste(logo, (0, 0), logo)
+    return plano.quantize(colors=COLORES_LOGO)
+
+def _logo_indices(size):
+    """Logo de la celda central como índices de la paleta (desde INDICE_LOGO), o None."""
+    if size not in _LOGO_INDICES:
+        logo, referencia = _cargar_logo(size), _referencia_logo()
+        if logo is None or referencia is None:
+            _LOGO_INDICES[size] = None
+        else:
+            plano = Image.new('RGB', size, BACKGROUND_COLOR)
+            plano.paste(logo, (0, 0), logo)
+            _LOGO_INDICES[size] = plano.quantize(palette=referencia).point(lambda i: i + INDICE_LOGO)
+    return _LOGO_INDICES[size]
+
+@lru_cache(maxsize=None)
+def paleta_juego(border_color):
+    """Paleta (768 bytes) del modo 'P' para un juego con ese color de borde."""
+    colores = (
+        _rampa(BACKGROUND_COLOR, TEXT_COLOR, RAMPA_TEXTO)
+        + _rampa(border_color, pen_colour_map[border_color], RAMPA_PLUMA)
+        + _rampa(FREE_SPACE_COLOR, FREE_SPACE_TEXT_COLOR, RAMPA_LIBRE)
+        + list(ImageColor.getrgb(GRID_COLOR)[:3])
+    )
+    referencia = _referencia_logo()
+    if referencia is not None:
+        colores += referencia.getpalette()[:3 * COLORES_LOGO]
+    return bytes(colores + [0] * (768 - len(colores)))
+
+def recolorear(img, border_color):
+    """Copia de un cartón u hoja en modo 'P' con los colores del juego de `border_color`."""
+    img = img.copy()
+    img.putpalette(paleta_juego(border_color))
+    return img
+
+def _tintas(border_color, paleta):
+    """(fondo, borde, pluma, cuadrícula): colores en RGB o índices en modo paleta."""
+    if paleta:
+        return RAMPA_TEXTO[0], RAMPA_PLUMA[0], RAMPA_PLUMA[1], INDICE_CUADRICULA
+    return BACKGROUND_COLOR, border_color, pen_colour_map[border_color], GRID_COLOR
+
+def _nueva_imagen(size, border_color, paleta):
+    """Imagen vacía con el fondo, en modo 'P' con la paleta del juego o en RGB."""
+    if paleta:
+        img = Image.new('P', size, RAMPA_TEXTO[0])
+        img.putpalette(paleta_juego(border_color))
+        return img
+    return Image.new('RGB', size, BACKGROUND_COLOR)
+
+def _dibujar_plantilla_carton(card_width, card_height, border_color, paleta=False, codigo=False):
+    """
+    Dibuja la capa estática del cartón: todo excepto números y serial.
+    Con `paleta` la dibuja en modo 'P' con los índices de cada papel; `border_color`
+    solo se usa entonces para la paleta inicial. Con `codigo` la celda central
+    queda en blanco para el QR de reclamo.
+    """
+    img = _nueva_imagen((card_width, card_height), border_color, paleta)
+    fondo, borde, pluma, cuadricula = _tintas(border_color, paleta)
+    libre, texto_libre = RAMPA_LIBRE if paleta else (FREE_SPACE_COLOR, FREE_SPACE_TEXT_COLOR)
     draw = ImageDraw.Draw(img)
+    BORDER_THICKNESS, top_heigh, inner_rect, cell_width, cell_height = geometria_carton(card_width, card_height)
+
+    def escribir(xy, texto, fill, font):
+        # En modo 'P' ImageDraw no suaviza el texto: se pega la máscara del atlas
+        if paleta:
+            pegar_texto(img, xy, texto, fill, font)
+        else:
+            draw.text(xy, texto, fill=fill, font=font)
 
     # Dibujar el borde rojo exterior
-    BORDER_THICKNESS = mm_a_pixeles(4) # Grosor del borde
     draw.rectangle(
-        (0, 0, CARD_WIDTH_PX - 1, CARD_HEIGHT_PX - 1), 
-        fill=BORDER_COLOR, 
-        outline=BORDER_COLOR, 
+        (0, 0, card_width - 1, card_height - 1), 
+        fill=borde, 
+        outline=borde, 
         width=BORDER_THICKNESS
     )
     # Top rectangle
-    top_heigh = mm_a_pixeles(15)
     draw.rectangle(
-        (0,0, CARD_WIDTH_PX -1, top_heigh),
-        fill=BORDER_COLOR
+        (0,0, card_width -1, top_heigh),
+        fill=borde
     )
     # Dibujar el área blanca interior (donde van los números)
-    inner_rect = (
-        BORDER_THICKNESS, top_heigh, 
-        CARD_WIDTH_PX - BORDER_THICKNESS, CARD_HEIGHT_PX - BORDER_THICKNESS
-    )
-    draw.rectangle(inner_rect, fill=BACKGROUND_COLOR)
-
-    # Coordenadas para la cuadrícula interna de 5x5
-    cell_width = (inner_rect[2] - inner_rect[0]) / 5
-    cell_height = (inner_rect[3] - inner_rect[1]) / 5
+    draw.rectangle(inner_rect, fill=fondo)
 
     # Firma CPA
-    sign_text = 'Bingo Solidario 2025 - Centro de Padres Colegio Patrona'
-    text_bbox = draw.textbbox((0,0), sign_text, font=FONT_SIGN)
-    text_width = text_bbox[2] - text_bbox[0]
-    text_height = text_bbox[3] - text_bbox[1]
     x = BORDER_THICKNESS  # un pequeño margen a la izquierda
-    y = CARD_HEIGHT_PX - BORDER_THICKNESS - text_height - 5  # un pequeño margen arriba del borde inferior
-    y = CARD_HEIGHT_PX - BORDER_THICKNESS + 5
-
-    draw.text(
-        ( x, y),
-        sign_text, 
-        fill=pen_colour_map[BORDER_COLOR],
-        font=FONT_SIGN
-    )
+    y = card_height - BORDER_THICKNESS + 5
+    escribir((x, y), SIGN_TEXT, pluma, fuente('FONT_SIGN'))
 
-    # Dibujar la cuadrícula y rellenar números
+    # Dibujar encabezado y cuadrícula
     for r in range(6):
         for c in range(5):
             x1 = inner_rect[0] + c * cell_width
@@ -217,236 +400,601 @@ def dibujar_carton(df_carton, num_juego=0, serie = 'A', card_id=0):
             x2 = x1 + cell_width
             y2 = y1 + cell_height
 
-
             # Escribir encabezado B I N G O
             if r == 0:
                 header_text = COLUMNAS[c]
-                text_bbox = draw.textbbox((0,0), header_text, font=FONT_HEADER)
+                text_bbox = draw.textbbox((0,0), header_text, font=fuente('FONT_HEADER'))
                 text_width = text_bbox[2] - text_bbox[0]
                 text_height = text_bbox[3] - text_bbox[1]
-                draw.text(
+                escribir(
                     (x1 + (cell_width - text_width) / 2, y1 + (cell_height - text_height) / 2),
-                    header_text, 
-                    #fill=TEXT_COLOR,
-                    fill=pen_colour_map[BORDER_COLOR],
-                    font=FONT_HEADER
+                    header_text, pluma, fuente('FONT_HEADER')
                 )
-                # Serial
-                if df_carton.columns[c] == 'B':
-                    #logging.info(f"NumJuego: {num_juego}")
-                    str_num_juego = ('0'+str(num_juego))[-2:]
-                    num_serial = ('00'+str(card_id))[-3:]
-                    serial = 'Juego ' + str_num_juego + ' - Letra: ' + serie + ' - Carton: ' + num_serial
-                    #logging.info(f"serial: {serial}")
-                    #serial = ' Letra: ' + serie + ' Carton ' + num_serial
-                    text_bbox = draw.textbbox((0,0), serial, font=FONT_SERIAL)
-                    text_width = text_bbox[2] - text_bbox[0]
-                    text_height = text_bbox[3] - text_bbox[1]
-                    draw.text(
-                        #(x1 + (cell_width - text_width) / 2, y1 + (0 - 0) / 2),
-                        (x1 + (cell_width) / 2, y1 + (0 - 0) / 2),
-                        serial, 
-                        fill=pen_colour_map[BORDER_COLOR],
-                        font=FONT_SERIAL
-                    )
-                    card_id = card_id + 1
-            else:
-                # Dibujar línea de la cuadrícula
-                draw.rectangle((x1, y1, x2, y2), outline=GRID_COLOR, width=1)
-
-            # Escribir números o "Libre"
-            if r > 0: # Saltamos la fila de encabezados para los números
-                if df_carton.columns[c] == 'N' and r == 3:  # Celda central
-                    # Abrir el logo
-                    try:
-                        logo = Image.open("./assets/img/logo.png").convert("RGBA")
-
-                        # Ajustar tamaño del logo para que encaje en la celda
-                        logo = logo.resize((int(cell_width-6), int(cell_height-6)), Image.LANCZOS)
-
-                        # Pegar el logo en la celda
-                        img.paste(logo, (int(x1+3), int(y1+3)), logo)  # usa el canal alfa como máscara
-                    except IOError:
-                        print("No se encontró logo.png, usando celda roja por defecto")
-                        draw.rectangle((x1, y1, x2, y2), fill=FREE_SPACE_COLOR, outline=GRID_COLOR, width=1)
-                        num_text = "Libre"
-                        font = FONT_FREE
-                        text_color = FREE_SPACE_TEXT_COLOR
-                        text_bbox = draw.textbbox((0,0), num_text, font=font)
-                        text_width = text_bbox[2] - text_bbox[0]
-                        text_height = text_bbox[3] - text_bbox[1]
-                        draw.text(
-                            (x1 + (cell_width - text_width) / 2, y1 + (cell_height - text_height) / 2),
-                            num_text,
-                            fill=text_color,
-                            font=font
-                        )
+                continue
+
+            # Dibujar línea de la cuadrícula
+            draw.rectangle((x1, y1, x2, y2), outline=cuadricula, width=1)
+
+            if COLUMNAS[c] == 'N' and r == 3 and not codigo:  # Celda central
+                size = (int(cell_width-6), int(cell_height-6))
+                logo = _logo_indices(size) if paleta else _cargar_logo(size)
+                if logo is not None:
+                    # Pegar el logo en la celda; en modo 'P' ya viene compuesto sobre el fondo
+                    img.paste(logo, (int(x1+3), int(y1+3)), None if paleta else logo)  # usa el canal alfa como máscara
                 else:
-                    num_text = str(df_carton.iloc[r-1, c]) # r-1 porque la fila 0 es el encabezado
-                    font = FONT_NUMBERS
-                    text_color = TEXT_COLOR
-                
-                    # Centrar texto
-                    text_bbox = draw.textbbox((0,0), num_text, font=font)
+                    draw.rectangle((x1, y1, x2, y2), fill=libre, outline=cuadricula, width=1)
+                    num_text = "Libre"
+                    text_bbox = draw.textbbox((0,0), num_text, font=fuente('FONT_FREE'))
                     text_width = text_bbox[2] - text_bbox[0]
                     text_height = text_bbox[3] - text_bbox[1]
-
-                    draw.text(
+                    escribir(
                         (x1 + (cell_width - text_width) / 2, y1 + (cell_height - text_height) / 2),
-                        num_text, 
-                        fill=text_color, 
-                        font=font
+                        num_text, texto_libre, fuente('FONT_FREE')
+                    )
+
+    return img
+
+def obtener_plantilla_carton(card_width, card_height, border_color, paleta=False, codigo=False):
+    """
+    Devuelve la plantilla estática del cartón para el tamaño, color de borde
+    y fuentes actuales, dibujándola solo la primera vez. En modo paleta hay una
+    sola plantilla para todos los colores; se le cambia la paleta al usarla.
+    """
+    clave = (
+        card_width, card_height, None if paleta else border_color, paleta, codigo,
+        _clave_fuente(fuente('FONT_HEADER')), _clave_fuente(fuente('FONT_SIGN')), _clave_fuente(fuente('FONT_FREE'))
+    )
+    plantilla = _PLANTILLAS_CARTON.get(clave)
+    if plantilla is None:
+        plantilla = _dibujar_plantilla_carton(card_width, card_height, border_color, paleta, codigo)
+        _PLANTILLAS_CARTON[clave] = plantilla
+    return plantilla
+
+# Atlas de glifos: máscara pre-rasterizada y métricas de cada texto, por fuente.
+# Los números 1-75 y las partes del serial se rasterizan una sola vez y luego
+# se pegan usando la máscara como canal alfa.
+_ATLAS_GLIFOS = {}
+_POSICIONES_NUMEROS = {}
+
+def obtener_glifo(texto, font):
+    """
+    Devuelve (mascara, bbox, avance) del texto con la fuente dada.
+    La máscara se rasteriza solo la primera vez.
+    """
+    clave = (_clave_fuente(font), texto)
+    glifo = _ATLAS_GLIFOS.get(clave)
+    if glifo is None:
+        bbox = font.getbbox(texto)
+        mascara = Image.new('L', (max(bbox[2] - bbox[0], 1), max(bbox[3] - bbox[1], 1)), 0)
+        ImageDraw.Draw(mascara).text((-bbox[0], -bbox[1]), texto, fill=255, font=font)
+        glifo = (mascara, bbox, font.getlength(texto))
+        _ATLAS_GLIFOS[clave] = glifo
+    return glifo
+
+def precargar_atlas_numeros(font):
+    """Rasteriza los 75 números posibles del bingo con la fuente dada."""
+    for numero in range(1, 76):
+        obtener_glifo(str(numero), font)
+
+def pegar_texto(img, xy, texto, fill, font):
+    """Equivalente a draw.text, pero pegando la máscara cacheada del atlas."""
+    mascara, bbox, avance = obtener_glifo(texto, font)
+    img.paste(fill, (int(round(xy[0])) + bbox[0], int(round(xy[1])) + bbox[1]), mascara)
+    return avance
+
+def posiciones_numeros(card_width, card_height, font):
+    """
+    Precalcula, para cada fila (0-4) y número (1-75), la posición donde se pega
+    su máscara para quedar centrado en su celda.
+    """
+    clave = (card_width, card_height, _clave_fuente(font))
+    posiciones = _POSICIONES_NUMEROS.get(clave)
+    if posiciones is None:
+        precargar_atlas_numeros(font)
+        _, _, inner_rect, cell_width, cell_height = geometria_carton(card_width, card_height)
+        posiciones = [[None] * 76 for _ in range(5)]
+        for c, (min_val, max_val) in enumerate(RANGOS_BINGO.values()):
+            x1 = inner_rect[0] + c * cell_width
+            for numero in range(min_val, max_val + 1):
+                mascara, bbox, _ = obtener_glifo(str(numero), font)
+                text_width = bbox[2] - bbox[0]
+                text_height = bbox[3] - bbox[1]
+                for r in range(5):
+                    y1 = inner_rect[1] + r * cell_height
+                    posiciones[r][numero] = (
+                        int(round(x1 + (cell_width - text_width) / 2)),
+                        int(round(y1 + (cell_height - text_height) / 2)),
                     )
+        _POSICIONES_NUMEROS[clave] = posiciones
+    return posiciones
+
+@lru_cache(maxsize=None)
+def geometria_codigo(card_width, card_height, modulos):
+    """
+    (x, y, lado del módulo) del QR de `modulos` por lado en la celda central: el
+    mayor módulo entero que deja 2 módulos de margen, centrado en la celda.
+    """
+    _, _, inner_rect, cell_width, cell_height = geometria_carton(card_width, card_height)
+    lado = int(min(cell_width, cell_height) - 6) // (modulos + 4)
+    x1 = inner_rect[0] + 2 * cell_width
+    y1 = inner_rect[1] + 2 * cell_height
+    return (int(x1 + (cell_width - lado * modulos) / 2), int(y1 + (cell_height - lado * modulos) / 2), lado)
+
+def pegar_codigo(img, codigo, card_width, card_height, fill):
+    """Pega el QR del código en la celda central, con `fill` en los módulos oscuros."""
+    from codigo_reclamo import matriz_qr
+    matriz = matriz_qr(codigo)
+    x, y, lado = geometria_codigo(card_width, card_height, len(matriz))
+    mascara = Image.fromarray(matriz.astype('uint8') * 255).resize((lado * len(matriz),) * 2, Image.NEAREST)
+    img.paste(fill, (x, y), mascara)
+
+def dibujar_carton(carton, num_juego=0, serie = 'A', card_id=0, config=None):
+    """
+    Dibuja un solo cartón de Bingo (arreglo 5x5, 0 = espacio libre) como una imagen.
+    Parte de una copia de la plantilla estática y solo pega el serial y los números
+    desde el atlas de glifos. Sin `config` se usan los valores globales.
+    """
+    if config is None:
+        config = configuracion_actual()
+    card_width, card_height, border_color = config.card_width_px, config.card_height_px, config.border_color
+    with etapa('dibujo_estatico'):
+        img = obtener_plantilla_carton(card_width, card_height, border_color, config.paleta, config.codigo).copy()
+    _, _, inner_rect, cell_width, cell_height = geometria_carton(card_width, card_height)
+    if config.paleta:
+        img.putpalette(paleta_juego(border_color))
+        pen_color, text_color = RAMPA_PLUMA[1], RAMPA_TEXTO[1]
+    else:
+        pen_color = ImageColor.getrgb(pen_colour_map[border_color])
+        text_color = ImageColor.getrgb(TEXT_COLOR)
+
+    with etapa('dibujo_texto'):
+        # Serial (sobre la franja superior, a partir de la columna B).
+        # El prefijo es fijo por juego y serie; los dígitos se pegan uno a uno.
+        str_num_juego = ('0'+str(num_juego))[-2:]
+        num_serial = f"{card_id:03d}"
+        font_serial = fuente('FONT_SERIAL')
+        x = inner_rect[0] + (cell_width) / 2
+        y = inner_rect[1] - cell_height
+        x += pegar_texto(img, (x, y), 'Juego ' + str_num_juego + ' - Letra: ' + serie + ' - Carton: ', pen_color, font_serial)
+        for digito in num_serial:
+            x += pegar_texto(img, (x, y), digito, pen_color, font_serial)
+
+        # Pegar números en sus posiciones precalculadas
+        font_numeros = fuente('FONT_NUMBERS')
+        posiciones = posiciones_numeros(card_width, card_height, font_numeros)
+        for r, fila in enumerate(carton.tolist()):
+            for numero in fila:
+                if numero == 0:  # Celda central, ya está en la plantilla
+                    continue
+                mascara, bbox, _ = obtener_glifo(str(numero), font_numeros)
+                x, y = posiciones[r][numero]
+                img.paste(text_color, (x + bbox[0], y + bbox[1]), mascara)
+
+    if config.codigo:
+        from codigo_reclamo import codigo_reclamo
+        with etapa('codigo_reclamo'):
+            pegar_codigo(img, codigo_reclamo(num_juego, serie, card_id, carton), card_width, card_height, text_color)
+    contar('cartones_dibujados')
     
     return img
 
 # --- 4. Función principal para generar la hoja JPG ---
 
-def generar_hoja_bingo_jpg(cantidad_cartones, cols=0, rows=0, serie_carton='A', num_hoja=0, num_juego=0):
+@lru_cache(maxsize=None)
+def offsets_hoja(config):
+    """
+    Posición (x, y) en píxeles de cada cartón de la hoja, fila por fila.
+    Memorizada por configuración: cada proceso la calcula una vez por juego.
+    """
+    offsets = []
+    for idx in range(config.cols * config.rows):
+        row = idx // config.cols
+        col = idx % config.cols
+        x_offset = config.page_margin_px + col * (config.card_width_px + 2*config.card_spacing_px) + config.card_spacing_px
+        y_offset = config.page_margin_px + row * (config.card_height_px + 2*config.card_spacing_height_px) + config.card_spacing_height_px
+        offsets.append((x_offset, y_offset))
+    return tuple(offsets)
+
+def componer_hoja(cartones, config, serie_carton='A', num_hoja=0, num_juego=0):
+    """
+    Dibuja los cartones y los organiza en una imagen de hoja según `config`.
+    Devuelve (imagen_hoja, cantidad_de_cartones_pegados).
+    Con tiras de 90 bolas (arreglo (k, 6, 3, 9)) delega en componer_hoja_tiras.
+    """
+    if getattr(cartones, 'ndim', None) == 4:
+        return componer_hoja_tiras(cartones, config, serie_carton, num_hoja, num_juego)
+    num_cols_page = config.cols
+    cartones_por_pagina = config.cols * config.rows
+    offsets = offsets_hoja(config)
+    cantidad_cartones = len(cartones)
+
+    with etapa('composicion_hoja'):
+        # Creamos la imagen de la hoja
+        sheet_img = _nueva_imagen((config.page_width_px, config.page_height_px), config.border_color, config.paleta)
+
+        current_card_count = 0
+
+        # Dibujar cada cartón y pegarlo en la hoja en seguida, sin acumular las imágenes
+        for idx, carton in enumerate(cartones):
+            if idx >= cartones_por_pagina:
+                print(f"Advertencia: Se generaron {cantidad_cartones} cartones, pero solo caben {cartones_por_pagina} en la hoja.")
+                break
+            card_img = dibujar_carton(carton, num_juego=num_juego, serie=serie_carton, card_id=(num_hoja-1)*cantidad_cartones + idx + 1, config=config)
+
+            x_offset, y_offset = offsets[idx]
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                info = { 'idx': idx, 'row': idx // num_cols_page, 'col': idx % num_cols_page, 'x_offset': x_offset, 'y_offset': y_offset}
+                logging.debug(f"{info}")
+
+            sheet_img.paste(card_img, (x_offset, y_offset))
+            current_card_count += 1
+
+    contar('hojas_compuestas')
+    return sheet_img, current_card_count
+
+def generar_hoja_bingo_jpg(cantidad_cartones, cols=0, rows=0, serie_carton='A', num_hoja=0, num_juego=0, indice=None, config=None, cartones=None):
     """
     Genera y organiza múltiples cartones de bingo en una imagen JPG
     simulando una hoja de tamaño carta.
+    Si se entrega un IndiceCartones, los cartones no repiten ninguno ya registrado.
+    Con `cartones` (arreglo (N, 5, 5)) se dibujan esos en lugar de generar nuevos.
     """
     logging.info(f"Num Juego: {num_juego}")
-    # Calcular cuántos cartones caben por fila y columna
-    num_cols_page = (PAGE_WIDTH_PX - 2 * PAGE_MARGIN_PX + 2*CARD_SPACING_PX) // (CARD_WIDTH_PX + 2*CARD_SPACING_PX)
-    num_rows_page = (PAGE_HEIGHT_PX - 2 * PAGE_MARGIN_PX + 2*CARD_SPACING_HEIGHT_PX) // (CARD_HEIGHT_PX + 2*CARD_SPACING_HEIGHT_PX)
-    num_cols_page = cols
-    num_rows_page = rows
+    if config is None:
+        config = configuracion_actual(cols, rows)
     
-    if num_cols_page == 0 or num_rows_page == 0:
+    if config.cols == 0 or config.rows == 0:
         print("Error: Los cartones son demasiado grandes para la página o los márgenes.")
         return
 
-    cartones_por_pagina = num_cols_page * num_rows_page
-    
-    # Asegurarse de que al menos un cartón se puede generar
-    if cartones_por_pagina == 0:
-        print("No se pueden colocar cartones en la página con los tamaños y márgenes dados.")
-        return
+    # Generar los cartones individuales
+    print(f"Generando {cantidad_cartones} cartones y dibujándolos...")
+    if cartones is not None:
+        pass
+    elif indice is None:
+        cartones = generar_cartones_lote(cantidad_cartones)
+    else:
+        from cartones_unicos import generar_cartones_unicos
+        cartones = generar_cartones_unicos(cantidad_cartones, indice)
 
-    # Creamos la imagen de la hoja
-    sheet_img = Image.new('RGB', (PAGE_WIDTH_PX, PAGE_HEIGHT_PX), BACKGROUND_COLOR)
-    
-    current_card_count = 0
-    card_images = []
+    sheet_img, current_card_count = componer_hoja(cartones, config, serie_carton, num_hoja, num_juego)
 
-    # Generar y dibujar los cartones individuales
-    print(f"Generando {cantidad_cartones} cartones y dibujándolos...")
-    for i in range(cantidad_cartones):
-        df_carton = generar_carton_bingo()
-        card_img = dibujar_carton(df_carton, num_juego=num_juego, serie=serie_carton, card_id=(num_hoja-1)*cantidad_cartones + i + 1)
-        card_images.append(card_img)
-
-    # Pegar los cartones en la hoja
-    for idx, card_img in enumerate(card_images):
-        if idx >= cartones_por_pagina:
-            print(f"Advertencia: Se generaron {cantidad_cartones} cartones, pero solo caben {cartones_por_pagina} en la hoja.")
-            break
-            
-        row = idx // num_cols_page
-        col = idx % num_cols_page
-
-        x_offset = PAGE_MARGIN_PX + col * (CARD_WIDTH_PX + 2*CARD_SPACING_PX) + CARD_SPACING_PX
-        y_offset = PAGE_MARGIN_PX + row * (CARD_HEIGHT_PX + 2*CARD_SPACING_HEIGHT_PX) + CARD_SPACING_HEIGHT_PX
-        info = { 'idx': idx, 'row': row, 'col': col, 'x_offset': x_offset, 'y_offset': y_offset}
-        logging.info(f"{info}")
-
-        sheet_img.paste(card_img, (x_offset, y_offset))
-        current_card_count += 1
-
-    output_filename = f"output/{current_card_count}_cartones_bingo_hoja_{('00'+str(num_hoja))[-3:]}.jpg"
-    sheet_img.save(output_filename, quality=90, dpi=(DPI, DPI)) # Guarda con DPI para impresión
+    str_num_juego = ('0'+str(num_juego))[-2:]
+    output_filename = f"output/{current_card_count}_cartones_bingo_juego_{str_num_juego}_hoja_{num_hoja:03d}.jpg"
+    with etapa('escritura_archivo'):
+        if sheet_img.mode == 'P':  # JPEG no admite paleta: se expande a RGB solo para guardarla
+            sheet_img = sheet_img.convert('RGB')
+        sheet_img.save(output_filename, quality=90, dpi=(config.dpi, config.dpi)) # Guarda con DPI para impresión
     print(f"\n✅ Se generó '{output_filename}' con {current_card_count} cartones.")
-    print(f"Tamaño de la página: {PAGE_WIDTH_MM}mm x {PAGE_HEIGHT_MM}mm ({PAGE_WIDTH_PX}x{PAGE_HEIGHT_PX}px a {DPI} DPI)")
+    print(f"Tamaño de la página: {config.page_width_mm}mm x {config.page_height_mm}mm ({config.page_width_px}x{config.page_height_px}px a {config.dpi} DPI)")
     return output_filename
 
-def calc_columns_and_rows(cartones_per_page: int):
-    """"
-    Calcula cuántas columnas y filas se deben usar en la página
-    basándose en el tamaño de la página y la cantidad de cartones deseada.
-    Devuelve (num_cols, num_rows).
+def cartones_hoja_derivados(semilla, num_juego, serie, num_hoja, cartones_por_hoja):
+    """
+    Cartones de una hoja en modo determinista: se recalculan a partir de la
+    semilla y de los seriales que se imprimen en la hoja, sin generar el resto del juego.
     """
+    primero = (num_hoja - 1) * cartones_por_hoja + 1
+    return derivar_cartones(semilla, num_juego, serie, range(primero, primero + cartones_por_hoja))
 
-    # Relación de aspecto de la página
-    aspect_ratio = PAGE_WIDTH_PX / PAGE_HEIGHT_PX
+# --- 5. Bingo de 90 bolas: tiras de 6 boletos ---
+# Las tiras van lado a lado en la hoja y los 6 boletos de cada una, uno bajo
+# otro. El tamaño de la celda sale de la página, y las fuentes se piden al
+# registro en el tamaño que corresponde a esa celda.
 
-    # Empezamos buscando factores de cartones_per_page
-    posibles = []
-    for filas in range(1, cartones_per_page + 1):
-        if cartones_per_page % filas == 0:
-            cols = cartones_per_page // filas
-            posibles.append((cols, filas))
+TIRAS_POR_HOJA = 2
+_POSICIONES_BOLETO = {}
 
-    # Elegimos la combinación cuya proporción columnas/filas
-    # se acerque más a la proporción de la página
-    mejor_cols, mejor_filas = min(
-        posibles,
-        key=lambda x: abs((x[0] / x[1]) - aspect_ratio)
+def geometria_tiras(config, tiras_por_hoja=TIRAS_POR_HOJA):
+    """
+    Geometría de una hoja de tiras. Devuelve (celda, borde, alto_franja, ancho_boleto,
+    alto_boleto, offsets), con offsets[tira][boleto] la esquina superior izquierda del boleto.
+    """
+    from tiras_bingo90 import BOLETOS_POR_TIRA, COLUMNAS_BOLETO, FILAS_BOLETO
+    borde, franja, separacion = mm_a_pixeles(2), mm_a_pixeles(7), mm_a_pixeles(2)
+    ancho_util = config.page_width_px - 2 * config.page_margin_px
+    alto_util = config.page_height_px - 2 * config.page_margin_px
+    hueco = (ancho_util - (tiras_por_hoja - 1) * config.card_spacing_px) // tiras_por_hoja
+    celda = min(
+        (hueco - 2 * borde) // COLUMNAS_BOLETO,
+        (alto_util - (BOLETOS_POR_TIRA - 1) * separacion - BOLETOS_POR_TIRA * (franja + borde)) // (BOLETOS_POR_TIRA * FILAS_BOLETO),
     )
+    ancho_boleto = COLUMNAS_BOLETO * celda + 2 * borde
+    alto_boleto = franja + FILAS_BOLETO * celda + borde
+    alto_tira = BOLETOS_POR_TIRA * alto_boleto + (BOLETOS_POR_TIRA - 1) * separacion
+    y0 = config.page_margin_px + (alto_util - alto_tira) // 2
+    offsets = []
+    for t in range(tiras_por_hoja):
+        x = config.page_margin_px + t * (hueco + config.card_spacing_px) + (hueco - ancho_boleto) // 2
+        offsets.append([(x, y0 + b * (alto_boleto + separacion)) for b in range(BOLETOS_POR_TIRA)])
+    return celda, borde, franja, ancho_boleto, alto_boleto, offsets
+
+def _fuentes_boleto(celda, franja):
+    """Fuentes de números y serial para el tamaño de celda y franja del boleto."""
+    ruta_numeros, _ = FUENTES['FONT_NUMBERS']
+    ruta_serial, _ = FUENTES['FONT_SERIAL']
+    return cargar_fuente(ruta_numeros, int(celda * 0.6)), cargar_fuente(ruta_serial, int(franja * 0.6))
+
+def obtener_plantilla_boleto(celda, borde, franja, border_color, paleta=False):
+    """Capa estática de un boleto de 90 bolas (borde, franja y cuadrícula de 3x9), cacheada."""
+    clave = ('boleto90', celda, borde, franja, None if paleta else border_color, paleta)
+    plantilla = _PLANTILLAS_CARTON.get(clave)
+    if plantilla is None:
+        from tiras_bingo90 import COLUMNAS_BOLETO, FILAS_BOLETO
+        ancho, alto = COLUMNAS_BOLETO * celda + 2 * borde, franja + FILAS_BOLETO * celda + borde
+        plantilla = _nueva_imagen((ancho, alto), border_color, paleta)
+        fondo, color_borde, _, cuadricula = _tintas(border_color, paleta)
+        draw = ImageDraw.Draw(plantilla)
+        draw.rectangle((0, 0, ancho - 1, alto - 1), fill=color_borde)
+        draw.rectangle((borde, franja, ancho - borde - 1, alto - borde - 1), fill=fondo)
+        for f in range(FILAS_BOLETO):
+            for c in range(COLUMNAS_BOLETO):
+                x1, y1 = borde + c * celda, franja + f * celda
+                draw.rectangle((x1, y1, x1 + celda, y1 + celda), outline=cuadricula, width=1)
+        _PLANTILLAS_CARTON[clave] = plantilla
+    return plantilla
+
+def _posiciones_boleto(celda, borde, franja, font):
+    """Esquina de la máscara de cada número 1-90 en cada fila del boleto, centrada en su celda."""
+    clave = (celda, borde, franja, _clave_fuente(font))
+    posiciones = _POSICIONES_BOLETO.get(clave)
+    if posiciones is None:
+        from tiras_bingo90 import FILAS_BOLETO, RANGOS_90
+        posiciones = [[None] * 91 for _ in range(FILAS_BOLETO)]
+        for c, (minimo, maximo) in enumerate(RANGOS_90):
+            for numero in range(minimo, maximo + 1):
+                _, bbox, _ = obtener_glifo(str(numero), font)
+                for f in range(FILAS_BOLETO):
+                    posiciones[f][numero] = (
+                        int(round(borde + c * celda + (celda - (bbox[2] - bbox[0])) / 2)),
+                        int(round(franja + f * celda + (celda - (bbox[3] - bbox[1])) / 2)),
+                    )
+        _POSICIONES_BOLETO[clave] = posiciones
+    return posiciones
+
+def dibujar_boleto(boleto, celda, borde, franja, config, serial):
+    """Dibuja un boleto de 3x9 (0 = celda vacía) con su serial en la franja superior."""
+    with etapa('dibujo_estatico'):
+        img = obtener_plantilla_boleto(celda, borde, franja, config.border_color, config.paleta).copy()
+    font_numeros, font_serial = _fuentes_boleto(celda, franja)
+    if config.paleta:
+        img.putpalette(paleta_juego(config.border_color))
+        pen_color, text_color = RAMPA_PLUMA[1], RAMPA_TEXTO[1]
+    else:
+        pen_color = ImageColor.getrgb(pen_colour_map[config.border_color])
+        text_color = ImageColor.getrgb(TEXT_COLOR)
+
+    with etapa('dibujo_texto'):
+        _, bbox, _ = obtener_glifo(serial, font_serial)
+        pegar_texto(img, (borde, (franja - (bbox[3] - bbox[1])) / 2 - bbox[1]), serial, pen_color, font_serial)
+        posiciones = _posiciones_boleto(celda, borde, franja, font_numeros)
+        for f, fila in enumerate(boleto.tolist()):
+            for numero in fila:
+                if numero == 0:
+                    continue
+                img.paste(text_color, posiciones[f][numero], obtener_glifo(str(numero), font_numeros)[0])
+    contar('boletos_dibujados')
+    return img
 
-    return mejor_cols, mejor_filas
-
-def calc_carton_sizes(rows, columns):
-    width = int( (PAGE_WIDTH_PX - PAGE_MARGIN_PX) / columns) 
-    heigh = int((PAGE_HEIGHT_PX - PAGE_MARGIN_PX) / rows)
-
-    info = {'PAGE_WIDTH_PX': PAGE_WIDTH_PX, 'PAGE_HEIGHT_PX': PAGE_HEIGHT_PX,'width': width, 'height': heigh}
-    logging.info(f"calc_carton_sizes: {info}")
-
-    carton_width = min(width, heigh)- 2*CARD_SPACING_PX
-    carton_heigh = carton_width
-
-    offset_width = int((width - carton_width)/2)
-    offset_heigh = int((heigh - carton_heigh)/2)
-
-    info = {'width': carton_width, 'offset_width': offset_width}
-    logging.info(f"calc_carton_sizes: {info}")
+def componer_hoja_tiras(tiras, config, serie='A', num_hoja=0, num_juego=0):
+    """
+    Dibuja tiras de 90 bolas (arreglo (k, 6, 3, 9)) en una hoja, lado a lado.
+    Devuelve (imagen_hoja, cantidad_de_tiras_pegadas).
+    """
+    celda, borde, franja, _, _, offsets = geometria_tiras(config, len(tiras))
+    str_num_juego = ('0'+str(num_juego))[-2:]
+    with etapa('composicion_hoja'):
+        sheet_img = _nueva_imagen((config.page_width_px, config.page_height_px), config.border_color, config.paleta)
+        for t, tira in enumerate(tiras):
+            num_tira = (num_hoja - 1) * len(tiras) + t + 1
+            for b, boleto in enumerate(tira):
+                serial = f"Juego {str_num_juego} - Letra: {serie} - Tira: {num_tira:03d} - Boleto {b + 1}"
+                sheet_img.paste(dibujar_boleto(boleto, celda, borde, franja, config, serial), offsets[t][b])
+    contar('hojas_compuestas')
+    return sheet_img, len(tiras)
+
+def aplicar_plan(plan):
+    """
+    Fija los tamaños globales de página y cartón según un PlanHoja (plan_hojas)
+    y devuelve (cols, rows). Lo que sobra en cada eje se reparte a ambos lados de
+    cada cartón, así la grilla queda centrada en la página.
+    """
+    global PAGE_WIDTH_MM, PAGE_HEIGHT_MM, PAGE_WIDTH_PX, PAGE_HEIGHT_PX, PAGE_SIZE, PAGE_MARGIN_PX
+    global CARD_WIDTH_PX, CARD_HEIGHT_PX, CARD_SPACING_PX, CARD_SPACING_HEIGHT_PX
+    PAGE_SIZE = plan.papel
+    PAGE_WIDTH_MM, PAGE_HEIGHT_MM = plan.page_width_mm, plan.page_height_mm
+    PAGE_WIDTH_PX, PAGE_HEIGHT_PX = mm_a_pixeles(PAGE_WIDTH_MM), mm_a_pixeles(PAGE_HEIGHT_MM)
+    PAGE_MARGIN_PX = mm_a_pixeles(plan.margen_mm)
+    CARD_WIDTH_PX = CARD_HEIGHT_PX = mm_a_pixeles(plan.lado_mm)
+    CARD_SPACING_PX = (PAGE_WIDTH_PX - 2*PAGE_MARGIN_PX - plan.cols*CARD_WIDTH_PX) // (2*plan.cols)
+    CARD_SPACING_HEIGHT_PX = (PAGE_HEIGHT_PX - 2*PAGE_MARGIN_PX - plan.rows*CARD_HEIGHT_PX) // (2*plan.rows)
+
+    info = {'cols': plan.cols, 'rows': plan.rows, 'with': CARD_WIDTH_PX, 'height': CARD_HEIGHT_PX, 'spacing_w': CARD_SPACING_PX, 'spacing_h': CARD_SPACING_HEIGHT_PX}
+    logging.info(f"aplicar_plan: {info}")
+    return plan.cols, plan.rows
 
-    return carton_width, carton_heigh, offset_width, offset_heigh
-    
 def calc_sizes(cartones_per_page, paper_size):
-    global CARD_WIDTH_PX, CARD_HEIGHT_PX, CARD_SPACING_PX, CARD_SPACING_HEIGHT_PX, CARD_SPACING_HEIGHT_PX
+    """
+    Ajusta los tamaños globales para `cartones_per_page` cartones por hoja en
+    `paper_size` vertical, tan grandes como quepan, y devuelve (cols, rows).
+    """
+    from plan_hojas import planificar_hojas
     set_paper_size(paper_size=paper_size)
-    columns, rows = calc_columns_and_rows(cartones_per_page)
-    carton_width, carton_heigh, offset_width, offset_heigh = calc_carton_sizes(rows, columns)
-    CARD_WIDTH_PX = carton_width
-    CARD_HEIGHT_PX = carton_heigh
-    CARD_SPACING_PX = offset_width
-    CARD_SPACING_HEIGHT_PX = offset_heigh 
-
-    info = {'cols': columns, 'rows': rows, 'with': CARD_WIDTH_PX, 'height': CARD_HEIGHT_PX, 'spacing_w': CARD_SPACING_PX, 'spacing_h': CARD_SPACING_HEIGHT_PX}
-    logging.info(f"calc_sizes: {info}")
-    #quit()
-    return columns, rows
+    plan = planificar_hojas(cartones_per_page, cartones_per_page, (PAGE_SIZE,), (False,), min_lado_mm=0)
+    return aplicar_plan(plan)
 
 # --- Ejecución del programa ---
+def __getattr__(nombre):
+    # FONT_SIGN, FONT_HEADER, etc. como atributos del módulo, cargados al pedirlos
+    if nombre in FUENTES:
+        return fuente(nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
 if __name__ == '__main__':
+    import argparse
+
+    import numpy as np
+
+    from manifiesto import ManifiestoImpresion
+    from plan_hojas import MIN_LADO_MM, PAPELES, formatear_plan, planificar_hojas
+    from registro_cartones import EscritorRegistro
+    from render_paralelo import renderizar_juegos
+
+    parser = argparse.ArgumentParser(description='Genera los PDF de cartones de bingo de cada juego.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Procesos para dibujar las hojas (1 = secuencial)')
+    parser.add_argument('--semilla', type=int, default=None, help='Semilla para generar los mismos cartones en cada ejecución')
+    parser.add_argument('--en-disco', action='store_true', help='Pasar las hojas por archivos JPEG en output/ en lugar de memoria')
+    parser.add_argument('--vectorial', action='store_true', help='Dibujar los cartones como PDF vectorial en lugar de imágenes')
+    parser.add_argument('--registro', default='registro_cartones.bin', help='Archivo binario con todos los cartones impresos')
+    parser.add_argument('--derivar', action='store_true', help='Derivar cada cartón de la semilla y su serial (juego, serie, número)')
+    parser.add_argument('--reimprimir', type=int, nargs=2, metavar=('JUEGO', 'HOJA'), help='Con --derivar, dibujar solo esa hoja en output/')
+    parser.add_argument('--max-paginas', type=int, default=None, help='Partir cada PDF en volúmenes de a lo más estas páginas')
+    parser.add_argument('--max-mb', type=float, default=None, help='Partir cada PDF en volúmenes de a lo más estos MB (solo imágenes)')
+    parser.add_argument('--manifiesto', default='manifiesto_impresion.json', help='Manifiesto para omitir juegos sin cambios y retomar corridas')
+    parser.add_argument('--desde-cero', action='store_true', help='Ignorar el manifiesto y reconstruir todos los juegos')
+    parser.add_argument('--noventa', action='store_true', help='Imprimir tiras de bingo de 90 bolas (6 boletos de 3x9) en lugar de cartones de 75')
+    parser.add_argument('--max-fila', type=int, default=None, help='Máximo de números en común entre filas de dos cartones de un juego')
+    parser.add_argument('--max-columna', type=int, default=None, help='Máximo de números en común en una columna entre dos cartones de un juego')
+    parser.add_argument('--max-total', type=int, default=None, help='Máximo de números en común entre dos cartones de un juego')
+    parser.add_argument('--codigo', action='store_true', help='Código QR de reclamo en la celda libre, firmado con la clave de BINGO_CLAVE_RECLAMO')
+    parser.add_argument('--cartones', type=int, default=180, help='Cartones por juego (la última hoja se completa)')
+    parser.add_argument('--papel', choices=tuple(PAPELES) + ('auto',), default='letter', help='Papel de las hojas; auto elige el que necesite menos hojas')
+    parser.add_argument('--por-hoja', type=int, default=None, help='Cartones por hoja (por defecto, todos los que quepan con --min-lado)')
+    parser.add_argument('--min-lado', type=float, default=MIN_LADO_MM, help='Lado mínimo de cada cartón en mm')
+    parser.add_argument('--hilos', type=int, default=None, help='Tubería en un solo proceso: dibujar, codificar en HILOS hilos y escribir el PDF a la vez')
+    parser.add_argument('--paleta', action='store_true', help='Dibujar las hojas en modo paleta: menos memoria por hoja, no más rápido (se expanden a RGB para el JPEG)')
+    parser.add_argument('--instrumentar', action='store_true', help='Medir el tiempo de cada etapa y mostrar un resumen al final')
+    parser.add_argument('--perfil', action='store_true', help='Con --instrumentar, incluir el perfil de cProfile del proceso principal')
+    parser.add_argument('--memoria', action='store_true', help='Con --instrumentar, medir la memoria con tracemalloc')
+    args = parser.parse_args()
+    if args.noventa and (args.vectorial or args.derivar):
+        parser.error('--noventa no se puede combinar con --vectorial ni con --derivar')
+    limites = (args.max_fila, args.max_columna, args.max_total)
+    dispersos = any(limite is not None for limite in limites)
+    if dispersos and (args.noventa or args.derivar):
+        parser.error('--max-fila, --max-columna y --max-total no se pueden combinar con --noventa ni con --derivar')
+    if args.codigo and (args.noventa or args.vectorial):
+        parser.error('--codigo no se puede combinar con --noventa ni con --vectorial')
+    if args.codigo:
+        # Los módulos de cada modo se cargan solo si se piden
+        from codigo_reclamo import VARIABLE_ENTORNO as VARIABLE_CLAVE_RECLAMO, qr_disponible
+    if args.codigo and not qr_disponible():
+        parser.error('--codigo necesita el paquete qrcode (pip install qrcode)')
+    if args.cartones < 1:
+        parser.error('--cartones debe ser al menos 1')
+    if args.reimprimir and (not args.derivar or args.semilla is None):
+        # Sin la semilla original la hoja saldría con otros cartones bajo los mismos seriales
+        parser.error('--reimprimir requiere --derivar y la --semilla de la impresión original')
+    if args.noventa and (args.papel == 'auto' or args.por_hoja is not None):
+        parser.error('--noventa usa una hoja vertical con tiras fijas: elija un --papel y no use --por-hoja')
+
+    import instrumentacion
+    if args.instrumentar or args.perfil or args.memoria:
+        instrumentacion.activar(perfil=args.perfil, memoria=args.memoria)
     
     logging.basicConfig(format='%(asctime)s %(message)s', level=logging.INFO)
 
-    CANTIDAD_DESEADA_CARTONES_POR_HOJA = 6 # Puedes cambiar esta cantidad
-    CANTIDAD_TOTAL_CARTONES = 180
-    total_hojas = int(CANTIDAD_TOTAL_CARTONES/CANTIDAD_DESEADA_CARTONES_POR_HOJA)
-    paper_size = 'letter'
-    cols, rows = calc_sizes(CANTIDAD_DESEADA_CARTONES_POR_HOJA, paper_size)
-    series = list(string.ascii_uppercase)
-    #          0,   1,   2,   3,   4,   5,   6,   7,   8,   9,   10,  11,  12
-    series = ['L', 'T', 'U', 'A', 'M', 'N', 'O', 'C', 'H', 'X', 'Z', 'E', 'I']
-    series.append('Ɔ')  #13
-    series.append('W')  #14
-    series.append('F')  #15
+    if args.noventa:
+        cols, rows = calc_sizes(6, args.papel)
+        CANTIDAD_DESEADA_CARTONES_POR_HOJA = 6
+        pagesize = PAPELES[args.papel][1]
+    else:
+        # El plan con menos hojas para la corrida; sin --por-hoja, tantos cartones como quepan
+        papeles = tuple(PAPELES) if args.papel == 'auto' else (args.papel,)
+        try:
+            plan = planificar_hojas(args.cartones, args.por_hoja, papeles, min_lado_mm=args.min_lado)
+        except ValueError as e:
+            parser.error(str(e))
+        logging.info(f"Plan de impresión: {formatear_plan(plan)}")
+        cols, rows = aplicar_plan(plan)
+        CANTIDAD_DESEADA_CARTONES_POR_HOJA = plan.por_hoja
+        pagesize = plan.pagesize
+    total_hojas = -(-args.cartones // CANTIDAD_DESEADA_CARTONES_POR_HOJA)
+    CANTIDAD_TOTAL_CARTONES = total_hojas * CANTIDAD_DESEADA_CARTONES_POR_HOJA
+    if dispersos:
+        from cartones_dispersos import construir_cartones_dispersos, formatear_informe, revisar_limites
+        # Antes de tocar el manifiesto o el registro: hay límites que ninguna corrida alcanza
+        try:
+            revisar_limites(CANTIDAD_TOTAL_CARTONES, *limites)
+        except ValueError as e:
+            parser.error(str(e))
+    series = list(SERIES_JUEGOS)
+    manifiesto = ManifiestoImpresion(args.manifiesto)
+    if args.desde_cero:
+        manifiesto.juegos = {}
+        manifiesto.semilla = None
+    if args.semilla is None:
+        # Sin semilla los cartones cambiarían en cada corrida y el manifiesto nunca
+        # podría omitir un juego ni retomar hojas: se guarda la de la primera corrida.
+        args.semilla = manifiesto.semilla
+        if args.semilla is None:
+            args.semilla = int(np.random.SeedSequence().entropy) & 0xFFFFFFFFFFFFFFFF
+            print(f"Semilla de la impresión (guárdela para poder reimprimir): {args.semilla}")
+        else:
+            print(f"Semilla de la impresión (del manifiesto {args.manifiesto}): {args.semilla}")
+    if not args.reimprimir and manifiesto.semilla != args.semilla:
+        manifiesto.semilla = args.semilla
+        manifiesto.guardar()
+    if args.codigo and not os.environ.get(VARIABLE_CLAVE_RECLAMO):
+        # En el entorno para que la hereden los procesos del pool
+        import secrets
+        os.environ[VARIABLE_CLAVE_RECLAMO] = secrets.token_hex(16)
+        print(f"Clave de los códigos de reclamo (guárdela en {VARIABLE_CLAVE_RECLAMO} para verificar): {os.environ[VARIABLE_CLAVE_RECLAMO]}")
+    if args.reimprimir:
+        num_juego, num_hoja = args.reimprimir
+        color = COLORS_ARRAY[num_juego - 1]
+        cartones = cartones_hoja_derivados(args.semilla, num_juego, series[num_juego - 1], num_hoja, CANTIDAD_DESEADA_CARTONES_POR_HOJA)
+        generar_hoja_bingo_jpg(len(cartones), serie_carton=series[num_juego - 1], num_hoja=num_hoja, num_juego=num_juego,
+                               config=configuracion_actual(cols, rows, border_color=color, paleta=args.paleta, codigo=args.codigo), cartones=cartones)
+        raise SystemExit(0)
+
     num_juego = 1
-    for color in COLORS_ARRAY:
-        BORDER_COLOR = color
-
-        serial = series.pop(0)
-        worksheet = []
-        for num_hoja in range(1,total_hojas+1):
-            sheet = generar_hoja_bingo_jpg(CANTIDAD_DESEADA_CARTONES_POR_HOJA, cols, rows, serie_carton=serial, num_hoja=num_hoja, num_juego = num_juego)
-            worksheet.append(sheet)
-        nombre_juego = ("0" + str(num_juego))[-2:]
-        carton_filename = f"cartones_juego_{nombre_juego}_{serial}_{BORDER_COLOR}.pdf"
-        pngs_a_pdf_carta(worksheet, carton_filename, letter)
-        num_juego = num_juego + 1
-        #break
+    # Los cartones se generan aquí, en orden y con una sola secuencia aleatoria,
+    # para que la misma semilla produzca los mismos cartones con cualquier cantidad de procesos
+    rng = np.random.default_rng(args.semilla)
+    juegos = []
+    if args.noventa:
+        # Tiras de 90 bolas, TIRAS_POR_HOJA por hoja. No van al registro, que guarda cartones de 75.
+        from tiras_bingo90 import BOLETOS_POR_TIRA, COLUMNAS_BOLETO, FILAS_BOLETO, generar_tiras
+        for num_juego, (color, serial) in enumerate(zip(COLORS_ARRAY, series), start=1):
+            config = configuracion_actual(cols, rows, border_color=color, paleta=args.paleta)
+            tiras = generar_tiras(total_hojas * TIRAS_POR_HOJA, rng)
+            hojas = tiras.reshape(total_hojas, TIRAS_POR_HOJA, BOLETOS_POR_TIRA, FILAS_BOLETO, COLUMNAS_BOLETO)
+            juegos.append((config, serial, num_juego, hojas, f"tiras90_juego_{('0' + str(num_juego))[-2:]}_{serial}_{color}.pdf"))
+    else:
+        from cartones_unicos import IndiceCartones, generar_cartones_unicos
+        # Un solo índice para toda la impresión: ningún cartón se repite entre juegos ni series
+        indice = IndiceCartones(capacidad=CANTIDAD_TOTAL_CARTONES * len(COLORS_ARRAY))
+        registro = EscritorRegistro(args.registro)
+        for color in COLORS_ARRAY:
+            config = configuracion_actual(cols, rows, border_color=color, paleta=args.paleta, codigo=args.codigo)
+
+            serial = series.pop(0)
+            nombre_juego = ("0" + str(num_juego))[-2:]
+            if args.derivar:
+                # Los cartones derivados no se pueden volver a sortear sin romper el
+                # serial; una repetición (muy improbable) obliga a cambiar la semilla.
+                cartones = derivar_cartones(args.semilla, num_juego, serial, range(1, CANTIDAD_TOTAL_CARTONES + 1))
+                if not indice.agregar_cartones(cartones).all():
+                    raise SystemExit(f"La semilla {args.semilla} produce cartones repetidos en el juego {num_juego}; use otra semilla.")
+            elif dispersos:
+                cantidad = CANTIDAD_TOTAL_CARTONES
+                cartones, informe = construir_cartones_dispersos(cantidad, *limites, indice=indice, rng=rng)
+                logging.info(f"Juego {num_juego}: {formatear_informe(informe)}")
+                if len(cartones) < cantidad:
+                    raise SystemExit(f"No se pudieron armar {cantidad} cartones con esos límites en el juego {num_juego}; afloje alguno.")
+            else:
+                cartones = generar_cartones_unicos(CANTIDAD_TOTAL_CARTONES, indice, rng)
+            hojas = cartones.reshape(total_hojas, CANTIDAD_DESEADA_CARTONES_POR_HOJA, 5, 5)
+            carton_filename = f"cartones_juego_{nombre_juego}_{serial}_{color}.pdf"
+            juegos.append((config, serial, num_juego, hojas, carton_filename))
+            registro.agregar(num_juego, serial, cartones)
+            num_juego = num_juego + 1
+        registro.cerrar()
+
+    max_bytes = int(args.max_mb * 2**20) if args.max_mb else None
+    renderizar_juegos(juegos, workers=args.workers, pagesize=pagesize, en_memoria=not args.en_disco, vectorial=args.vectorial,
+                      max_paginas=args.max_paginas, max_bytes=max_bytes, manifiesto=manifiesto, hilos=args.hilos)
+
+    if instrumentacion.activa():
+        print(instrumentacion.informe())
@@ -0,0 +1,185 @@
+import os
+
+from PIL import ImageColor
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from reportlab.lib.colors import Color
+
+from carton_bingo import (
+    BACKGROUND_COLOR, COLUMNAS, FREE_SPACE_COLOR, FREE_SPACE_TEXT_COLOR, GRID_COLOR,
+    LOGO_PATH, SIGN_TEXT, TEXT_COLOR, fuente, geometria_carton, offsets_hoja, pen_colour_map,
+    posiciones_numeros,
+)
+from consolida_pdf import letter, nombre_volumen
+from instrumentacion import contar, etapa
+
+# Backend vectorial: dibuja los cartones directamente con primitivas de reportlab
+# (rectángulos, líneas y texto con fuentes TrueType incrustadas) en lugar de
+# rasterizar la hoja. Se trabaja en las mismas unidades (píxeles a DPI) y con las
+# mismas posiciones que dibujar_carton, así el diseño es idéntico.
+
+
+def _color(nombre):
+    r, g, b = ImageColor.getrgb(nombre)[:3]
+    return Color(r / 255, g / 255, b / 255)
+
+def _nombre_fuente_pdf(font):
+    """Registra en reportlab la fuente TrueType de una fuente de PIL y devuelve su nombre."""
+    path = getattr(font, 'path', None)
+    if path is None:
+        return 'Helvetica'
+    nombre = 'Bingo-' + os.path.splitext(os.path.basename(path))[0]
+    if nombre not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(nombre, path))
+    return nombre
+
+def _texto(c, x, y, texto, font, color, alto):
+    """
+    Escribe `texto` con su origen en (x, y) medido como en PIL (esquina superior
+    izquierda, eje y hacia abajo) dentro de un área de `alto` píxeles.
+    """
+    ascent = font.getmetrics()[0]
+    c.setFont(_nombre_fuente_pdf(font), getattr(font, 'size', 10))
+    c.setFillColor(_color(color))
+    c.drawString(x, alto - (y + ascent), texto)
+
+def _rect(c, caja, alto, color):
+    x0, y0, x1, y1 = caja
+    c.setFillColor(_color(color))
+    c.rect(x0, alto - y1, x1 - x0, y1 - y0, stroke=0, fill=1)
+
+def preparar_logo_pdf(c, config):
+    """
+    Define el logo de la celda central como un form XObject reutilizable.
+    Devuelve su nombre, o None si no existe el archivo del logo.
+    """
+    if not os.path.exists(LOGO_PATH):
+        return None
+    _, _, _, cell_width, cell_height = geometria_carton(config.card_width_px, config.card_height_px)
+    ancho, alto = int(cell_width - 6), int(cell_height - 6)
+    nombre = f'logo_{ancho}x{alto}'
+    c.beginForm(nombre, 0, 0, ancho, alto)
+    c.drawImage(LOGO_PATH, 0, 0, ancho, alto, mask='auto')
+    c.endForm()
+    return nombre
+
+def dibujar_carton_pdf(c, carton, config, num_juego=0, serie='A', card_id=0, logo=None):
+    """
+    Dibuja un cartón con primitivas vectoriales. El origen del canvas debe estar
+    en la esquina inferior izquierda del cartón, en unidades de píxel.
+    """
+    card_width, card_height, border_color = config.card_width_px, config.card_height_px, config.border_color
+    BORDER_THICKNESS, _, inner_rect, cell_width, cell_height = geometria_carton(card_width, card_height)
+    pen_color = pen_colour_map[border_color]
+    font_header, font_numeros = fuente('FONT_HEADER'), fuente('FONT_NUMBERS')
+
+    # Borde y franja superior, luego el área blanca interior
+    _rect(c, (0, 0, card_width, card_height), card_height, border_color)
+    _rect(c, inner_rect, card_height, BACKGROUND_COLOR)
+
+    # Firma CPA
+    _texto(c, BORDER_THICKNESS, card_height - BORDER_THICKNESS + 5, SIGN_TEXT, fuente('FONT_SIGN'), pen_color, card_height)
+
+    # Encabezado B I N G O
+    for col, letra in enumerate(COLUMNAS):
+        x1 = inner_rect[0] + col * cell_width
+        y1 = inner_rect[1] - cell_height
+        text_bbox = font_header.getbbox(letra)
+        text_width = text_bbox[2] - text_bbox[0]
+        text_height = text_bbox[3] - text_bbox[1]
+        _texto(c, x1 + (cell_width - text_width) / 2, y1 + (cell_height - text_height) / 2, letra, font_header, pen_color, card_height)
+
+    # Serial
+    str_num_juego = ('0'+str(num_juego))[-2:]
+    num_serial = f"{card_id:03d}"
+    serial = 'Juego ' + str_num_juego + ' - Letra: ' + serie + ' - Carton: ' + num_serial
+    _texto(c, inner_rect[0] + cell_width / 2, inner_rect[1] - cell_height, serial, fuente('FONT_SERIAL'), pen_color, card_height)
+
+    # Celda central: logo o "Libre"
+    x1 = inner_rect[0] + 2 * cell_width
+    y1 = inner_rect[1] + 2 * cell_height
+    if logo is not None:
+        c.saveState()
+        c.translate(int(x1 + 3), card_height - int(y1 + 3) - int(cell_height - 6))
+        c.doForm(logo)
+        c.restoreState()
+    else:
+        _rect(c, (x1, y1, x1 + cell_width, y1 + cell_height), card_height, FREE_SPACE_COLOR)
+        font_libre = fuente('FONT_FREE')
+        text_bbox = font_libre.getbbox("Libre")
+        text_width = text_bbox[2] - text_bbox[0]
+        text_height = text_bbox[3] - text_bbox[1]
+        _texto(c, x1 + (cell_width - text_width) / 2, y1 + (cell_height - text_height) / 2, "Libre", font_libre, FREE_SPACE_TEXT_COLOR, card_height)
+
+    # Cuadrícula de 5x5
+    c.setStrokeColor(_color(GRID_COLOR))
+    c.setLineWidth(1)
+    c.grid(
+        [inner_rect[0] + i * cell_width for i in range(6)],
+        [card_height - (inner_rect[1] + i * cell_height) for i in range(6)]
+    )
+
+    # Números, en las mismas posiciones que el backend rasterizado
+    posiciones = posiciones_numeros(card_width, card_height, font_numeros)
+    ascent = font_numeros.getmetrics()[0]
+    c.setFont(_nombre_fuente_pdf(font_numeros), getattr(font_numeros, 'size', 10))
+    c.setFillColor(_color(TEXT_COLOR))
+    for r, fila in enumerate(carton.tolist()):
+        for numero in fila:
+            if numero == 0:
+                continue
+            x, y = posiciones[r][numero]
+            c.drawString(x, card_height - (y + ascent), str(numero))
+
+def generar_pdf_vectorial(juego, pagesize=letter, max_paginas=None):
+    """
+    Genera el PDF vectorial de un juego. `juego` es una tupla
+    (config, serie, num_juego, hojas, nombre_pdf) como en render_paralelo.
+    La hoja se escala y centra en la página igual que en pngs_a_pdf_carta.
+    Con `max_paginas` el PDF se parte en volúmenes (nombre_vol01.pdf, ...).
+    Devuelve la lista de archivos escritos.
+    """
+    config, serie, num_juego, hojas, nombre_pdf = juego
+    ancho_pagina, alto_pagina = pagesize
+
+    # Escala de píxeles de la hoja a puntos del PDF
+    escala = min(ancho_pagina / config.page_width_px, alto_pagina / config.page_height_px)
+    x_centrado = (ancho_pagina - config.page_width_px * escala) / 2
+    y_centrado = (alto_pagina - config.page_height_px * escala) / 2
+
+    offsets = offsets_hoja(config)
+    c = None
+    archivos = []
+    for num_hoja, cartones in enumerate(hojas, start=1):
+        if c is not None and max_paginas and c.getPageNumber() > max_paginas:
+            with etapa('pdf_guardado'):
+                c.save()
+            print(f"📄 Volumen listo para imprimir: {nombre}")
+            c = None
+        if c is None:
+            nombre = nombre_volumen(nombre_pdf, len(archivos) + 1) if max_paginas else nombre_pdf
+            c = canvas.Canvas(nombre, pagesize=pagesize)
+            archivos.append(nombre)
+            logo = preparar_logo_pdf(c, config)
+
+        with etapa('pdf_pagina'):
+            c.saveState()
+            c.translate(x_centrado, y_centrado)
+            c.scale(escala, escala)
+            for i, (carton, (x_offset, y_offset)) in enumerate(zip(cartones, offsets)):
+                c.saveState()
+                c.translate(x_offset, config.page_height_px - y_offset - config.card_height_px)
+                dibujar_carton_pdf(c, carton, config, num_juego, serie, (num_hoja-1)*len(cartones) + i + 1, logo)
+                c.restoreState()
+            c.restoreState()
+            c.showPage()
+        contar('paginas_pdf')
+
+    if c is None:
+        c = canvas.Canvas(nombre_pdf, pagesize=pagesize)
+        archivos.append(nombre_pdf)
+    with etapa('pdf_guardado'):
+        c.save()
+    print(f"\n✨ ¡PDF vectorial creado con éxito! Nombre del archivo: **{nombre_pdf}**")
+    return archivos
@@ -0,0 +1,399 @@
+import argparse
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import combinations
+from math import ceil, comb
+
+import numpy as np
+
+from cartones_unicos import mascaras_cartones
+from generar_numeros_carton import generar_cartones_lote
+from instrumentacion import contar, etapa
+
+# Conjuntos de cartones con poco solapamiento, para que un mismo número no complete
+# a la vez las líneas de muchos cartones (y con ellas, muchos reclamos simultáneos).
+#
+# Límites opcionales sobre cada par de cartones del conjunto:
+#  - fila: números en común entre una fila de uno y una fila cualquiera del otro;
+#  - columna: números en común entre la misma columna de ambos (B con B, ...);
+#  - total: números en común en todo el cartón.
+# Dos cartones con los mismos números nunca se aceptan.
+#
+# Los candidatos salen de generar_cartones_lote y se aceptan o descartan uno a uno
+# con dos índices, sin compararlos con todo el conjunto:
+#  - Claves de línea: "a lo más k en común por fila" equivale a que ningún
+#    subconjunto de k+1 números de una fila esté en dos cartones; cada subconjunto
+#    es una clave entera en un set, y un candidato solo consulta las suyas (unas 50).
+#    Igual para las columnas.
+#  - Apariciones por número: para cada número, los cartones que lo tienen. Los
+#    números en común de un candidato con cada cartón salen de un np.bincount sobre
+#    las listas de sus 24 números, que recorren solo los cartones que comparten algo.
+#
+# Con límite 3 por fila los candidatos no salen al azar sino de familia_filas, que
+# arma directamente el máximo de cartones posible con ese límite; al azar no se
+# pasa de unos dos tercios. Los límites por debajo de cotas_solapamiento se
+# rechazan antes de empezar.
+
+# Celdas de cada fila y columna, sin el centro libre
+_FILAS = [[5 * fila + columna for columna in range(5) if (fila, columna) != (2, 2)] for fila in range(5)]
+_COLUMNAS = [[5 * fila + columna for fila in range(5) if (fila, columna) != (2, 2)] for columna in range(5)]
+_CELDAS_NUMERO = np.array([celda for celda in range(25) if celda != 12])
+TIPOS_LINEA = ('fila', 'columna')
+_UNIDADES_15 = np.array([1, 2, 4, 7, 8, 11, 13, 14])  # coprimos con 15
+
+@lru_cache(maxsize=None)
+def _subconjuntos(tipo, tamano):
+    """Celdas (K, tamano) de cada subconjunto de `tamano` celdas de una misma fila o columna."""
+    lineas = _FILAS if tipo == 'fila' else _COLUMNAS
+    return np.array([celdas for linea in lineas for celdas in combinations(linea, tamano)], dtype=np.intp).reshape(-1, tamano)
+
+@lru_cache(maxsize=None)
+def _subconjuntos_por_celda(tamanos):
+    """Subconjuntos de línea como (bit de tipo, ordenar, celdas): todos, y para cada celda los que la contienen."""
+    todos = [(int(tipo == 'columna'), tipo == 'columna', tuple(subconjunto))
+             for tipo, tamano in tamanos for subconjunto in _subconjuntos(tipo, tamano).tolist()]
+    por_celda = [[subconjunto for subconjunto in todos if celda in subconjunto[2]] for celda in range(25)]
+    return todos, por_celda
+
+def claves_lineas(cartones, tipo, tamano):
+    """
+    Clave entera (N, K) de cada subconjunto de `tamano` números de una misma fila o
+    columna: los números en orden creciente, 7 bits cada uno, y un bit para el tipo.
+    """
+    numeros = cartones.reshape(len(cartones), 25)[:, _subconjuntos(tipo, tamano)].astype(np.int64)
+    if tipo == 'columna':
+        # En una fila los números ya crecen de izquierda a derecha
+        numeros.sort(axis=2)
+    claves = np.zeros(numeros.shape[:2], dtype=np.int64)
+    for k in range(tamano):
+        claves = (claves << 7) | numeros[:, :, k]
+    return (claves << 1) | (tipo == 'columna')
+
+def solapamiento_lineas(cartones, tipo):
+    """Mayor cantidad de números en común en una fila (o columna) entre dos cartones distintos."""
+    for tamano in range(1, 6):
+        claves = claves_lineas(cartones, tipo, tamano).ravel()
+        if len(np.unique(claves)) == len(claves):
+            return tamano - 1
+    return 5
+
+def cotas_solapamiento(cantidad):
+    """
+    Límites más bajos que admite un conjunto de `cantidad` cartones, por conteo:
+    con límite k cada cartón ocupa claves de k+1 números que nadie más puede usar,
+    y no hay más que las que caben en cada línea. En las filas además las 5 filas
+    de todos los cartones, vistas en k+1 columnas fijas sin la N, deben ser
+    distintas: a lo más 15^(k+1) / 5 cartones. Para el total, el promedio de
+    números en común entre pares con los números repartidos lo más parejo posible.
+    Son cotas inferiores: el constructor solo alcanza exactamente la de fila 3.
+    """
+    cotas = {}
+    for tipo in TIPOS_LINEA:
+        cotas[tipo] = 5
+        for limite in range(5):
+            tamano = limite + 1
+            if tipo == 'fila':
+                usadas, disponibles = 4 * comb(5, tamano) + comb(4, tamano), comb(5, tamano) * 15 ** tamano
+                if tamano < 5 and 5 * cantidad > 15 ** tamano:
+                    continue
+            else:
+                usadas, disponibles = comb(5, tamano), comb(15, tamano)
+            if cantidad * usadas <= disponibles:
+                cotas[tipo] = limite
+                break
+    pares = 0
+    for por_carton in (5, 5, 4, 5, 5):
+        q, r = divmod(cantidad * por_carton, 15)
+        pares += r * comb(q + 1, 2) + (15 - r) * comb(q, 2)
+    cotas['total'] = ceil(pares / comb(cantidad, 2)) if cantidad > 1 else 0
+    return cotas
+
+def revisar_limites(cantidad, max_fila=None, max_columna=None, max_total=None):
+    """Lanza ValueError si algún límite está por debajo de su cota para `cantidad` cartones."""
+    cotas = cotas_solapamiento(cantidad)
+    bajos = [f"{tipo} {limite} (mínimo {cotas[tipo]})"
+             for tipo, limite in (('fila', max_fila), ('columna', max_columna), ('total', max_total))
+             if limite is not None and limite < cotas[tipo]]
+    if bajos:
+        raise ValueError(f"{cantidad:,} cartones no caben con esos límites: {', '.join(bajos)}")
+
+def familia_filas(rng=None):
+    """
+    Los 10.125 cartones (10125, 5, 5) de una familia al azar en que dos filas
+    cualesquiera, de cartones distintos o del mismo, comparten a lo más 3 números.
+
+    Una fila es una palabra de 5 símbolos 0-14 (la posición del número en el rango
+    de su columna), y el límite pide que dos filas coincidan en a lo más 3
+    posiciones. Las 15^4 palabras de suma múltiplo de 15 lo cumplen, porque 4
+    posiciones fijan la quinta. Con v un vector de unidades módulo 15 de suma 0,
+    cada clase w + t·v (t = 0..14) se parte en 3 cartones de 5 palabras, que con t
+    distintos difieren en todas las posiciones: las columnas no repiten números. La fila del centro pierde su N, pero su palabra no la usa otro cartón.
+    Salen 15^4 / 5 cartones, justo la cota de cotas_solapamiento. Cada columna se
+    permuta al azar, igual que las filas de cada cartón y el orden de los cartones.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    while True:
+        v = rng.choice(_UNIDADES_15, size=4)
+        if -v.sum() % 15 in _UNIDADES_15:
+            break
+    v = np.append(v, -v.sum() % 15)
+    # Un representante por clase: el de primer símbolo 0 (v[0] es invertible)
+    b, c, d = np.indices((15, 15, 15)).reshape(3, -1)
+    representantes = np.stack([np.zeros_like(b), b, c, d, -(b + c + d) % 15], axis=1)
+    # Cualquier reparto de los 15 valores de t en 3 grupos sirve: con t consecutivos
+    # cada columna tendría solo 15 conjuntos posibles y los cartones se parecerían
+    t = rng.random((len(representantes), 15)).argsort(axis=1)
+    palabras = ((representantes[:, None, :] + t[:, :, None] * v) % 15).reshape(-1, 5, 5)
+    orden = rng.random(palabras.shape[:2]).argsort(axis=1)
+    palabras = np.take_along_axis(palabras, orden[:, :, None], axis=1)
+    permutaciones = rng.random((5, 15)).argsort(axis=1)
+    cartones = (permutaciones[np.arange(5), palabras] + 15 * np.arange(5) + 1).astype(np.uint8)
+    cartones[:, 2, 2] = 0
+    return cartones[rng.permutation(len(cartones))]
+
+
+class IndiceSolapamiento:
+    """
+    Conjunto de cartones que respetan los límites de números en común por fila,
+    por columna y en total. agregar_cartones acepta de un lote solo los que caben.
+    """
+
+    def __init__(self, max_fila=None, max_columna=None, max_total=None, capacidad=1 << 12):
+        self.limites = {'fila': max_fila, 'columna': max_columna, 'total': max_total}
+        # Con límite 5 o más no hay nada que revisar en las líneas
+        self._tamanos = [(tipo, limite + 1) for tipo, limite in (('fila', max_fila), ('columna', max_columna))
+                         if limite is not None and limite < 5]
+        self._claves = set()
+        # Apariciones: fila n con los cartones (índice + 1, 0 = vacío) que tienen el número n
+        self._apariciones = np.zeros((76, max(capacidad, 16)), dtype=np.int32)
+        self._largos = np.zeros(76, dtype=np.int64)
+        self._cartones = np.zeros((max(capacidad, 16), 5, 5), dtype=np.uint8)
+        self._cantidad = 0
+        self.max_total = 0  # mayor cantidad de números en común vista entre dos cartones
+
+    def __len__(self):
+        return self._cantidad
+
+    @property
+    def cartones(self):
+        """Los cartones aceptados, en orden, como arreglo (n, 5, 5)."""
+        return self._cartones[:self._cantidad]
+
+    def _crecer(self):
+        capacidad = 2 * len(self._cartones)
+        apariciones = np.zeros((76, capacidad), dtype=np.int32)
+        apariciones[:, :self._apariciones.shape[1]] = self._apariciones
+        cartones = np.zeros((capacidad, 5, 5), dtype=np.uint8)
+        cartones[:self._cantidad] = self.cartones
+        self._apariciones, self._cartones = apariciones, cartones
+
+    def comunes(self, numeros):
+        """Números en común de un cartón (sus 24 números) con cada cartón del conjunto."""
+        largo = self._largos[numeros].max()
+        apariciones = self._apariciones[numeros, :largo].ravel()
+        return np.bincount(apariciones, minlength=self._cantidad + 1)[1:]
+
+    def agregar_cartones(self, cartones, cupo=None):
+        """
+        Recorre un lote (N, 5, 5) y agrega, en orden, cada cartón que respeta los
+        límites con todos los ya aceptados (incluidos los del mismo lote), hasta
+        `cupo` cartones. Devuelve un arreglo bool con True en los agregados.
+        """
+        cartones = np.asarray(cartones, dtype=np.uint8).reshape(-1, 5, 5)
+        aceptados = np.zeros(len(cartones), dtype=bool)
+        if self._tamanos:
+            claves = np.concatenate([claves_lineas(cartones, tipo, tamano) for tipo, tamano in self._tamanos], axis=1).tolist()
+        else:
+            claves = [()] * len(cartones)
+        numeros = cartones.reshape(len(cartones), 25)[:, _CELDAS_NUMERO].astype(np.intp)
+        limite_total = self.limites['total']
+        cupo = len(cartones) if cupo is None else cupo
+
+        for i, claves_carton in enumerate(claves):
+            if cupo <= 0:
+                break
+            if not self._claves.isdisjoint(claves_carton):
+                continue
+            comunes = self.comunes(numeros[i])
+            maximo = int(comunes.max()) if len(comunes) else 0
+            if maximo == len(_CELDAS_NUMERO) or (limite_total is not None and maximo > limite_total):
+                continue
+
+            if self._cantidad == len(self._cartones):
+                self._crecer()
+            self._claves.update(claves_carton)
+            self._apariciones[numeros[i], self._largos[numeros[i]]] = self._cantidad + 1
+            self._largos[numeros[i]] += 1
+            self._cartones[self._cantidad] = cartones[i]
+            self._cantidad += 1
+            self.max_total = max(self.max_total, maximo)
+            aceptados[i] = True
+            cupo -= 1
+        return aceptados
+
+    def reparar(self, carton, rng, intentos=4):
+        """
+        Intenta que un cartón rechazado por las claves de línea quepa, con una búsqueda
+        de mínimos conflictos: la celda que está en más claves ya usadas pasa a tener el
+        número libre de su columna con menos choques, hasta `intentos` veces.
+        Devuelve el cartón corregido (sin agregarlo) o None.
+        """
+        # Un cartón a la vez: en Python puro sale más barato que con arreglos de numpy
+        celdas = np.asarray(carton, dtype=np.uint8).reshape(25).tolist()
+        todos, por_celda = _subconjuntos_por_celda(tuple(self._tamanos))
+        usadas = self._claves
+
+        def usada(bit, ordenar, subconjunto):
+            numeros = [celdas[celda] for celda in subconjunto]
+            clave = 0
+            for numero in sorted(numeros) if ordenar else numeros:
+                clave = (clave << 7) | numero
+            return (clave << 1) | bit in usadas
+
+        for _ in range(intentos):
+            conflictos = [0] * 25
+            for subconjunto in todos:
+                if usada(*subconjunto):
+                    for celda in subconjunto[2]:
+                        conflictos[celda] += 1
+            peor = max(conflictos)
+            if not peor:
+                return np.array(celdas, dtype=np.uint8).reshape(5, 5)
+            candidatas = [celda for celda in range(25) if conflictos[celda] == peor]
+            celda = candidatas[int(rng.integers(len(candidatas)))]
+            minimo = 15 * (celda % 5) + 1
+            en_columna = {celdas[otra] for otra in _COLUMNAS[celda % 5]}
+            libres = [numero for numero in range(minimo, minimo + 15) if numero not in en_columna]
+            rng.shuffle(libres)
+            mejor, menos = celdas[celda], peor
+            for numero in libres:
+                celdas[celda] = numero
+                cantidad = sum(usada(*subconjunto) for subconjunto in por_celda[celda])
+                if cantidad < menos:
+                    mejor, menos = numero, cantidad
+                    if not cantidad:
+                        break
+            celdas[celda] = mejor
+        if not any(usada(*subconjunto) for subconjunto in todos):
+            return np.array(celdas, dtype=np.uint8).reshape(5, 5)
+        return None
+
+
+@dataclass
+class InformeSolapamiento:
+    """Resultado de construir_cartones_dispersos: límites pedidos, alcanzados y cotas."""
+    pedidos: int
+    construidos: int
+    candidatos: int
+    reparados: int   # aceptados después de cambiarles números (ver IndiceSolapamiento.reparar)
+    segundos: float
+    limites: dict
+    alcanzado: dict  # mayor cantidad real de números en común por fila, columna y total
+    cotas: dict      # cotas_solapamiento(pedidos)
+
+def formatear_informe(informe):
+    """Texto del informe: una línea por límite con lo pedido, lo alcanzado y la cota."""
+    lineas = [f"{informe.construidos:,} de {informe.pedidos:,} cartones con {informe.candidatos:,} candidatos "
+              f"({informe.reparados:,} reparados) en {informe.segundos:.2f} s"]
+    for tipo in TIPOS_LINEA + ('total',):
+        limite = informe.limites[tipo]
+        lineas.append(f"  {tipo:<8} límite {'-' if limite is None else limite:>2}   "
+                      f"alcanzado {informe.alcanzado[tipo]:>2}   cota {informe.cotas[tipo]:>2}")
+    return '\n'.join(lineas)
+
+def construir_cartones_dispersos(cantidad, max_fila=None, max_columna=None, max_total=None, indice=None, rng=None,
+                                 max_intentos=None, tamano_lote=1 << 12):
+    """
+    Construye hasta `cantidad` cartones donde cada par comparte a lo más `max_fila`
+    números en una fila, `max_columna` en una columna y `max_total` en todo el
+    cartón (None = sin límite). Con un IndiceCartones no se repite ninguno ya
+    registrado, y los construidos quedan agregados a él.
+    Se prueban a lo más `max_intentos` candidatos (por defecto 100 por cartón); si
+    los límites son demasiado estrictos se devuelven menos cartones. Con límite 3
+    por fila los primeros candidatos son los de familia_filas, sin reparaciones;
+    si con los otros límites no alcanzan, se sigue con candidatos al azar.
+    Lanza ValueError, sin construir nada, si un límite está bajo su cota.
+    Devuelve (cartones uint8 (n, 5, 5), InformeSolapamiento).
+    """
+    revisar_limites(cantidad, max_fila, max_columna, max_total)
+    if rng is None:
+        rng = np.random.default_rng()
+    if max_intentos is None:
+        max_intentos = 100 * cantidad
+
+    inicio = time.perf_counter()
+    conjunto = IndiceSolapamiento(max_fila, max_columna, max_total, capacidad=cantidad)
+    familia = familia_filas(rng) if max_fila == 3 else None
+    candidatos = reparados = ganados_antes = 0
+    with etapa('cartones_dispersos'):
+        while len(conjunto) < cantidad and candidatos < max_intentos:
+            de_familia = familia is not None and candidatos < len(familia)
+            if de_familia:
+                lote = familia[candidatos:candidatos + min(tamano_lote, max_intentos - candidatos)]
+            else:
+                lote = generar_cartones_lote(min(tamano_lote, max_intentos - candidatos), rng)
+            candidatos += len(lote)
+            antes = len(conjunto)
+            if indice is not None:
+                lote = lote[~indice.contiene_mascaras(*mascaras_cartones(lote))]
+            aceptados = conjunto.agregar_cartones(lote, cupo=cantidad - len(conjunto))
+            if conjunto._tamanos and not de_familia:
+                for intento, carton in enumerate(lote[~aceptados], start=1):
+                    if len(conjunto) == cantidad or (intento % 256 == 0 and len(conjunto) - antes < intento // 100):
+                        # Cuando casi ninguna reparación resulta, los límites están cerca de saturarse
+                        break
+                    carton = conjunto.reparar(carton, rng)
+                    if carton is not None and (indice is None or carton not in indice):
+                        reparados += int(conjunto.agregar_cartones(carton, cupo=1)[0])
+            if de_familia:
+                continue
+            ganados = len(conjunto) - antes
+            if not ganados:
+                # Un lote entero sin ningún cartón nuevo: los límites ya no dan para más
+                break
+            if 0 < ganados < ganados_antes:
+                # Al saturarse los límites lo que aporta cada lote cae casi en forma
+                # geométrica: si ni el doble de lo que promete esa caída alcanza, se
+                # para ahora en lugar de seguir muchos segundos para rendirse después
+                caida = ganados / ganados_antes
+                if len(conjunto) + 2 * ganados * caida / (1 - caida) < cantidad:
+                    break
+            ganados_antes = ganados
+        cartones = conjunto.cartones.copy()
+        if indice is not None:
+            indice.agregar_cartones(cartones)
+        alcanzado = {tipo: solapamiento_lineas(cartones, tipo) for tipo in TIPOS_LINEA}
+        alcanzado['total'] = conjunto.max_total
+    contar('cartones_dispersos', len(cartones))
+
+    informe = InformeSolapamiento(pedidos=cantidad, construidos=len(cartones), candidatos=candidatos, reparados=reparados,
+                                  segundos=time.perf_counter() - inicio, limites=dict(conjunto.limites),
+                                  alcanzado=alcanzado, cotas=cotas_solapamiento(cantidad))
+    return cartones, informe
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Construye un conjunto de cartones con poco solapamiento entre pares.')
+    parser.add_argument('--cantidad', type=int, default=10_000, help='Cartones del conjunto')
+    parser.add_argument('--max-fila', type=int, default=None, help='Números en común permitidos entre dos filas')
+    parser.add_argument('--max-columna', type=int, default=None, help='Números en común permitidos en una misma columna')
+    parser.add_argument('--max-total', type=int, default=None, help='Números en común permitidos en todo el cartón')
+    parser.add_argument('--intentos', type=int, default=None, help='Candidatos a probar (por defecto 100 por cartón)')
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--salida', default=None, help='Exportar el conjunto (CSV, JSONL, Parquet o Arrow según la extensión)')
+    parser.add_argument('--juego', type=int, default=1, help='Juego para el serial al exportar')
+    parser.add_argument('--serie', default='A', help='Serie para el serial al exportar')
+    args = parser.parse_args()
+
+    try:
+        cartones, informe = construir_cartones_dispersos(args.cantidad, args.max_fila, args.max_columna, args.max_total,
+                                                         rng=np.random.default_rng(args.semilla), max_intentos=args.intentos)
+    except ValueError as error:
+        parser.error(str(error))
+    print(formatear_informe(informe))
+    if args.salida:
+        from exportar_cartones import _formato_de, exportar
+        from registro_cartones import registros_cartones
+        exportar([registros_cartones(args.juego, args.serie, cartones)], args.salida, _formato_de(args.salida))
+        print(f"✅ Conjunto exportado a {args.salida}")
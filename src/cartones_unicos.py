@@ -0,0 +1,184 @@
+import numpy as np
+
+from generar_numeros_carton import RANGOS_BINGO, generar_cartones_lote
+
+# Codificación de cartones como enteros:
+#  - Máscara canónica: el número n (1-75) enciende el bit n-1. Identifica el
+#    conjunto de números del cartón sin importar su posición (75 bits).
+#  - Huella posicional: cada una de las 25 celdas guarda en 4 bits el
+#    desplazamiento del número dentro del rango de su columna (0-14); el centro
+#    libre vale 0. Permite reconstruir el cartón exacto (100 bits).
+# Las máscaras se manejan en dos palabras: bits 0-63 (lo, uint64) y 64-74 (hi, uint16).
+
+_BIT_LO = np.array([1 << (n - 1) if 1 <= n <= 64 else 0 for n in range(76)], dtype=np.uint64)
+_BIT_HI = np.array([1 << (n - 65) if n >= 65 else 0 for n in range(76)], dtype=np.uint16)
+_MINIMOS = np.array([min_val for min_val, _ in RANGOS_BINGO.values()], dtype=np.uint8)
+_DESPLAZAMIENTOS_HUELLA = (4 * np.arange(16)).astype(np.uint64)
+
+
+def mascaras_cartones(cartones):
+    """Máscaras canónicas de un lote (N, 5, 5). Devuelve (lo uint64, hi uint16)."""
+    numeros = cartones.reshape(len(cartones), 25)
+    lo = np.bitwise_or.reduce(_BIT_LO[numeros], axis=1)
+    hi = np.bitwise_or.reduce(_BIT_HI[numeros], axis=1)
+    return lo, hi
+
+
+def huellas_cartones(cartones):
+    """Huellas posicionales de un lote (N, 5, 5). Devuelve (lo, hi), ambos uint64."""
+    desplazamientos = np.where(cartones > 0, cartones - _MINIMOS, 0).astype(np.uint64)
+    desplazamientos = desplazamientos.reshape(len(cartones), 25)
+    lo = np.bitwise_or.reduce(desplazamientos[:, :16] << _DESPLAZAMIENTOS_HUELLA, axis=1)
+    hi = np.bitwise_or.reduce(desplazamientos[:, 16:] << _DESPLAZAMIENTOS_HUELLA[:9], axis=1)
+    return lo, hi
+
+
+def codificar_carton(carton):
+    """Devuelve (mascara, huella) de un cartón como enteros de Python."""
+    lote = np.asarray(carton, dtype=np.uint8).reshape(1, 5, 5)
+    m_lo, m_hi = mascaras_cartones(lote)
+    h_lo, h_hi = huellas_cartones(lote)
+    return int(m_lo[0]) | (int(m_hi[0]) << 64), int(h_lo[0]) | (int(h_hi[0]) << 64)
+
+
+def decodificar_huella(huella):
+    """Reconstruye el cartón 5x5 (uint8, 0 = espacio libre) a partir de su huella."""
+    carton = np.zeros((5, 5), dtype=np.uint8)
+    for celda in range(25):
+        fila, columna = divmod(celda, 5)
+        if fila == 2 and columna == 2:
+            continue
+        carton[fila, columna] = _MINIMOS[columna] + ((huella >> (4 * celda)) & 0xF)
+    return carton
+
+
+class IndiceCartones:
+    """
+    Índice hash de máscaras canónicas para rechazar cartones repetidos en O(1).
+
+    Es una tabla de direccionamiento abierto sobre arreglos NumPy (10 bytes por
+    ranura), de modo que un mismo índice puede abarcar todos los juegos y series
+    de una impresión con decenas de millones de cartones. Dos cartones con los
+    mismos números en distinto orden también se consideran repetidos.
+    """
+
+    _MULTIPLICADOR = np.uint64(0x9E3779B97F4A7C15)
+
+    def __init__(self, capacidad=1 << 16):
+        bits = max(4, int(capacidad * 2 - 1).bit_length())
+        self._bits = bits
+        self._lo = np.zeros(1 << bits, dtype=np.uint64)
+        self._hi = np.zeros(1 << bits, dtype=np.uint16)
+        self._cantidad = 0
+
+    def __len__(self):
+        return self._cantidad
+
+    def _ranuras(self, lo, hi):
+        claves = lo ^ (hi.astype(np.uint64) << np.uint64(48))
+        return ((claves * self._MULTIPLICADOR) >> np.uint64(64 - self._bits)).astype(np.int64)
+
+    def _crecer(self, necesarios):
+        lo_ocupados = self._lo[(self._lo != 0) | (self._hi != 0)]
+        hi_ocupados = self._hi[(self._lo != 0) | (self._hi != 0)]
+        self.__init__(capacidad=max(necesarios, len(self._lo)))
+        self.agregar_mascaras(lo_ocupados, hi_ocupados)
+
+    def contiene_mascaras(self, lo, hi):
+        """Indica, para cada máscara (lo, hi), si ya está en el índice."""
+        lo = np.asarray(lo, dtype=np.uint64)
+        hi = np.asarray(hi, dtype=np.uint16)
+        encontradas = np.zeros(len(lo), dtype=bool)
+        pendientes = np.arange(len(lo))
+        ranuras = self._ranuras(lo, hi)
+        limite = len(self._lo) - 1
+        while pendientes.size:
+            t_lo = self._lo[ranuras]
+            t_hi = self._hi[ranuras]
+            iguales = (t_lo == lo[pendientes]) & (t_hi == hi[pendientes])
+            vacias = (t_lo == 0) & (t_hi == 0)
+            encontradas[pendientes[iguales]] = True
+            seguir = ~(iguales | vacias)
+            pendientes = pendientes[seguir]
+            ranuras = (ranuras[seguir] + 1) & limite
+        return encontradas
+
+    def agregar_mascaras(self, lo, hi):
+        """
+        Agrega un lote de máscaras (lo, hi). Devuelve un arreglo bool con True
+        en las máscaras nuevas y False en las repetidas (contra el índice o
+        dentro del mismo lote, donde se conserva la primera aparición).
+        """
+        lo = np.asarray(lo, dtype=np.uint64)
+        hi = np.asarray(hi, dtype=np.uint16)
+        if (self._cantidad + len(lo)) * 2 > len(self._lo):
+            self._crecer(self._cantidad + len(lo))
+
+        nuevas = np.zeros(len(lo), dtype=bool)
+        pendientes = np.arange(len(lo))
+        ranuras = self._ranuras(lo, hi)
+        limite = len(self._lo) - 1
+        while pendientes.size:
+            t_lo = self._lo[ranuras]
+            t_hi = self._hi[ranuras]
+            vacias = (t_lo == 0) & (t_hi == 0)
+            iguales = (t_lo == lo[pendientes]) & (t_hi == hi[pendientes])
+
+            # Si varias máscaras llegan a la misma ranura vacía, gana la primera
+            # (orden por ranura y luego por posición); las demás la verán ocupada
+            # en la siguiente vuelta: si es la misma máscara quedan como repetidas,
+            # si no, siguen sondeando.
+            candidatas = np.flatnonzero(vacias)
+            orden = np.sort((ranuras[candidatas] << 32) | candidatas)
+            primera = np.ones(len(orden), dtype=bool)
+            primera[1:] = (orden[1:] >> 32) != (orden[:-1] >> 32)
+            ganadoras = orden[primera] & 0xFFFFFFFF
+            self._lo[ranuras[ganadoras]] = lo[pendientes[ganadoras]]
+            self._hi[ranuras[ganadoras]] = hi[pendientes[ganadoras]]
+            nuevas[pendientes[ganadoras]] = True
+
+            seguir = ~iguales
+            seguir[ganadoras] = False
+            ranuras = np.where(vacias, ranuras, (ranuras + 1) & limite)
+            pendientes = pendientes[seguir]
+            ranuras = ranuras[seguir]
+
+        self._cantidad += int(nuevas.sum())
+        return nuevas
+
+    def agregar_cartones(self, cartones):
+        """Agrega un lote (N, 5, 5) de cartones. Devuelve la máscara bool de los nuevos."""
+        return self.agregar_mascaras(*mascaras_cartones(cartones))
+
+    def agregar(self, carton):
+        """Agrega un solo cartón. Devuelve False si ya estaba en el índice."""
+        return bool(self.agregar_cartones(np.asarray(carton, dtype=np.uint8).reshape(1, 5, 5))[0])
+
+    def __contains__(self, carton):
+        lote = np.asarray(carton, dtype=np.uint8).reshape(1, 5, 5)
+        return bool(self.contiene_mascaras(*mascaras_cartones(lote))[0])
+
+
+def generar_cartones_unicos(cantidad, indice=None, rng=None, tamano_lote=1 << 20):
+    """
+    Genera `cantidad` cartones sin repetir ninguno de los ya registrados en `indice`
+    (ni entre ellos). Los cartones aceptados quedan agregados al índice.
+    Se generan por lotes de a lo más `tamano_lote` para acotar la memoria.
+    Devuelve un arreglo uint8 (cantidad, 5, 5).
+    """
+    if indice is None:
+        indice = IndiceCartones(capacidad=cantidad)
+    if rng is None:
+        rng = np.random.default_rng()
+
+    lotes = []
+    faltan = cantidad
+    while faltan > 0:
+        cartones = generar_cartones_lote(min(faltan, tamano_lote), rng)
+        cartones = cartones[indice.agregar_cartones(cartones)]
+        lotes.append(cartones)
+        faltan -= len(cartones)
+
+    if len(lotes) == 1:
+        return lotes[0]
+    return np.concatenate(lotes)
@@ -0,0 +1,136 @@
+import hashlib
+import hmac
+import os
+
+import numpy as np
+
+from generar_numeros_carton import RANGOS_BINGO
+from verificador import CELDA_LIBRE, PATRONES, patrones_completos
+
+# Código de reclamo: un QR en la celda libre de cada cartón para verificar
+# reclamos sin leer el serial ni comparar números a ojo.
+#
+# El contenido es texto en el alfabeto alfanumérico de QR (el modo más compacto
+# para este caso) con seis campos separados por ':':
+#   BG1:<juego>:<serie>:<cartón>:<huella>:<firma>
+# La serie va como su código Unicode (hay series fuera de A-Z), la huella es la
+# huella posicional del cartón (cartones_unicos, 25 dígitos hexadecimales) y la
+# firma los primeros 64 bits de un HMAC-SHA256 de todo lo anterior.
+# Como la huella trae los números, verificar no necesita el registro ni la
+# semilla: basta la clave de la impresión. La clave se lee de la variable de
+# entorno BINGO_CLAVE_RECLAMO, que heredan los procesos del pool; sin clave la
+# firma solo protege contra errores de lectura, no contra cartones falsificados.
+#
+# Los QR necesitan el paquete qrcode, que es opcional.
+
+VARIABLE_ENTORNO = 'BINGO_CLAVE_RECLAMO'
+PREFIJO = 'BG1'
+# Versión de QR fija (29x29 módulos): con corrección M admite 61 caracteres
+# alfanuméricos, que alcanzan para juegos de dos dígitos, series con código de
+# hasta tres dígitos y cartones de hasta cinco. Un código más largo usa la
+# versión que le quepa.
+VERSION_QR = 3
+CAPACIDAD_QR = 61
+
+# (celda, desplazamiento en la huella, mínimo de su columna) de las 24 celdas con número
+_MINIMOS = [minimo for minimo, _ in RANGOS_BINGO.values()]
+_CELDAS = [(celda, 4 * celda, _MINIMOS[celda % 5]) for celda in range(25) if celda != 12]
+
+def clave_reclamo():
+    """Clave de las firmas, de la variable de entorno (vacía si no está definida)."""
+    return os.environ.get(VARIABLE_ENTORNO, '').encode()
+
+def huella_clave(clave=None):
+    """Identificador corto de la clave, para saber si cambió sin guardarla."""
+    return hashlib.sha256(clave_reclamo() if clave is None else clave).hexdigest()[:16]
+
+def _firma(texto, clave):
+    return hmac.digest(clave, texto.encode(), 'sha256')[:8].hex().upper()
+
+def codigo_reclamo(num_juego, serie, card_id, carton, clave=None):
+    """Texto del código de reclamo de un cartón (arreglo 5x5, 0 = espacio libre)."""
+    celdas = np.asarray(carton).reshape(25).tolist()
+    huella = 0
+    for celda, desplazamiento, minimo in _CELDAS:
+        huella |= (celdas[celda] - minimo) << desplazamiento
+    texto = f"{PREFIJO}:{num_juego:02d}:{ord(serie)}:{card_id:03d}:{huella:025X}"
+    return f"{texto}:{_firma(texto, clave_reclamo() if clave is None else clave)}"
+
+def leer_codigo(codigo, clave=None):
+    """
+    Valida un código leído y devuelve (juego, serie, cartón, celdas), con las 25
+    celdas del cartón en una lista fila por fila (0 = espacio libre).
+    Lanza ValueError si el código está mal formado o la firma no coincide.
+    """
+    texto, _, firma = codigo.strip().upper().rpartition(':')
+    partes = texto.split(':')
+    if len(partes) != 5 or partes[0] != PREFIJO:
+        raise ValueError(f"Código de reclamo no reconocido: {codigo!r}")
+    if not hmac.compare_digest(firma, _firma(texto, clave_reclamo() if clave is None else clave)):
+        raise ValueError("La firma del código no coincide: el cartón fue alterado o es de otra impresión")
+    juego, serie, carton, huella = int(partes[1]), chr(int(partes[2])), int(partes[3]), int(partes[4], 16)
+    celdas = [0] * 25
+    for celda, desplazamiento, minimo in _CELDAS:
+        celdas[celda] = minimo + ((huella >> desplazamiento) & 0xF)
+    return juego, serie, carton, celdas
+
+def mascara_cantados(cantados):
+    """Números cantados como entero con el bit n encendido por cada número n."""
+    mascara = 0
+    for numero in cantados:
+        mascara |= 1 << int(numero)
+    return mascara
+
+def verificar_reclamo(codigo, cantados, clave=None, patrones=PATRONES):
+    """
+    Verifica un reclamo con el código leído del cartón y los números cantados
+    (iterable, o la máscara de mascara_cantados si se verifican muchos reclamos con
+    la misma lista). Todo es aritmética de enteros: unos microsegundos por reclamo.
+    Devuelve lo mismo que la ruta /verificar del servidor; ValueError si el código
+    no es auténtico.
+    """
+    juego, serie, carton_id, celdas = leer_codigo(codigo, clave)
+    if not isinstance(cantados, int):
+        cantados = mascara_cantados(cantados)
+    marcadas = CELDA_LIBRE
+    for celda, _, _ in _CELDAS:
+        if cantados >> celdas[celda] & 1:
+            marcadas |= 1 << celda
+    completos = patrones_completos(marcadas, patrones)
+    return {
+        'juego': juego, 'serie': serie, 'carton': carton_id,
+        'numeros': [celdas[fila:fila + 5] for fila in range(0, 25, 5)],
+        'marcadas': marcadas,
+        'patrones': list(completos),
+        'mascaras_ganadoras': completos,
+    }
+
+# --- QR ---
+
+def _qrcode():
+    try:
+        import qrcode
+    except ImportError:
+        raise ImportError("Los códigos de reclamo necesitan qrcode (pip install qrcode)") from None
+    return qrcode
+
+def qr_disponible():
+    """True si está instalado qrcode, para avisar antes de empezar a dibujar."""
+    try:
+        _qrcode()
+    except ImportError:
+        return False
+    return True
+
+def matriz_qr(codigo):
+    """Módulos del QR del código como arreglo bool (n, n), sin zona de silencio."""
+    qrcode = _qrcode()
+    # Con la máscara fija no se prueban las 8 para elegir la de menor penalización,
+    # que es lo que más cuesta; cualquiera de ellas da un QR válido. Con la versión
+    # fija tampoco se busca la menor en que quepa el código.
+    cabe = len(codigo) <= CAPACIDAD_QR
+    qr = qrcode.QRCode(version=VERSION_QR if cabe else None, error_correction=qrcode.constants.ERROR_CORRECT_M,
+                       border=0, mask_pattern=0)
+    qr.add_data(codigo)
+    qr.make(fit=not cabe)
+    return np.array(qr.get_matrix(), dtype=bool)
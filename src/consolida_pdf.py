@@ -1,24 +1,34 @@
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, legal
-from reportlab.lib.units import inch
 from PIL import Image
 
-from reportlab.lib.units import mm
-
+from io import BytesIO
 import os
 
+from instrumentacion import contar, etapa
+
+
+# Tamaños de página en puntos (los mismos valores de reportlab.lib.pagesizes).
+# Se definen aquí para no importar reportlab al cargar el módulo: el escritor
+# de PDF propio no lo necesita y solo pngs_a_pdf_carta lo usa.
+inch = 72.0
+mm = inch / 25.4
+letter = (8.5 * inch, 11 * inch)
+legal = (8.5 * inch, 14 * inch)
 
 # Oficio / Government Legal paper size
 OFICIO = (216 * mm, 330 * mm)
 
 def pngs_a_pdf_carta(lista_pngs, nombre_pdf_salida, pagesize):
     """
-    Consolida una lista de archivos PNG en un único PDF con tamaño de página Carta.
+    Consolida una lista de archivos PNG en un único PDF con páginas de tamaño
+    `pagesize` (en puntos). Borra los archivos que quedaron en el PDF.
     """
+    from reportlab.pdfgen import canvas
+
     # 1. Crear el objeto Canvas (lienzo) del PDF
     # letter es (8.5 * inch, 11 * inch) o (612, 792) puntos
     c = canvas.Canvas(nombre_pdf_salida, pagesize=pagesize)
-    ancho_pagina, alto_pagina = letter
+    ancho_pagina, alto_pagina = pagesize
+    agregados = []
 
     # 2. Procesar cada archivo PNG
     for i, ruta_png in enumerate(lista_pngs):
@@ -26,7 +36,7 @@ def pngs_a_pdf_carta(lista_pngs, nombre_pdf_salida, pagesize):
             # Abrir la imagen con PIL
             img = Image.open(ruta_png)
 
-            # --- Ajustar la imagen al tamaño de la página Carta ---
+            # --- Ajustar la imagen al tamaño de la página ---
             
             # Las coordenadas en ReportLab se miden desde la esquina inferior izquierda.
             
@@ -52,10 +62,13 @@ def pngs_a_pdf_carta(lista_pngs, nombre_pdf_salida, pagesize):
             
             # 3. Dibujar la imagen en el Canvas
             # c.drawImage(ruta_archivo, x, y, ancho, alto)
-            c.drawImage(ruta_png, x_centrado, y_centrado, nuevo_ancho, nuevo_alto)
-            
-            # 4. Pasar a la siguiente página (si no es el último archivo)
-            c.showPage()
+            with etapa('pdf_pagina'):
+                c.drawImage(ruta_png, x_centrado, y_centrado, nuevo_ancho, nuevo_alto)
+
+                # 4. Pasar a la siguiente página (si no es el último archivo)
+                c.showPage()
+            contar('paginas_pdf')
+            agregados.append(ruta_png)
             
             print(f"✅ Agregada página {i+1}: {ruta_png}")
             
@@ -65,12 +78,165 @@ def pngs_a_pdf_carta(lista_pngs, nombre_pdf_salida, pagesize):
             print(f"❌ Error al procesar {ruta_png}: {e}")
 
     # 5. Guardar el PDF final
-    c.save()
+    with etapa('pdf_guardado'):
+        c.save()
     print(f"\n✨ ¡PDF creado con éxito! Nombre del archivo: **{nombre_pdf_salida}**")
 
-    for i, ruta_png in enumerate(lista_pngs):
+    # Los que fallaron se conservan para revisarlos
+    for ruta_png in agregados:
         os.remove(ruta_png)
 
+def codificar_jpeg(img, calidad=90, dpi=300):
+    """Codifica una imagen PIL como JPEG en memoria y devuelve los bytes."""
+    buffer = BytesIO()
+    with etapa('codificacion_jpeg'):
+        if img.mode == 'P':  # JPEG no admite paleta (hojas dibujadas en modo paleta)
+            img = img.convert('RGB')
+        img.save(buffer, format='JPEG', quality=calidad, dpi=(dpi, dpi))
+    return buffer.getvalue()
+
+_ESPACIOS_DE_COLOR = {'L': '/DeviceGray', 'RGB': '/DeviceRGB', 'CMYK': '/DeviceCMYK'}
+
+class EscritorPdfJpeg:
+    """
+    Escribe un PDF de páginas con una imagen JPEG cada una, directo al archivo.
+
+    Cada página se escribe apenas se agrega (imagen, contenido y objeto página)
+    y el JPEG se incrusta tal cual con /DCTDecode, sin decodificarlo ni
+    recodificarlo; en memoria solo quedan las posiciones de los objetos. Así la
+    memoria no depende de la cantidad de páginas y `bytes_escritos` es exacto
+    en todo momento.
+    """
+
+    def __init__(self, destino, pagesize):
+        """`destino` es la ruta del PDF o cualquier objeto con write() (un socket, un buffer)."""
+        self._propio = isinstance(destino, (str, os.PathLike))
+        self.nombre = destino if self._propio else getattr(destino, 'name', None)
+        self.pagesize = pagesize
+        self.paginas = 0
+        self._archivo = open(destino, 'wb') if self._propio else destino
+        self._posicion = 0
+        self._offsets = {}
+        self._paginas_ids = []
+        self._siguiente_id = 3  # 1 = catálogo, 2 = árbol de páginas
+        self._escribir(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    @property
+    def bytes_escritos(self):
+        return self._posicion
+
+    def _escribir(self, datos):
+        self._archivo.write(datos)
+        self._posicion += len(datos)
+
+    def _objeto(self, id_objeto, diccionario, flujo=None):
+        self._offsets[id_objeto] = self._posicion
+        self._escribir(f'{id_objeto} 0 obj\n'.encode())
+        if flujo is None:
+            self._escribir(diccionario.encode() + b'\nendobj\n')
+        else:
+            self._escribir(diccionario.encode() + b'\nstream\n')
+            self._escribir(flujo)
+            self._escribir(b'\nendstream\nendobj\n')
+
+    def agregar_pagina(self, jpeg):
+        """Agrega una página con la hoja `jpeg` (bytes), escalada y centrada como en pngs_a_pdf_carta."""
+        with etapa('pdf_pagina'):
+            img = Image.open(BytesIO(jpeg))
+            ancho_img, alto_img = img.size
+            espacio_color = _ESPACIOS_DE_COLOR[img.mode]
+            ancho_pagina, alto_pagina = self.pagesize
+
+            # Escalar sin perder la relación de aspecto y centrar en la página
+            escala = min(ancho_pagina / ancho_img, alto_pagina / alto_img)
+            nuevo_ancho = ancho_img * escala
+            nuevo_alto = alto_img * escala
+            x_centrado = (ancho_pagina - nuevo_ancho) / 2
+            y_centrado = (alto_pagina - nuevo_alto) / 2
+
+            id_imagen, id_contenido, id_pagina = self._siguiente_id, self._siguiente_id + 1, self._siguiente_id + 2
+            self._siguiente_id += 3
+            self._objeto(id_imagen, f'<< /Type /XObject /Subtype /Image /Width {ancho_img} /Height {alto_img} '
+                                    f'/ColorSpace {espacio_color} /BitsPerComponent 8 /Filter /DCTDecode /Length {len(jpeg)} >>', jpeg)
+            contenido = f'q {nuevo_ancho:.4f} 0 0 {nuevo_alto:.4f} {x_centrado:.4f} {y_centrado:.4f} cm /Hoja Do Q'.encode()
+            self._objeto(id_contenido, f'<< /Length {len(contenido)} >>', contenido)
+            self._objeto(id_pagina, f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {ancho_pagina:.4f} {alto_pagina:.4f}] '
+                                    f'/Resources << /XObject << /Hoja {id_imagen} 0 R >> >> /Contents {id_contenido} 0 R >>')
+            self._paginas_ids.append(id_pagina)
+            self.paginas += 1
+        contar('paginas_pdf')
+
+    def cerrar(self):
+        """Escribe el árbol de páginas, el catálogo y la tabla xref, y cierra el archivo si lo abrió."""
+        with etapa('pdf_guardado'):
+            hijos = ' '.join(f'{id_pagina} 0 R' for id_pagina in self._paginas_ids)
+            self._objeto(2, f'<< /Type /Pages /Kids [{hijos}] /Count {self.paginas} >>')
+            self._objeto(1, '<< /Type /Catalog /Pages 2 0 R >>')
+            inicio_xref = self._posicion
+            cantidad = self._siguiente_id
+            self._escribir(f'xref\n0 {cantidad}\n0000000000 65535 f \n'.encode())
+            self._escribir(''.join(f'{self._offsets[i]:010d} 00000 n \n' for i in range(1, cantidad)).encode())
+            self._escribir(f'trailer\n<< /Size {cantidad} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n'.encode())
+            if self._propio:
+                self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def nombre_volumen(nombre_pdf_salida, numero):
+    """'juego.pdf' -> 'juego_vol01.pdf'."""
+    base, extension = os.path.splitext(nombre_pdf_salida)
+    return f"{base}_vol{numero:02d}{extension or '.pdf'}"
+
+def imagenes_a_pdf(hojas, nombre_pdf_salida, pagesize, calidad=90, max_paginas=None, max_bytes=None):
+    """
+    Escribe las hojas en un PDF, una por página, sin archivos intermedios.
+    `hojas` puede ser cualquier iterable (por ejemplo un generador) de imágenes PIL
+    o de bytes JPEG; cada hoja se escribe y se libera apenas llega.
+
+    Con `max_paginas` o `max_bytes` la salida se parte en volúmenes
+    (nombre_vol01.pdf, nombre_vol02.pdf, ...): cada volumen se cierra, y ya se
+    puede imprimir, en cuanto se llena, mientras las hojas siguientes se siguen generando.
+    Devuelve la lista de archivos escritos.
+    """
+    por_volumenes = max_paginas is not None or max_bytes is not None
+    escritor = None
+    archivos = []
+    paginas = 0
+
+    for hoja in hojas:
+        if isinstance(hoja, Image.Image):
+            hoja = codificar_jpeg(hoja, calidad=calidad)
+
+        if escritor is not None and por_volumenes and escritor.paginas and (
+            (max_paginas is not None and escritor.paginas >= max_paginas) or
+            (max_bytes is not None and escritor.bytes_escritos + len(hoja) > max_bytes)
+        ):
+            escritor.cerrar()
+            print(f"📄 Volumen listo para imprimir: {escritor.nombre} ({escritor.paginas} páginas)")
+            escritor = None
+        if escritor is None:
+            nombre = nombre_volumen(nombre_pdf_salida, len(archivos) + 1) if por_volumenes else nombre_pdf_salida
+            escritor = EscritorPdfJpeg(nombre, pagesize)
+            archivos.append(nombre)
+
+        escritor.agregar_pagina(hoja)
+        paginas += 1
+        del hoja
+
+    if escritor is None:
+        escritor = EscritorPdfJpeg(nombre_pdf_salida, pagesize)
+        archivos.append(nombre_pdf_salida)
+    escritor.cerrar()
+    if por_volumenes:
+        print(f"📄 Volumen listo para imprimir: {escritor.nombre} ({escritor.paginas} páginas)")
+    print(f"\n✨ ¡PDF creado con éxito! Nombre del archivo: **{nombre_pdf_salida}** ({paginas} páginas en {len(archivos)} archivo(s))")
+    return archivos
+
 # --- USO DEL SCRIPT ---
 
 if __name__ == '__main__':
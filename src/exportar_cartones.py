@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from generar_numeros_carton import COLUMNAS, derivar_cartones, generar_cartones_lote
+from registro_cartones import RegistroCartones, registros_cartones
+
+# Exportación masiva de cartones a CSV, JSONL, Parquet o Arrow.
+#
+# Los cartones pasan en bloques de registros (DTYPE_REGISTRO, los mismos del
+# registro binario): se generan, derivan o leen de a un bloque, se escriben y se
+# sueltan, así la memoria no depende de la cantidad total. El texto (CSV y JSONL)
+# se arma con numpy para todo el bloque a la vez y se escribe en una sola
+# llamada; no hay un print ni un formateo en Python por cartón.
+#
+# Cada fila es un cartón: juego, serie, carton y sus 24 números fila por fila
+# (B1, I1, N1, G1, O1, B2, ...), sin el centro libre N3.
+# Parquet y Arrow necesitan pyarrow, que es opcional.
+
+BLOQUE = 1 << 16
+FORMATOS = ('csv', 'jsonl', 'parquet', 'arrow')
+CAMPOS_NUMEROS = [f'{letra}{fila}' for fila in range(1, 6) for letra in COLUMNAS if (letra, fila) != ('N', 3)]
+CAMPOS = ['juego', 'serie', 'carton'] + CAMPOS_NUMEROS
+
+def bloques_generados(cantidad, num_juego=1, serie='A', semilla=None, bloque=BLOQUE):
+    """
+    Registros de `cantidad` cartones del juego y serie, numerados desde 1, en bloques.
+    Con `semilla` se derivan de ella (los mismos que imprime --derivar); si no, al azar.
+    """
+    rng = np.random.default_rng() if semilla is None else None
+    for primero in range(1, cantidad + 1, bloque):
+        n = min(bloque, cantidad + 1 - primero)
+        if semilla is None:
+            cartones = generar_cartones_lote(n, rng)
+        else:
+            cartones = derivar_cartones(semilla, num_juego, serie, np.arange(primero, primero + n))
+        yield registros_cartones(num_juego, serie, cartones, primero)
+
+def bloques_registro(registro, bloque=BLOQUE):
+    """Registros de un RegistroCartones en bloques, leídos del archivo mapeado."""
+    for inicio in range(0, len(registro), bloque):
+        yield np.array(registro.registros[inicio:inicio + bloque])
+
+# --- Texto ---
+
+def _digitos(valores, ancho):
+    """Dígitos ASCII (n, ancho) de enteros sin signo y máscara sin los ceros a la izquierda."""
+    valores = np.asarray(valores, dtype=np.uint64).reshape(-1, 1)
+    potencias = np.uint64(10) ** np.arange(ancho - 1, -1, -1, dtype=np.uint64)
+    digitos = (valores // potencias % np.uint64(10)).astype(np.uint8) + ord('0')
+    return digitos, (valores >= potencias) | (potencias == 1)
+
+def _textos(codigos, codificar):
+    """Texto (UTF-8) de cada código de serie con `codificar`, como bytes (n, k) y máscara."""
+    unicos, inversa = np.unique(codigos, return_inverse=True)
+    textos = [codificar(chr(codigo)).encode() for codigo in unicos.tolist()]
+    ancho = max(len(texto) for texto in textos)
+    tabla = np.zeros((len(textos), ancho), dtype=np.uint8)
+    mascara = np.zeros((len(textos), ancho), dtype=bool)
+    for i, texto in enumerate(textos):
+        tabla[i, :len(texto)] = np.frombuffer(texto, dtype=np.uint8)
+        mascara[i, :len(texto)] = True
+    return tabla[inversa], mascara[inversa]
+
+def _filas(partes, n):
+    """Une por fila partes de texto: bytes fijos o pares (bytes (n, k), máscara)."""
+    bloques, mascaras = [], []
+    for parte in partes:
+        if isinstance(parte, bytes):
+            parte = np.frombuffer(parte, dtype=np.uint8)
+            parte = (np.broadcast_to(parte, (n, len(parte))), np.ones((n, len(parte)), dtype=bool))
+        bloques.append(parte[0])
+        mascaras.append(parte[1])
+    return np.concatenate(bloques, axis=1)[np.concatenate(mascaras, axis=1)].tobytes()
+
+@lru_cache(maxsize=None)
+def _tabla_numeros(prefijos):
+    """
+    Texto de cada número 0-99 en cada una de las 24 celdas, con el prefijo de la
+    celda delante y relleno hasta 8 bytes, como uint64 (24 * 100) más su máscara.
+    Así un bloque se arma con un solo np.take en lugar de formatear número por número.
+    """
+    largo = len(prefijos[0]) + 2
+    if largo > 8:
+        raise ValueError("Los prefijos de las celdas deben tener a lo más 6 bytes")
+    digitos, mascara = _digitos(np.arange(100), 2)
+    tabla = np.zeros((len(CAMPOS_NUMEROS), 100, 8), dtype=np.uint8)
+    visible = np.zeros((len(CAMPOS_NUMEROS), 100, 8), dtype=bool)
+    tabla[:, :, :largo - 2] = np.frombuffer(b''.join(prefijos), dtype=np.uint8).reshape(len(CAMPOS_NUMEROS), 1, -1)
+    visible[:, :, :largo - 2] = True
+    tabla[:, :, largo - 2:largo] = digitos
+    visible[:, :, largo - 2:largo] = mascara
+    return tabla.view(np.uint64).reshape(-1), visible.view(np.uint64).reshape(-1)
+
+def _numeros(numeros, prefijos):
+    """Los 24 números de cada cartón, cada uno precedido por el prefijo de su celda."""
+    tabla, visible = _tabla_numeros(tuple(prefijos))
+    indices = np.arange(0, 100 * len(CAMPOS_NUMEROS), 100, dtype=np.intp) + numeros
+    n = len(numeros)
+    return np.take(tabla, indices).view(np.uint8).reshape(n, -1), np.take(visible, indices).view(bool).reshape(n, -1)
+
+def texto_csv(registros):
+    """Filas CSV de un bloque de registros."""
+    return _filas([
+        _digitos(registros['juego'], 5), b',',
+        _textos(registros['serie'], lambda serie: serie), b',',
+        _digitos(registros['carton'], 10),
+        _numeros(registros['numeros'], [b','] * len(CAMPOS_NUMEROS)), b'\n',
+    ], len(registros))
+
+def texto_jsonl(registros):
+    """Una línea JSON por registro del bloque."""
+    return _filas([
+        b'{"juego":', _digitos(registros['juego'], 5),
+        b',"serie":', _textos(registros['serie'], lambda serie: json.dumps(serie, ensure_ascii=False)),
+        b',"carton":', _digitos(registros['carton'], 10),
+        _numeros(registros['numeros'], [f',"{campo}":'.encode() for campo in CAMPOS_NUMEROS]), b'}\n',
+    ], len(registros))
+
+# --- Columnar ---
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Los formatos parquet y arrow necesitan pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+def _esquema(pa):
+    return pa.schema([('juego', pa.uint16()), ('serie', pa.string()), ('carton', pa.uint32())]
+                     + [(campo, pa.uint8()) for campo in CAMPOS_NUMEROS])
+
+def tabla_arrow(registros, pa=None):
+    """Bloque de registros como pyarrow.Table, una columna por campo."""
+    pa = pa or _pyarrow()
+    unicos, inversa = np.unique(registros['serie'], return_inverse=True)
+    series = pa.array([chr(codigo) for codigo in unicos.tolist()], pa.string()).take(pa.array(inversa.astype(np.int32)))
+    numeros = registros['numeros']
+    columnas = [pa.array(registros['juego']), series, pa.array(registros['carton'])]
+    columnas += [pa.array(np.ascontiguousarray(numeros[:, k])) for k in range(len(CAMPOS_NUMEROS))]
+    return pa.Table.from_arrays(columnas, schema=_esquema(pa))
+
+# --- Exportación ---
+
+def exportar(bloques, ruta, formato='csv'):
+    """Escribe los bloques de registros en `ruta` con el formato dado y devuelve la cantidad de cartones."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato!r} (use uno de {', '.join(FORMATOS)})")
+    total = 0
+    if formato in ('csv', 'jsonl'):
+        formatear = texto_csv if formato == 'csv' else texto_jsonl
+        with open(ruta, 'wb', buffering=1 << 20) as f:
+            if formato == 'csv':
+                f.write((','.join(CAMPOS) + '\n').encode())
+            for registros in bloques:
+                f.write(formatear(registros))
+                total += len(registros)
+        return total
+
+    pa = _pyarrow()
+    if formato == 'parquet':
+        import pyarrow.parquet as pq
+        escritor = pq.ParquetWriter(ruta, _esquema(pa))
+    else:
+        import pyarrow.ipc
+        escritor = pyarrow.ipc.new_file(ruta, _esquema(pa))
+    try:
+        for registros in bloques:
+            escritor.write_table(tabla_arrow(registros, pa))
+            total += len(registros)
+    finally:
+        escritor.close()
+    return total
+
+def _formato_de(ruta):
+    extension = os.path.splitext(ruta)[1].lstrip('.').lower()
+    return {'feather': 'arrow', 'ndjson': 'jsonl'}.get(extension, extension)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Exporta cartones en bloque a CSV, JSONL, Parquet o Arrow.')
+    parser.add_argument('--salida', default='cartones.csv', help='Archivo de salida')
+    parser.add_argument('--formato', choices=FORMATOS, default=None, help='Por defecto, según la extensión de --salida')
+    parser.add_argument('--cantidad', type=int, default=10_000, help='Cartones a generar')
+    parser.add_argument('--juego', type=int, default=1)
+    parser.add_argument('--serie', default='A')
+    parser.add_argument('--semilla', type=int, default=None, help='Derivar los cartones de esta semilla en lugar de sortearlos')
+    parser.add_argument('--registro', default=None, help='Exportar este registro de cartones en lugar de generar')
+    parser.add_argument('--bloque', type=int, default=BLOQUE, help='Cartones por bloque')
+    args = parser.parse_args()
+
+    formato = args.formato or _formato_de(args.salida)
+    if formato not in FORMATOS:
+        parser.error(f"No se reconoce el formato de {args.salida}; use --formato")
+    if args.registro:
+        bloques = bloques_registro(RegistroCartones(args.registro), args.bloque)
+    else:
+        bloques = bloques_generados(args.cantidad, args.juego, args.serie, args.semilla, args.bloque)
+
+    inicio = time.perf_counter()
+    total = exportar(bloques, args.salida, formato)
+    segundos = time.perf_counter() - inicio
+    print(f"✅ {total:,} cartones exportados a {args.salida} ({os.path.getsize(args.salida) / 2**20:.1f} MB) "
+          f"en {segundos:.1f} s ({total / segundos if segundos > 0 else 0:,.0f} cartones/s)")
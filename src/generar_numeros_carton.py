@@ -1,5 +1,6 @@
-import random
-import pandas as pd
+import numpy as np
+
+from instrumentacion import contar, etapa
 
 # Definición de los rangos estándar para las columnas de Bingo (B-I-N-G-O)
 # B: 1-15, I: 16-30, N: 31-45, G: 46-60, O: 61-75
@@ -12,53 +13,120 @@ RANGOS_BINGO = {
 }
 COLUMNAS = list(RANGOS_BINGO.keys())
 
+def generar_cartones_lote(cantidad, rng=None):
+    """
+    Genera `cantidad` cartones de 5x5 de una sola vez.
+    Devuelve un arreglo uint8 de forma (cantidad, 5, 5) indexado como
+    [cartón, fila, columna], con 0 en el espacio libre del centro.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    # Para cada cartón y columna se ordenan 15 claves aleatorias que llevan el
+    # índice del número en sus 4 bits bajos: los 5 primeros índices tras ordenar
+    # son una muestra sin reemplazo, y en orden aleatorio, del rango de la columna.
+    with etapa('generacion_numeros'):
+        claves = rng.integers(0, 0xFFFFFFFF, size=(cantidad, len(COLUMNAS), 15), dtype=np.uint32, endpoint=True)
+        cartones = _cartones_desde_claves(claves)
+    contar('cartones_generados', cantidad)
+    return cartones
+
+def _cartones_desde_claves(claves):
+    """Convierte claves aleatorias uint32 de forma (N, 5, 15) en cartones (N, 5, 5)."""
+    claves &= np.uint32(0xFFFFFFF0)
+    claves |= np.arange(15, dtype=np.uint32)
+    claves.sort(axis=2)
+    indices = (claves[:, :, :5] & 0xF).astype(np.uint8)
+
+    minimos = np.array([min_val for min_val, _ in RANGOS_BINGO.values()], dtype=np.uint8)
+    cartones = np.ascontiguousarray((indices + minimos[:, None]).transpose(0, 2, 1))
+
+    # Espacio libre en el centro (columna 'N', fila 2)
+    cartones[:, 2, 2] = 0
+    return cartones
+
+# Derivación determinista: cada cartón sale de un generador basado en contador
+# (splitmix64) cuya entrada es la semilla maestra y el serial del cartón
+# (juego, serie, número de cartón). No hay estado compartido: cualquier cartón
+# se puede recalcular a partir de lo que está impreso en él.
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MEZCLA_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MEZCLA_2 = np.uint64(0x94D049BB133111EB)
+# Palabras de 64 bits por cartón: 5 columnas x 15 claves de 32 bits
+_PALABRAS_CARTON = (len(COLUMNAS) * 15 + 1) // 2
+
+def _mezclar64(z):
+    """Función de mezcla de splitmix64 sobre un arreglo uint64."""
+    z = (z ^ (z >> np.uint64(30))) * _MEZCLA_1
+    z = (z ^ (z >> np.uint64(27))) * _MEZCLA_2
+    return z ^ (z >> np.uint64(31))
+
+def contadores_cartones(num_juego, serie, card_ids):
+    """Contador de 64 bits de cada cartón: juego (16 bits), serie (16 bits) y número (32 bits)."""
+    card_ids = np.asarray(card_ids, dtype=np.uint64)
+    return (np.uint64(num_juego & 0xFFFF) << np.uint64(48)) | (np.uint64(ord(serie) & 0xFFFF) << np.uint64(32)) | card_ids
+
+def derivar_cartones(semilla, num_juego, serie, card_ids):
+    """
+    Calcula los cartones `card_ids` (números impresos en el serial, desde 1) del
+    juego y serie dados a partir de la semilla maestra. El resultado depende solo
+    de esos datos, así que se puede pedir cualquier subconjunto en cualquier orden
+    o proceso. Devuelve un arreglo uint8 (len(card_ids), 5, 5).
+    """
+    card_ids = np.atleast_1d(np.asarray(card_ids, dtype=np.uint64))
+    with etapa('generacion_numeros'):
+        semilla_mezclada = _mezclar64(np.array([semilla & 0xFFFFFFFFFFFFFFFF], dtype=np.uint64))
+        estado = _mezclar64(contadores_cartones(num_juego, serie, card_ids) ^ semilla_mezclada)
+
+        pasos = np.arange(1, _PALABRAS_CARTON + 1, dtype=np.uint64) * _GOLDEN
+        palabras = _mezclar64(estado[:, None] + pasos)
+        claves = palabras.view(np.uint32)[:, :len(COLUMNAS) * 15].reshape(len(card_ids), len(COLUMNAS), 15)
+        cartones = _cartones_desde_claves(claves.copy())
+    contar('cartones_generados', len(card_ids))
+    return cartones
+
+def derivar_carton(semilla, num_juego, serie, card_id):
+    """Un solo cartón derivado; ver derivar_cartones."""
+    return derivar_cartones(semilla, num_juego, serie, [card_id])[0]
+
 def generar_numeros_carton():
-    """Genera un cartón de lotería/bingo de 5x5."""
-    carton = {}
-    
-    for columna, (min_val, max_val) in RANGOS_BINGO.items():
-        # Selecciona 5 números únicos al azar dentro del rango de la columna
-        # La columna 'N' tendrá solo 4 números + el espacio libre
-        cantidad_numeros = 5
-        if columna == 'N':
-            cantidad_numeros = 4
-            
-        numeros = random.sample(range(min_val, max_val + 1), k=cantidad_numeros)
-        carton[columna] = numeros
-    
-    # Añade el "Free Space" al centro del cartón (Columna 'N', posición 2 - índice 2)
-    carton['N'].insert(2, '')
-    
-    # Transponer los datos para crear el DataFrame
-    # Las claves son las columnas (B, I, N, G, O) y los valores son las filas (0-4)
-    df_carton = pd.DataFrame(carton)
-    return df_carton
-
-def generar_e_imprimir_cartones(cantidad=1):
-    """Genera la cantidad de cartones solicitada y los guarda en un archivo."""
-    
+    """Genera un cartón de lotería/bingo de 5x5 como arreglo uint8 (0 = espacio libre)."""
+    return generar_cartones_lote(1)[0]
+
+def formatear_carton(carton):
+    """Da formato de tabla B-I-N-G-O a un cartón de 5x5 (el espacio libre queda en blanco)."""
+    lineas = [' '.join(f'{letra:>2}' for letra in COLUMNAS)]
+    for fila in carton:
+        lineas.append(' '.join(f'{numero:>2}' if numero else '  ' for numero in fila.tolist()))
+    return '\n'.join(lineas)
+
+def generar_e_imprimir_cartones(cantidad=1, mostrar=False, bloque=10_000):
+    """
+    Genera la cantidad de cartones solicitada y los guarda en un archivo de texto.
+    Se generan y escriben de a `bloque`; solo con `mostrar` se imprimen también en la
+    consola. Para exportar muchos cartones usar exportar_cartones (CSV, JSONL, Parquet).
+    """
     print(f"Generando {cantidad} cartón(es) de lotería...")
-    
-    with open('cartones_loteria.txt', 'w') as f:
-        for i in range(1, cantidad + 1):
-            carton = generar_numeros_carton()
-            
+    rng = np.random.default_rng()
+
+    with open('cartones_loteria.txt', 'w', buffering=1 << 20) as f:
+        for inicio in range(0, cantidad, bloque):
+            cartones = generar_cartones_lote(min(bloque, cantidad - inicio), rng)
             # --- Formateo de la salida ---
-            titulo = f"--- CARTÓN {i:03d} ---"
-            
+            textos = [f"--- CARTÓN {i:03d} ---\n{formatear_carton(carton)}"
+                      for i, carton in enumerate(cartones, start=inicio + 1)]
+
             # Guarda en el archivo de texto
-            f.write(titulo + '\n')
-            f.write(carton.to_string(index=False) + '\n\n')
-            
+            f.write(''.join(texto + '\n\n' for texto in textos))
+
             # Muestra en la consola (opcional)
-            print('\n' + titulo)
-            print(carton.to_string(index=False))
-            print("----------------------")
+            if mostrar:
+                print(''.join(f"\n{texto}\n----------------------\n" for texto in textos), end='')
 
 # --- Ejecución del Programa ---
 # Cambia el número para generar la cantidad de cartones que necesitas
 if __name__ == '__main__':
     GENERAR_CANTIDAD = 1
-    generar_e_imprimir_cartones(GENERAR_CANTIDAD)
+    generar_e_imprimir_cartones(GENERAR_CANTIDAD, mostrar=True)
 
     print(f"\n✅ ¡Generación completada! Los cartones se guardaron en 'cartones_loteria.txt'")
\ No newline at end of file
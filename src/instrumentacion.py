@@ -0,0 +1,186 @@
+import io
+import os
+import time
+import tracemalloc
+from collections import defaultdict
+
+# Instrumentación del pipeline: cronómetros y contadores por etapa.
+#
+# Desactivada por defecto; `etapa()` devuelve entonces un objeto nulo compartido y
+# `contar()` retorna de inmediato, así el costo en producción es una llamada y un if.
+# Se activa con activar() o con la variable de entorno BINGO_INSTRUMENTAR
+# (valores separados por comas: "1", "perfil" para cProfile, "memoria" para tracemalloc).
+# La variable se hereda, de modo que los procesos del pool también miden; sus
+# mediciones se recogen con extraer() y se suman en el proceso principal con combinar().
+#
+# Los tiempos de cada etapa son inclusivos: 'composicion_hoja' incluye el dibujo de
+# sus cartones, que además aparece por separado en 'dibujo_estatico' y 'dibujo_texto'.
+
+VARIABLE_ENTORNO = 'BINGO_INSTRUMENTAR'
+
+_activa = False
+_tiempos = defaultdict(float)
+_llamadas = defaultdict(int)
+_contadores = defaultdict(int)
+_perfil = None
+
+
+class _EtapaNula:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULA = _EtapaNula()
+
+
+class _Etapa:
+    __slots__ = ('nombre', 'inicio')
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _tiempos[self.nombre] += time.perf_counter() - self.inicio
+        _llamadas[self.nombre] += 1
+        return False
+
+
+def etapa(nombre):
+    """Cronómetro de una etapa para usar con `with`. No mide nada si está desactivada."""
+    return _Etapa(nombre) if _activa else _NULA
+
+def contar(nombre, cantidad=1):
+    """Suma `cantidad` al contador `nombre`."""
+    if _activa:
+        _contadores[nombre] += cantidad
+
+def activa():
+    return _activa
+
+def activar(perfil=False, memoria=False):
+    """
+    Activa la instrumentación en este proceso y en los que se creen después.
+    Con `perfil` corre cProfile y con `memoria` tracemalloc (solo en este proceso).
+    """
+    global _activa, _perfil
+    _activa = True
+    opciones = ['1'] + (['perfil'] if perfil else []) + (['memoria'] if memoria else [])
+    os.environ[VARIABLE_ENTORNO] = ','.join(opciones)
+    if perfil and _perfil is None:
+        import cProfile
+        _perfil = cProfile.Profile()
+        _perfil.enable()
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def desactivar():
+    global _activa, _perfil
+    _activa = False
+    os.environ.pop(VARIABLE_ENTORNO, None)
+    if _perfil is not None:
+        _perfil.disable()
+
+def reiniciar():
+    """Borra las mediciones acumuladas."""
+    global _perfil
+    _tiempos.clear()
+    _llamadas.clear()
+    _contadores.clear()
+    if _perfil is not None:
+        import cProfile
+        _perfil.disable()
+        _perfil = cProfile.Profile()
+        _perfil.enable()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+def extraer():
+    """Devuelve las mediciones de este proceso (para enviarlas al principal) y las borra."""
+    instantanea = {'tiempos': dict(_tiempos), 'llamadas': dict(_llamadas), 'contadores': dict(_contadores)}
+    _tiempos.clear()
+    _llamadas.clear()
+    _contadores.clear()
+    return instantanea
+
+def combinar(instantanea):
+    """Suma a este proceso las mediciones extraídas en otro."""
+    if not instantanea:
+        return
+    for nombre, segundos in instantanea['tiempos'].items():
+        _tiempos[nombre] += segundos
+    for nombre, cantidad in instantanea['llamadas'].items():
+        _llamadas[nombre] += cantidad
+    for nombre, cantidad in instantanea['contadores'].items():
+        _contadores[nombre] += cantidad
+
+def resumen():
+    """Mediciones acumuladas como dict, con las etapas ordenadas por tiempo total."""
+    etapas = {
+        nombre: {
+            'segundos': segundos,
+            'llamadas': _llamadas[nombre],
+            'ms_por_llamada': segundos * 1000 / _llamadas[nombre] if _llamadas[nombre] else 0.0,
+        }
+        for nombre, segundos in sorted(_tiempos.items(), key=lambda item: -item[1])
+    }
+    datos = {'etapas': etapas, 'contadores': dict(_contadores)}
+    if tracemalloc.is_tracing():
+        actual, pico = tracemalloc.get_traced_memory()
+        datos['memoria'] = {'actual_mb': actual / 2**20, 'pico_mb': pico / 2**20}
+    return datos
+
+def informe(lineas_perfil=20):
+    """Texto con el resumen de la corrida: etapas, contadores, memoria y perfil si se pidieron."""
+    datos = resumen()
+    salida = [f"{'Etapa':<24}{'Total (s)':>12}{'Llamadas':>10}{'ms/llamada':>12}"]
+    for nombre, e in datos['etapas'].items():
+        salida.append(f"{nombre:<24}{e['segundos']:>12.3f}{e['llamadas']:>10}{e['ms_por_llamada']:>12.3f}")
+    if datos['contadores']:
+        salida.append('')
+        salida.extend(f"{nombre:<24}{cantidad:>12}" for nombre, cantidad in sorted(datos['contadores'].items()))
+    if 'memoria' in datos:
+        salida.append('')
+        salida.append(f"Memoria (tracemalloc): pico {datos['memoria']['pico_mb']:.1f} MB, actual {datos['memoria']['actual_mb']:.1f} MB")
+        for estadistica in tracemalloc.take_snapshot().statistics('lineno')[:10]:
+            salida.append(f"  {estadistica}")
+    if _perfil is not None:
+        import pstats
+        texto = io.StringIO()
+        pstats.Stats(_perfil, stream=texto).sort_stats('cumulative').print_stats(lineas_perfil)
+        salida.append('')
+        salida.append(texto.getvalue())
+    return '\n'.join(salida)
+
+
+def _al_bifurcar():
+    # Un proceso hijo creado con fork hereda las mediciones y el perfil del padre:
+    # se descartan para que extraer() devuelva solo lo medido en el hijo.
+    global _perfil
+    _tiempos.clear()
+    _llamadas.clear()
+    _contadores.clear()
+    if _perfil is not None:
+        _perfil.disable()
+        _perfil = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+os.register_at_fork(after_in_child=_al_bifurcar)
+
+# Activación por variable de entorno. En los procesos hijos (el pool) solo se
+# activan los cronómetros; cProfile y tracemalloc quedan en el proceso principal.
+_opciones = [opcion.strip() for opcion in os.environ.get(VARIABLE_ENTORNO, '').split(',') if opcion.strip()]
+if _opciones and _opciones != ['0']:
+    import multiprocessing
+    if multiprocessing.parent_process() is None:
+        activar(perfil='perfil' in _opciones, memoria='memoria' in _opciones)
+    else:
+        _activa = True
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict
+
+import numpy as np
+
+import carton_bingo
+from codigo_reclamo import huella_clave
+
+# Manifiesto de una impresión para reconstrucciones incrementales.
+#
+# Cada juego tiene una clave: el hash de todo lo que define sus hojas (cartones,
+# configuración de página y cartón, serie, número de juego, fuentes, logo y
+# firma) y de cómo se arma su salida (tamaño de página, volúmenes, backend).
+# Al terminar un juego se anota su clave junto con el tamaño y el hash de cada
+# PDF escrito; en la siguiente corrida el juego se salta si la clave coincide y
+# los archivos siguen intactos.
+#
+# Mientras un juego se arma, cada hoja se guarda en `dir_cache` con una clave
+# propia, así una corrida interrumpida retoma desde la última hoja dibujada.
+# Las hojas de un juego se borran de la caché cuando su PDF queda completo.
+# El manifiesto también guarda la semilla de la impresión, para que una corrida
+# sin --semilla genere los mismos cartones que la anterior.
+
+VERSION_FORMATO = 1
+RUTA_MANIFIESTO = 'manifiesto_impresion.json'
+DIR_CACHE_HOJAS = '.cache_hojas'
+
+def _hash_archivo(ruta):
+    if not ruta or not isinstance(ruta, str) or not os.path.exists(ruta):
+        return None
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+def _huella_fuente(font):
+    ruta = getattr(font, 'path', None)
+    return {'ruta': ruta if isinstance(ruta, str) else None, 'tamano': getattr(font, 'size', None),
+            'sha256': _hash_archivo(ruta)}
+
+def recursos_dibujo():
+    """Fuentes, logo y firma que usa el dibujo de los cartones."""
+    return {
+        'fuentes': {nombre: _huella_fuente(getattr(carton_bingo, nombre))
+                    for nombre in ('FONT_SIGN', 'FONT_SERIAL', 'FONT_HEADER', 'FONT_NUMBERS', 'FONT_FREE')},
+        'logo': _hash_archivo(carton_bingo.LOGO_PATH),
+        'firma': carton_bingo.SIGN_TEXT,
+        'clave_reclamo': huella_clave(),
+    }
+
+def _hash(datos, *arreglos):
+    sha = hashlib.sha256(json.dumps(datos, sort_keys=True, default=str).encode())
+    for arreglo in arreglos:
+        sha.update(arreglo.tobytes())
+    return sha.hexdigest()
+
+
+class ManifiestoImpresion:
+    """Registro de los juegos ya construidos y caché de hojas para retomar."""
+
+    def __init__(self, ruta=RUTA_MANIFIESTO, dir_cache=DIR_CACHE_HOJAS):
+        self.ruta = ruta
+        self.dir_cache = dir_cache
+        self.juegos = {}
+        self.semilla = None
+        if os.path.exists(ruta):
+            with open(ruta) as f:
+                datos = json.load(f)
+            if datos.get('version') == VERSION_FORMATO:
+                self.juegos = datos.get('juegos', {})
+                self.semilla = datos.get('semilla')
+        self._recursos = recursos_dibujo()
+
+    def clave_render(self, juego):
+        """Hash de lo que define el aspecto de las hojas del juego, sin los cartones."""
+        config, serie, num_juego, _, _ = juego
+        return _hash({'version': VERSION_FORMATO, 'config': asdict(config), 'serie': serie,
+                      'num_juego': num_juego, 'recursos': self._recursos})
+
+    def hash_juego(self, juego, opciones):
+        """sha256 en curso de la clave del juego: falta agregarle los cartones de cada hoja, en orden."""
+        datos = {'render': self.clave_render(juego), 'salida': opciones}
+        return hashlib.sha256(json.dumps(datos, sort_keys=True, default=str).encode())
+
+    def clave_juego(self, juego, hojas, opciones):
+        """Clave completa del juego: aspecto, todos sus cartones y opciones de salida."""
+        return self.claves(juego, hojas, opciones)[0]
+
+    def claves(self, juego, hojas, opciones, por_hoja=False):
+        """
+        (clave del juego, lista con la clave de cada hoja o None) en una sola pasada
+        por `hojas`, de a una hoja, sin juntarlas en un arreglo.
+        """
+        sha = self.hash_juego(juego, opciones)
+        clave_render = self.clave_render(juego) if por_hoja else None
+        claves_hojas = [] if por_hoja else None
+        for num_hoja, cartones in enumerate(hojas, start=1):
+            sha.update(np.ascontiguousarray(cartones).tobytes())
+            if por_hoja:
+                claves_hojas.append(self.clave_hoja(clave_render, num_hoja, cartones))
+        return sha.hexdigest(), claves_hojas
+
+    def clave_hoja(self, clave_render, num_hoja, cartones):
+        return _hash({'render': clave_render, 'num_hoja': num_hoja}, np.ascontiguousarray(cartones))
+
+    def ruta_hoja(self, clave_hoja):
+        return os.path.join(self.dir_cache, clave_hoja + '.jpg')
+
+    def juego_completo(self, nombre_pdf, clave):
+        """True si el juego ya se construyó con esta clave y sus archivos están intactos."""
+        entrada = self.juegos.get(nombre_pdf)
+        if entrada is None or entrada['clave'] != clave:
+            return False
+        for archivo in entrada['archivos']:
+            ruta = archivo['nombre']
+            if not os.path.exists(ruta) or os.path.getsize(ruta) != archivo['bytes']:
+                return False
+            if _hash_archivo(ruta) != archivo['sha256']:
+                return False
+        return True
+
+    def registrar_juego(self, nombre_pdf, clave, archivos, claves_hojas=()):
+        """Anota un juego terminado, guarda el manifiesto y borra sus hojas de la caché."""
+        self.juegos[nombre_pdf] = {
+            'clave': clave,
+            'archivos': [{'nombre': ruta, 'bytes': os.path.getsize(ruta), 'sha256': _hash_archivo(ruta)} for ruta in archivos],
+        }
+        self.guardar()
+        for clave_hoja in claves_hojas:
+            ruta = self.ruta_hoja(clave_hoja)
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    def guardar(self):
+        """Escribe el manifiesto de forma atómica (archivo temporal y reemplazo)."""
+        temporal = self.ruta + '.tmp'
+        with open(temporal, 'w') as f:
+            json.dump({'version': VERSION_FORMATO, 'semilla': self.semilla, 'juegos': self.juegos}, f, indent=2, ensure_ascii=False)
+        os.replace(temporal, self.ruta)
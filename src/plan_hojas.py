@@ -0,0 +1,103 @@
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+
+from consolida_pdf import OFICIO, legal, letter
+
+# Planificador de hojas: cuántos cartones van por hoja, en qué grilla, de qué
+# tamaño y en qué papel y orientación, para imprimir una corrida en la menor
+# cantidad de hojas.
+#
+# Para cada papel y orientación se prueban todas las grillas de columnas x filas
+# en que un cartón cuadrado de al menos `min_lado_mm` cabe dentro del margen,
+# dejando `separacion_mm` entre cartones. Gana el plan con menos hojas; a igualdad,
+# el papel que aparece primero en `papeles` (el preferido), luego el cartón más
+# grande y luego la hoja vertical. Con `por_hoja` fijo se buscan grillas con
+# lugar para esa cantidad (no solo las que la dividen exactamente: 7 cartones
+# caben en una grilla de 2x4) sin filas ni columnas de sobra.
+# Los planes se memorizan: pedir el mismo plan otra vez no recalcula nada.
+
+# Papel: (ancho, alto) en mm en vertical y tamaño de la página del PDF en puntos
+PAPELES = {
+    'letter': ((216, 279), letter),
+    'legal': ((216, 356), legal),
+    'oficio': ((216, 330), OFICIO),
+}
+MIN_LADO_MM = 75     # lado mínimo de un cartón legible
+MARGEN_MM = 8        # margen de la página
+SEPARACION_MM = 6    # espacio mínimo entre cartones
+
+@dataclass(frozen=True)
+class PlanHoja:
+    papel: str
+    horizontal: bool
+    page_width_mm: int   # ya orientada
+    page_height_mm: int
+    pagesize: tuple      # tamaño de la página del PDF en puntos, ya orientada
+    cols: int
+    rows: int
+    por_hoja: int        # cartones por hoja (puede dejar celdas vacías en la última fila)
+    lado_mm: float       # lado del cartón
+    margen_mm: float
+    hojas: int           # hojas para toda la corrida
+
+def lado_carton(ancho_mm, alto_mm, cols, rows, margen_mm=MARGEN_MM, separacion_mm=SEPARACION_MM):
+    """Lado en mm del mayor cartón cuadrado que cabe en una grilla cols x rows."""
+    # Cada celda lleva media separación a cada lado del cartón (ver offsets_hoja)
+    return min((ancho_mm - 2 * margen_mm) / cols, (alto_mm - 2 * margen_mm) / rows) - separacion_mm
+
+def planes_posibles(cartones, por_hoja=None, papeles=tuple(PAPELES), horizontal=(False, True),
+                    min_lado_mm=MIN_LADO_MM, margen_mm=MARGEN_MM, separacion_mm=SEPARACION_MM):
+    """Todos los planes que cumplen las restricciones para `cartones` cartones, del mejor al peor."""
+    candidatos = []
+    for preferencia, papel in enumerate(papeles):
+        if papel not in PAPELES:
+            raise ValueError(f"Papel desconocido: {papel!r} (use uno de {', '.join(PAPELES)})")
+        (ancho_vertical, alto_vertical), pagesize_vertical = PAPELES[papel]
+        for girada in horizontal:
+            if girada:
+                ancho, alto, pagesize = alto_vertical, ancho_vertical, pagesize_vertical[::-1]
+            else:
+                ancho, alto, pagesize = ancho_vertical, alto_vertical, pagesize_vertical
+            celda_minima = min_lado_mm + separacion_mm
+            max_cols = int((ancho - 2 * margen_mm) // celda_minima)
+            max_rows = int((alto - 2 * margen_mm) // celda_minima)
+            if por_hoja is not None:
+                max_cols, max_rows = min(max_cols, por_hoja), min(max_rows, por_hoja)
+            for cols in range(1, max_cols + 1):
+                for rows in range(1, max_rows + 1):
+                    if por_hoja is None:
+                        cantidad = cols * rows
+                    elif cols * rows < por_hoja or cols * (rows - 1) >= por_hoja or (cols - 1) * rows >= por_hoja:
+                        continue
+                    else:
+                        cantidad = por_hoja
+                    lado = lado_carton(ancho, alto, cols, rows, margen_mm, separacion_mm)
+                    if lado < min_lado_mm:
+                        continue
+                    plan = PlanHoja(papel, girada, ancho, alto, pagesize, cols, rows, cantidad, lado, margen_mm,
+                                    math.ceil(cartones / cantidad))
+                    candidatos.append(((plan.hojas, preferencia, -lado, girada), plan))
+    candidatos.sort(key=lambda candidato: candidato[0])
+    return [plan for _, plan in candidatos]
+
+@lru_cache(maxsize=None)
+def planificar_hojas(cartones, por_hoja=None, papeles=tuple(PAPELES), horizontal=(False, True),
+                     min_lado_mm=MIN_LADO_MM, margen_mm=MARGEN_MM, separacion_mm=SEPARACION_MM):
+    """
+    Mejor PlanHoja para imprimir `cartones` cartones (ver arriba). Con `por_hoja`
+    None van tantos por hoja como quepan. Lanza ValueError si ningún papel admite
+    cartones de `min_lado_mm`.
+    """
+    planes = planes_posibles(cartones, por_hoja, papeles, horizontal, min_lado_mm, margen_mm, separacion_mm)
+    if not planes:
+        cantidad = '' if por_hoja is None else f"{por_hoja} "
+        raise ValueError(f"No caben {cantidad}cartones de {min_lado_mm} mm en {', '.join(papeles)} "
+                         f"con {margen_mm} mm de margen; baje el lado mínimo o use otro papel")
+    return planes[0]
+
+def formatear_plan(plan):
+    """Resumen de una línea de un PlanHoja."""
+    orientacion = 'horizontal' if plan.horizontal else 'vertical'
+    return (f"{plan.papel} {orientacion}, {plan.cols}x{plan.rows} ({plan.por_hoja} por hoja), "
+            f"cartones de {plan.lado_mm:.1f} mm, {plan.hojas} hojas")
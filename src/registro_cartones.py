@@ -0,0 +1,149 @@
+import re
+import struct
+
+import numpy as np
+
+# Registro binario de los cartones de una impresión.
+#
+# Formato (little endian):
+#   - Cabecera de 64 bytes: firma, versión, tamaño de registro, cantidad de
+#     registros, cantidad de entradas del directorio y offset del directorio.
+#   - Registros de 32 bytes: los 24 números del cartón fila por fila (sin el
+#     centro libre), juego (uint16), serie (uint16, código Unicode) y carton (uint32).
+#   - Directorio al final: una entrada por tramo continuo (juego, serie) con el
+#     primer número de cartón, la cantidad y el índice del primer registro.
+# Con el directorio en memoria, un cartón se ubica por su serial en O(1) y se lee
+# desde el archivo mapeado en memoria sin cargar el resto.
+
+FIRMA = b'BINGOREG'
+VERSION = 1
+_CABECERA = struct.Struct('<8sHHQQQ28x')
+_ENTRADA = struct.Struct('<HHIIQ')
+
+DTYPE_REGISTRO = np.dtype([
+    ('numeros', np.uint8, (24,)),
+    ('juego', '<u2'),
+    ('serie', '<u2'),
+    ('carton', '<u4'),
+])
+
+# Celdas del cartón que se guardan (todas menos el centro libre)
+_CELDAS = np.array([celda for celda in range(25) if celda != 12])
+
+_PATRON_SERIAL = re.compile(r'Juego\s+(\d+)\s*-\s*Letra:\s*(\S)\s*-\s*Carton:\s*(\d+)', re.IGNORECASE)
+
+def registros_cartones(num_juego, serie, cartones, primer_carton=1):
+    """Registros (DTYPE_REGISTRO) de `cartones` (N, 5, 5) del juego y serie, numerados desde `primer_carton`."""
+    cartones = np.asarray(cartones, dtype=np.uint8)
+    registros = np.zeros(len(cartones), dtype=DTYPE_REGISTRO)
+    registros['numeros'] = cartones.reshape(len(cartones), 25)[:, _CELDAS]
+    registros['juego'] = num_juego
+    registros['serie'] = ord(serie)
+    registros['carton'] = np.arange(primer_carton, primer_carton + len(cartones))
+    return registros
+
+def parsear_serial(texto):
+    """Convierte 'Juego 03 - Letra: U - Carton: 117' en (3, 'U', 117)."""
+    coincidencia = _PATRON_SERIAL.search(texto)
+    if coincidencia is None:
+        raise ValueError(f"Serial no reconocido: {texto!r}")
+    juego, serie, carton = coincidencia.groups()
+    return int(juego), serie.upper(), int(carton)
+
+
+class EscritorRegistro:
+    """Escribe el registro de a un juego (o tramo de cartones) a la vez."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._archivo = open(ruta, 'wb')
+        self._archivo.write(b'\0' * _CABECERA.size)
+        self._directorio = []
+        self._registros = 0
+
+    def agregar(self, num_juego, serie, cartones, primer_carton=1):
+        """
+        Agrega `cartones` (arreglo (N, 5, 5)) del juego y serie dados, numerados
+        desde `primer_carton`. Si continúa el tramo anterior, lo extiende.
+        """
+        registros = registros_cartones(num_juego, serie, cartones, primer_carton)
+        self._archivo.write(registros.tobytes())
+
+        if self._directorio:
+            juego, cod_serie, primero, cantidad, inicio = self._directorio[-1]
+            if (juego, cod_serie) == (num_juego, ord(serie)) and primero + cantidad == primer_carton:
+                self._directorio[-1] = (juego, cod_serie, primero, cantidad + len(cartones), inicio)
+                self._registros += len(cartones)
+                return
+        self._directorio.append((num_juego, ord(serie), primer_carton, len(cartones), self._registros))
+        self._registros += len(cartones)
+
+    def cerrar(self):
+        offset_directorio = self._archivo.tell()
+        for entrada in self._directorio:
+            self._archivo.write(_ENTRADA.pack(*entrada))
+        self._archivo.seek(0)
+        self._archivo.write(_CABECERA.pack(FIRMA, VERSION, DTYPE_REGISTRO.itemsize,
+                                           self._registros, len(self._directorio), offset_directorio))
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+class RegistroCartones:
+    """Lector del registro: abre al instante y busca cartones por serial en O(1)."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(ruta, 'rb') as archivo:
+            firma, version, tamano, registros, entradas, offset_directorio = _CABECERA.unpack(archivo.read(_CABECERA.size))
+            if firma != FIRMA or version != VERSION or tamano != DTYPE_REGISTRO.itemsize:
+                raise ValueError(f"{ruta} no es un registro de cartones válido")
+            archivo.seek(offset_directorio)
+            datos = archivo.read(entradas * _ENTRADA.size)
+
+        self._directorio = {}
+        for juego, cod_serie, primero, cantidad, inicio in _ENTRADA.iter_unpack(datos):
+            self._directorio.setdefault((juego, chr(cod_serie)), []).append((primero, cantidad, inicio))
+        self.registros = np.memmap(ruta, dtype=DTYPE_REGISTRO, mode='r', offset=_CABECERA.size, shape=(registros,)) \
+            if registros else np.zeros(0, dtype=DTYPE_REGISTRO)
+
+    def __len__(self):
+        return len(self.registros)
+
+    def indice(self, num_juego, serie, carton):
+        """Posición del registro del cartón, o None si no existe."""
+        for primero, cantidad, inicio in self._directorio.get((num_juego, serie), ()):
+            if primero <= carton < primero + cantidad:
+                return inicio + carton - primero
+        return None
+
+    def buscar(self, num_juego, serie, carton):
+        """Devuelve el cartón (arreglo 5x5 uint8, 0 = espacio libre) o None si no existe."""
+        i = self.indice(num_juego, serie, carton)
+        if i is None:
+            return None
+        carton_5x5 = np.zeros(25, dtype=np.uint8)
+        carton_5x5[_CELDAS] = self.registros['numeros'][i]
+        return carton_5x5.reshape(5, 5)
+
+    def buscar_serial(self, texto):
+        """Busca un cartón a partir del serial impreso."""
+        return self.buscar(*parsear_serial(texto))
+
+    def cartones(self, num_juego, serie):
+        """Todos los cartones de un juego y serie como arreglo (N, 5, 5), en orden."""
+        tramos = self._directorio.get((num_juego, serie), ())
+        lotes = []
+        for _, cantidad, inicio in tramos:
+            numeros = self.registros['numeros'][inicio:inicio + cantidad]
+            lote = np.zeros((cantidad, 25), dtype=np.uint8)
+            lote[:, _CELDAS] = numeros
+            lotes.append(lote.reshape(cantidad, 5, 5))
+        if not lotes:
+            return np.zeros((0, 5, 5), dtype=np.uint8)
+        return np.concatenate(lotes)
@@ -0,0 +1,309 @@
+import logging
+import os
+import queue
+import threading
+from collections import deque
+from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from carton_bingo import componer_hoja, generar_hoja_bingo_jpg
+from consolida_pdf import codificar_jpeg, imagenes_a_pdf, pngs_a_pdf_carta, letter
+import instrumentacion
+
+
+def _renderizar_hoja(tarea):
+    """Dibuja y guarda una hoja en output/. Se ejecuta en un proceso del pool."""
+    config, cartones, serie, num_hoja, num_juego = tarea
+    return generar_hoja_bingo_jpg(
+        len(cartones), config.cols, config.rows,
+        serie_carton=serie, num_hoja=num_hoja, num_juego=num_juego,
+        config=config, cartones=cartones
+    )
+
+def _renderizar_hoja_jpeg(tarea):
+    """Dibuja una hoja y la devuelve codificada en JPEG, sin tocar el disco."""
+    config, cartones, serie, num_hoja, num_juego = tarea
+    sheet_img, _ = componer_hoja(cartones, config, serie, num_hoja, num_juego)
+    return codificar_jpeg(sheet_img, dpi=config.dpi)
+
+def _renderizar_numerada(tarea):
+    """Dibuja la hoja y devuelve (índice del juego, resultado) para agrupar por juego."""
+    renderizar, (indice_juego, tarea_hoja) = tarea
+    return indice_juego, renderizar(tarea_hoja)
+
+def _medido(funcion, *args):
+    """Ejecuta la tarea en el proceso del pool y devuelve también lo que midió allí."""
+    resultado = funcion(*args)
+    return resultado, instrumentacion.extraer()
+
+def _enviar(executor, funcion, *args):
+    if instrumentacion.activa():
+        return executor.submit(_medido, funcion, *args)
+    return executor.submit(funcion, *args)
+
+def _resultado(futuro):
+    resultado = futuro.result()
+    if instrumentacion.activa():
+        resultado, mediciones = resultado
+        instrumentacion.combinar(mediciones)
+    return resultado
+
+def _tareas_juego(juego):
+    config, serie, num_juego, hojas, _ = juego
+    return ((config, cartones, serie, num_hoja, num_juego) for num_hoja, cartones in enumerate(hojas, start=1))
+
+def _resultados_en_orden(futuros):
+    """Entrega los resultados en orden y suelta cada uno apenas se consume."""
+    futuros = deque(futuros)
+    while futuros:
+        yield _resultado(futuros.popleft())
+
+def _en_ventana(executor, funcion, tareas, ventana):
+    """
+    Envía las tareas al pool con a lo más `ventana` en vuelo y entrega los
+    resultados en orden. Las tareas se toman del iterable a medida que se
+    consumen los resultados, así la memoria no depende del total de hojas.
+    """
+    pendientes = deque()
+    for tarea in tareas:
+        pendientes.append(_enviar(executor, funcion, tarea))
+        if len(pendientes) >= ventana:
+            yield _resultado(pendientes.popleft())
+    while pendientes:
+        yield _resultado(pendientes.popleft())
+
+def _leer_hoja(ruta):
+    with open(ruta, 'rb') as f:
+        return f.read()
+
+def _guardar_en_cache(ruta, jpeg):
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, 'wb') as f:
+        f.write(jpeg)
+    os.replace(temporal, ruta)
+
+def _renderizar_hoja_en_cache(tarea):
+    """Devuelve la hoja guardada en la caché del manifiesto, o la dibuja y la guarda ahí."""
+    ruta, tarea_hoja = tarea
+    if os.path.exists(ruta):
+        return _leer_hoja(ruta)
+    jpeg = _renderizar_hoja_jpeg(tarea_hoja)
+    _guardar_en_cache(ruta, jpeg)
+    return jpeg
+
+# --- Tubería en un proceso ---
+# Tres etapas que corren a la vez: un hilo compone las hojas, un pool de hilos
+# las codifica en JPEG (Pillow suelta el GIL al codificar) y el hilo principal
+# escribe las páginas del PDF a medida que llegan, en orden. Entre el dibujo y
+# la escritura hay una cola acotada de futuros: si la escritura se atrasa, el
+# dibujo se detiene, así nunca hay más de `capacidad` hojas en memoria.
+
+_FIN = object()
+
+def _codificar_hoja(sheet_img, dpi, ruta=None):
+    jpeg = codificar_jpeg(sheet_img, dpi=dpi)
+    if ruta is not None:
+        _guardar_en_cache(ruta, jpeg)
+    return jpeg
+
+def _producir_hojas(pendientes, manifiesto, codificador, cola, detener):
+    """Etapa de dibujo: pone en `cola` (índice del juego, futuro con el JPEG) por cada hoja."""
+    try:
+        for i, pendiente in enumerate(pendientes):
+            for tarea in _tareas_pendiente(pendiente, manifiesto):
+                if detener.is_set():
+                    return
+                ruta = None
+                if pendiente[2] is not None:
+                    ruta, tarea = tarea
+                    if os.path.exists(ruta):
+                        cola.put((i, codificador.submit(_leer_hoja, ruta)))
+                        continue
+                config, cartones, serie, num_hoja, num_juego = tarea
+                sheet_img, _ = componer_hoja(cartones, config, serie, num_hoja, num_juego)
+                cola.put((i, codificador.submit(_codificar_hoja, sheet_img, config.dpi, ruta)))
+        cola.put(_FIN)
+    except BaseException as error:
+        cola.put((None, error))
+
+def _hojas_codificadas(cola):
+    """Etapa de escritura: entrega (índice del juego, JPEG) en el orden de las hojas."""
+    while True:
+        item = cola.get()
+        if item is _FIN:
+            return
+        i, futuro = item
+        if i is None:
+            raise futuro
+        yield i, futuro.result()
+
+def _renderizar_en_tuberia(pendientes, manifiesto, pagesize, max_paginas, max_bytes, hilos, capacidad=None):
+    capacidad = capacidad or 2 * hilos
+    cola = queue.Queue(maxsize=capacidad)
+    detener = threading.Event()
+    with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='codificacion') as codificador:
+        productor = threading.Thread(target=_producir_hojas, args=(pendientes, manifiesto, codificador, cola, detener),
+                                     name='dibujo', daemon=True)
+        productor.start()
+        try:
+            for i, grupo in groupby(_hojas_codificadas(cola), key=lambda resultado: resultado[0]):
+                pendiente = pendientes[i]
+                logging.info(f"Juego {pendiente[0][2]}: armando PDF")
+                archivos = _armar_pdf(pendiente[0], (hoja for _, hoja in grupo), pagesize, True, max_paginas, max_bytes)
+                _registrar(manifiesto, pendiente, archivos)
+        finally:
+            # Si la escritura falló, el dibujo puede estar esperando lugar en la cola
+            detener.set()
+            while productor.is_alive():
+                try:
+                    cola.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+def _armar_pdf(juego, hojas, pagesize, en_memoria, max_paginas=None, max_bytes=None):
+    """Arma el PDF del juego y devuelve la lista de archivos escritos."""
+    if en_memoria:
+        return imagenes_a_pdf(hojas, juego[4], pagesize, max_paginas=max_paginas, max_bytes=max_bytes)
+    pngs_a_pdf_carta(list(hojas), juego[4], pagesize)
+    return [juego[4]]
+
+def _para_enviar(juego):
+    """
+    El juego listo para otro proceso: un iterador de hojas no se puede enviar,
+    así que se junta en un arreglo (el juego entero va a un solo proceso igual).
+    """
+    config, serie, num_juego, hojas, nombre_pdf = juego
+    if iter(hojas) is hojas:
+        hojas = np.asarray(list(hojas))
+    return config, serie, num_juego, hojas, nombre_pdf
+
+def _claves_al_pasar(pendiente, hojas, manifiesto, opciones):
+    """
+    Entrega las hojas de un iterador de una sola pasada calculando la clave de
+    cada una, y al final la del juego, a medida que pasan hacia el dibujo.
+    """
+    sha = manifiesto.hash_juego(pendiente[0], opciones)
+    clave_render = manifiesto.clave_render(pendiente[0])
+    for num_hoja, cartones in enumerate(hojas, start=1):
+        sha.update(np.ascontiguousarray(cartones).tobytes())
+        if pendiente[2] is not None:
+            pendiente[2].append(manifiesto.clave_hoja(clave_render, num_hoja, cartones))
+        yield cartones
+    pendiente[1] = sha.hexdigest()
+
+def _pendientes(juegos, manifiesto, opciones, cache_hojas):
+    """
+    Juegos que hay que construir, como listas [juego, clave, claves_hojas].
+    Sin manifiesto son todos (con clave None); con manifiesto se omiten los que
+    ya están completos y, si `cache_hojas`, se calcula la clave de cada hoja.
+    Las hojas se recorren de a una para calcular las claves, sin juntarlas.
+    """
+    if manifiesto is None:
+        return [[juego, None, None] for juego in juegos]
+
+    pendientes = []
+    for juego in juegos:
+        config, serie, num_juego, hojas, nombre_pdf = juego
+        if iter(hojas) is hojas:
+            # Un iterador no se puede recorrer dos veces: las claves se calculan
+            # mientras se dibuja, así que el juego no se omite, pero sí retoma
+            # desde las hojas en la caché.
+            pendiente = [juego, None, [] if cache_hojas else None]
+            pendiente[0] = (config, serie, num_juego, _claves_al_pasar(pendiente, hojas, manifiesto, opciones), nombre_pdf)
+            pendientes.append(pendiente)
+            continue
+        clave, claves_hojas = manifiesto.claves(juego, hojas, opciones, por_hoja=cache_hojas)
+        if manifiesto.juego_completo(nombre_pdf, clave):
+            print(f"⏭️  {nombre_pdf} no cambió desde la última corrida, se omite.")
+            continue
+        pendientes.append([juego, clave, claves_hojas])
+    return pendientes
+
+def _tareas_pendiente(pendiente, manifiesto):
+    juego, _, claves_hojas = pendiente
+    if claves_hojas is None:
+        return _tareas_juego(juego)
+    # Las tareas van primero en el zip: con un iterador, la clave de cada hoja se
+    # agrega a claves_hojas recién cuando su hoja pasa
+    return ((manifiesto.ruta_hoja(clave_hoja), tarea) for tarea, clave_hoja in zip(_tareas_juego(juego), claves_hojas))
+
+def _registrar(manifiesto, pendiente, archivos):
+    if manifiesto is not None:
+        juego, clave, claves_hojas = pendiente
+        manifiesto.registrar_juego(juego[4], clave, archivos, claves_hojas or ())
+
+def renderizar_juegos(juegos, workers=None, pagesize=letter, en_memoria=True, vectorial=False,
+                      max_paginas=None, max_bytes=None, ventana=None, manifiesto=None, hilos=None):
+    """
+    Dibuja las hojas de todos los juegos en `workers` procesos y arma un PDF por juego.
+
+    Cada juego es una tupla (config, serie, num_juego, hojas, nombre_pdf), donde
+    `hojas` es un arreglo (n_hojas, cartones_por_hoja, 5, 5) ya generado, o
+    cualquier iterable de lotes (cartones_por_hoja, 5, 5). Cada hoja depende solo
+    de su tarea, así que el resultado no cambia con la cantidad de procesos.
+    Las páginas de cada PDF quedan en el orden de las hojas.
+    Con `en_memoria` las hojas pasan como JPEG en memoria directo al PDF;
+    si no, se guardan en output/ y se borran al armar el PDF.
+    Con `vectorial` cada juego se dibuja como PDF vectorial, un juego por proceso.
+
+    Con `max_paginas` o `max_bytes` cada PDF se parte en volúmenes que se cierran
+    en cuanto se llenan. A lo más `ventana` hojas (por defecto 2 por proceso)
+    están en vuelo a la vez, de modo que la memoria no crece con la impresión.
+
+    Con un `manifiesto` (ManifiestoImpresion) se omiten los juegos que no
+    cambiaron desde la corrida anterior y, en el modo en memoria, cada hoja
+    queda en su caché para retomar una corrida interrumpida desde esa hoja.
+
+    Con `hilos` (solo en memoria y rasterizado) todo corre en este proceso como
+    una tubería: un hilo dibuja, `hilos` hilos codifican y el principal escribe
+    el PDF, con a lo más `ventana` hojas entre el dibujo y la escritura.
+    """
+    opciones = {'pagesize': list(pagesize), 'en_memoria': en_memoria, 'vectorial': vectorial,
+                'max_paginas': max_paginas, 'max_bytes': max_bytes}
+    cache_hojas = manifiesto is not None and en_memoria and not vectorial
+    if cache_hojas:
+        os.makedirs(manifiesto.dir_cache, exist_ok=True)
+    pendientes = _pendientes(juegos, manifiesto, opciones, cache_hojas)
+
+    if vectorial:
+        # reportlab solo se importa si se pide el backend vectorial
+        from carton_vectorial import generar_pdf_vectorial
+        if workers is not None and workers <= 1:
+            for pendiente in pendientes:
+                _registrar(manifiesto, pendiente, generar_pdf_vectorial(pendiente[0], pagesize, max_paginas=max_paginas))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futuros = [_enviar(executor, generar_pdf_vectorial, _para_enviar(pendiente[0]), pagesize, max_paginas) for pendiente in pendientes]
+                for pendiente, archivos in zip(pendientes, _resultados_en_orden(futuros)):
+                    _registrar(manifiesto, pendiente, archivos)
+        return
+
+    if hilos and en_memoria:
+        _renderizar_en_tuberia(pendientes, manifiesto, pagesize, max_paginas, max_bytes, hilos, ventana)
+        return
+
+    if cache_hojas:
+        renderizar = _renderizar_hoja_en_cache
+    else:
+        renderizar = _renderizar_hoja_jpeg if en_memoria else _renderizar_hoja
+
+    if workers is not None and workers <= 1:
+        for pendiente in pendientes:
+            hojas = (renderizar(tarea) for tarea in _tareas_pendiente(pendiente, manifiesto))
+            _registrar(manifiesto, pendiente, _armar_pdf(pendiente[0], hojas, pagesize, en_memoria, max_paginas, max_bytes))
+        return
+
+    ventana = ventana or 2 * (workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Las hojas de todos los juegos van al pool en una sola secuencia, con una
+        # ventana acotada; los PDF se arman en orden a medida que llegan las hojas
+        # de cada juego, mientras los procesos ya dibujan las del siguiente.
+        tareas = ((i, tarea) for i, pendiente in enumerate(pendientes) for tarea in _tareas_pendiente(pendiente, manifiesto))
+        resultados = _en_ventana(executor, _renderizar_numerada, ((renderizar, t) for t in tareas), ventana)
+        for i, grupo in groupby(resultados, key=lambda resultado: resultado[0]):
+            pendiente = pendientes[i]
+            logging.info(f"Juego {pendiente[0][2]}: armando PDF")
+            archivos = _armar_pdf(pendiente[0], (hoja for _, hoja in grupo), pagesize, en_memoria, max_paginas, max_bytes)
+            _registrar(manifiesto, pendiente, archivos)
@@ -0,0 +1,444 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from carton_bingo import (
+    COLORS_ARRAY, SERIES_JUEGOS, calc_sizes, cartones_hoja_derivados, componer_hoja, configuracion_actual,
+)
+from codigo_reclamo import VARIABLE_ENTORNO, qr_disponible, verificar_reclamo
+from consolida_pdf import EscritorPdfJpeg, codificar_jpeg, letter
+from generar_numeros_carton import derivar_carton
+from manifiesto import recursos_dibujo
+from registro_cartones import RegistroCartones, parsear_serial
+from verificador import CELDA_LIBRE, patrones_completos
+
+# Servicio HTTP local para generar impresiones a pedido.
+#
+# Los cartones se derivan de la semilla y su serial (generar_numeros_carton), así
+# que cada hoja queda definida por (semilla, juego, serie, color, cartones por
+# hoja, número de hoja): esa es la clave con que se cachea, junto con una huella
+# de cómo se dibuja (paleta, código de reclamo, fuentes, logo, firma y clave de
+# los códigos, como en el manifiesto), porque la caché en disco sobrevive a los
+# reinicios del servidor. Las hojas se dibujan
+# en un pool de procesos; pedidos iguales que llegan a la vez esperan el mismo
+# dibujo, y las hojas listas quedan en una caché LRU en memoria o en disco.
+# Los PDF se envían página por página con transferencia chunked a medida que se
+# dibujan las hojas.
+#
+# Rutas:
+#   GET /salud
+#   GET /estado                                  estadísticas de caché y pool
+#   GET /juegos/<juego>.pdf?semilla=&hojas=&serie=&color=&por_hoja=
+#   GET /juegos/<juego>/hojas/<hoja>.jpg?semilla=&serie=&color=&por_hoja=
+#   GET /verificar?serial=...&cantados=1,2,3&semilla=
+#       (o juego=&serie=&carton= en lugar de serial)
+#   GET /reclamo?codigo=...&cantados=1,2,3      con el QR de reclamo leído del cartón
+
+CARTONES_POR_HOJA = 6
+HOJAS_POR_JUEGO = 30
+
+
+class CacheHojas:
+    """Caché LRU de hojas JPEG acotada en bytes, en memoria o en un directorio."""
+
+    def __init__(self, max_bytes=512 * 2**20, directorio=None):
+        self.max_bytes = max_bytes
+        self.directorio = directorio
+        self._entradas = OrderedDict()  # clave -> tamaño (y bytes si está en memoria)
+        self._datos = {}
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+            self._indexar_directorio()
+
+    def _indexar_directorio(self):
+        """Incorpora las hojas que dejó un proceso anterior, de la más vieja a la más nueva."""
+        hojas = []
+        for entrada in os.scandir(self.directorio):
+            if entrada.is_file() and entrada.name.endswith('.jpg'):
+                estado = entrada.stat()
+                hojas.append((estado.st_mtime, entrada.name[:-4], estado.st_size))
+        for _, clave, tamano in sorted(hojas):
+            self._entradas[clave] = tamano
+            self.bytes += tamano
+        self._recortar()
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, clave + '.jpg')
+
+    def obtener(self, clave):
+        if clave not in self._entradas:
+            self.fallos += 1
+            return None
+        self._entradas.move_to_end(clave)
+        self.aciertos += 1
+        if self.directorio:
+            with open(self._ruta(clave), 'rb') as f:
+                return f.read()
+        return self._datos[clave]
+
+    def guardar(self, clave, jpeg):
+        if clave in self._entradas or len(jpeg) > self.max_bytes:
+            return
+        if self.directorio:
+            # Escritura atómica: un proceso cortado no deja hojas a medias para el próximo
+            temporal = self._ruta(clave) + '.tmp'
+            with open(temporal, 'wb') as f:
+                f.write(jpeg)
+            os.replace(temporal, self._ruta(clave))
+        else:
+            self._datos[clave] = jpeg
+        self._entradas[clave] = len(jpeg)
+        self.bytes += len(jpeg)
+        self._recortar()
+
+    def _recortar(self):
+        while self.bytes > self.max_bytes:
+            vieja, tamano = self._entradas.popitem(last=False)
+            self.bytes -= tamano
+            if self.directorio:
+                os.remove(self._ruta(vieja))
+            else:
+                del self._datos[vieja]
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+def _dibujar_hoja(semilla, num_juego, serie, num_hoja, por_hoja, config):
+    """Deriva los cartones de la hoja y la dibuja como JPEG. Corre en el pool."""
+    cartones = cartones_hoja_derivados(semilla, num_juego, serie, num_hoja, por_hoja)
+    sheet_img, _ = componer_hoja(cartones, config, serie, num_hoja, num_juego)
+    return codificar_jpeg(sheet_img, dpi=config.dpi)
+
+
+class _Sumidero:
+    """Destino de EscritorPdfJpeg que acumula lo escrito hasta que se envía."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+class ErrorHttp(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+_RAZONES = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class ServidorBingo:
+    """Servicio asyncio: dibuja hojas en un pool, deduplica pedidos y cachea resultados."""
+
+    def __init__(self, semilla=None, workers=None, cache=None, registro=None, ventana=None, paleta=False, codigo=False):
+        if semilla is None:
+            semilla = int(np.random.SeedSequence().entropy) & 0xFFFFFFFFFFFFFFFF
+        self.semilla = semilla
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.cache = cache if cache is not None else CacheHojas()
+        self.registro = RegistroCartones(registro) if registro else None
+        self.ventana = ventana or 2 * (workers or os.cpu_count() or 1)
+        self.paleta = paleta
+        self.codigo = codigo
+        dibujo = {'paleta': paleta, 'codigo': codigo, 'recursos': recursos_dibujo()}
+        self.huella_dibujo = hashlib.sha256(json.dumps(dibujo, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        self._en_vuelo = {}
+        self._configs = {}
+        self.hojas_dibujadas = 0
+        self.pedidos_compartidos = 0
+
+    # --- Hojas ---
+
+    def _config(self, por_hoja, color):
+        clave = (por_hoja, color)
+        if clave not in self._configs:
+            # calc_sizes ajusta los tamaños globales; configuracion_actual los fija en la config
+            cols, rows = calc_sizes(por_hoja, 'letter')
+            self._configs[clave] = configuracion_actual(cols, rows, border_color=color, paleta=self.paleta, codigo=self.codigo)
+        return self._configs[clave]
+
+    async def hoja(self, semilla, num_juego, serie, color, por_hoja, num_hoja):
+        """JPEG de una hoja: desde la caché, desde un dibujo ya en curso o dibujándola."""
+        clave = f"{semilla}-{num_juego}-{ord(serie)}-{color}-{por_hoja}-{num_hoja}-{self.huella_dibujo}"
+        jpeg = self.cache.obtener(clave)
+        if jpeg is not None:
+            return jpeg
+
+        futuro = self._en_vuelo.get(clave)
+        if futuro is None:
+            loop = asyncio.get_running_loop()
+            config = self._config(por_hoja, color)
+            futuro = loop.run_in_executor(self.pool, _dibujar_hoja, semilla, num_juego, serie, num_hoja, por_hoja, config)
+            self._en_vuelo[clave] = futuro
+            futuro.add_done_callback(lambda f: self._terminar(clave, f))
+            self.hojas_dibujadas += 1
+        else:
+            self.pedidos_compartidos += 1
+        # shield: si un cliente se desconecta, el dibujo sigue para los demás que lo esperan
+        return await asyncio.shield(futuro)
+
+    def _terminar(self, clave, futuro):
+        self._en_vuelo.pop(clave, None)
+        if not futuro.cancelled() and futuro.exception() is None:
+            self.cache.guardar(clave, futuro.result())
+
+    # --- Parámetros ---
+
+    def _parametros_juego(self, num_juego, params):
+        if not 1 <= num_juego <= 0xFFFF:
+            raise ErrorHttp(400, f"Número de juego inválido: {num_juego}")
+        semilla = _entero(params.get('semilla', self.semilla))
+        serie = params.get('serie', SERIES_JUEGOS[(num_juego - 1) % len(SERIES_JUEGOS)])
+        color = params.get('color', COLORS_ARRAY[(num_juego - 1) % len(COLORS_ARRAY)])
+        por_hoja = _entero(params.get('por_hoja', CARTONES_POR_HOJA))
+        if len(serie) != 1:
+            raise ErrorHttp(400, f"La serie debe ser una sola letra: {serie!r}")
+        if color not in COLORS_ARRAY:
+            raise ErrorHttp(400, f"Color desconocido: {color!r}")
+        if not 1 <= por_hoja <= 12:
+            raise ErrorHttp(400, f"Cartones por hoja fuera de rango: {por_hoja}")
+        return semilla, serie, color, por_hoja
+
+    # --- Rutas ---
+
+    async def _pdf_juego(self, escritor, num_juego, params):
+        semilla, serie, color, por_hoja = self._parametros_juego(num_juego, params)
+        hojas = _entero(params.get('hojas', HOJAS_POR_JUEGO))
+        if not 1 <= hojas <= 10_000:
+            raise ErrorHttp(400, f"Cantidad de hojas fuera de rango: {hojas}")
+
+        nombre = f"cartones_juego_{num_juego:02d}_{serie}_{color}.pdf"
+        await _enviar_cabecera(escritor, 200, 'application/pdf', chunked=True,
+                               extra={'Content-Disposition': f'inline; filename="{nombre}"'})
+        sumidero = _Sumidero()
+        pdf = EscritorPdfJpeg(sumidero, letter)
+
+        # Las hojas siguientes se piden antes de necesitarlas, con una ventana acotada
+        pendientes = deque()
+        siguiente = 1
+        try:
+            while siguiente <= hojas or pendientes:
+                while siguiente <= hojas and len(pendientes) < self.ventana:
+                    pendientes.append(asyncio.ensure_future(self.hoja(semilla, num_juego, serie, color, por_hoja, siguiente)))
+                    siguiente += 1
+                pdf.agregar_pagina(await pendientes.popleft())
+                await _enviar_chunk(escritor, sumidero.vaciar())
+            pdf.cerrar()
+            await _enviar_chunk(escritor, sumidero.vaciar())
+            await _terminar_chunks(escritor)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception:
+            # La cabecera 200 ya salió: un 500 en medio del cuerpo dejaría un PDF
+            # corrupto. Se corta la conexión sin el chunk final, así el cliente ve
+            # una transferencia incompleta.
+            logging.exception(f"Error armando el PDF del juego {num_juego}; se corta la respuesta")
+            escritor.transport.abort()
+        finally:
+            for tarea in pendientes:
+                tarea.cancel()
+
+    async def _jpg_hoja(self, escritor, num_juego, num_hoja, params):
+        semilla, serie, color, por_hoja = self._parametros_juego(num_juego, params)
+        if num_hoja < 1:
+            raise ErrorHttp(400, f"Número de hoja inválido: {num_hoja}")
+        jpeg = await self.hoja(semilla, num_juego, serie, color, por_hoja, num_hoja)
+        await _responder(escritor, 200, 'image/jpeg', jpeg)
+
+    def verificar(self, params):
+        """Verifica un reclamo: qué patrones completa el cartón con los números cantados."""
+        if 'serial' in params:
+            try:
+                num_juego, serie, carton_id = parsear_serial(params['serial'])
+            except ValueError as error:
+                raise ErrorHttp(400, str(error))
+        else:
+            try:
+                num_juego, serie, carton_id = int(params['juego']), params['serie'], int(params['carton'])
+            except (KeyError, ValueError):
+                raise ErrorHttp(400, "Indique serial=... o juego=, serie= y carton=")
+        if len(serie) != 1:
+            raise ErrorHttp(400, f"La serie debe ser una sola letra: {serie!r}")
+        if not 1 <= num_juego <= 0xFFFF or carton_id < 1:
+            raise ErrorHttp(400, f"Cartón inválido: {num_juego}-{serie}-{carton_id}")
+
+        if self.registro is not None:
+            carton = self.registro.buscar(num_juego, serie, carton_id)
+            if carton is None:
+                raise ErrorHttp(404, f"No existe el cartón {num_juego}-{serie}-{carton_id} en el registro")
+        else:
+            carton = derivar_carton(_entero(params.get('semilla', self.semilla)), num_juego, serie, carton_id)
+
+        cantados = _cantados(params)
+        celdas = np.isin(carton.ravel(), list(cantados))
+        marcadas = CELDA_LIBRE | int(np.bitwise_or.reduce(np.where(celdas, 1 << np.arange(25), 0)))
+        completos = patrones_completos(marcadas)
+        return {
+            'juego': num_juego, 'serie': serie, 'carton': carton_id,
+            'numeros': carton.tolist(),
+            'marcadas': marcadas,
+            'patrones': list(completos),
+            'mascaras_ganadoras': completos,
+        }
+
+    def reclamo(self, params):
+        """Verifica un reclamo con el código QR del cartón; no necesita registro ni semilla."""
+        if 'codigo' not in params:
+            raise ErrorHttp(400, "Indique codigo=... (el contenido del QR del cartón)")
+        cantados = _cantados(params)
+        try:
+            return verificar_reclamo(params['codigo'], cantados)
+        except ValueError as error:
+            raise ErrorHttp(400, str(error))
+
+    def estado(self):
+        return {
+            'cache': {'hojas': len(self.cache), 'bytes': self.cache.bytes,
+                      'aciertos': self.cache.aciertos, 'fallos': self.cache.fallos},
+            'en_vuelo': len(self._en_vuelo),
+            'hojas_dibujadas': self.hojas_dibujadas,
+            'pedidos_compartidos': self.pedidos_compartidos,
+        }
+
+    async def atender(self, lector, escritor):
+        """Atiende una conexión: un pedido HTTP/1.1 GET por conexión."""
+        try:
+            linea = await lector.readline()
+            while (await lector.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            try:
+                metodo, objetivo, _ = linea.decode('latin-1').split(' ', 2)
+            except ValueError:
+                raise ErrorHttp(400, 'Pedido mal formado')
+            if metodo != 'GET':
+                raise ErrorHttp(405, f"Método no soportado: {metodo}")
+
+            url = urlsplit(objetivo)
+            partes = [unquote(p) for p in url.path.strip('/').split('/') if p]
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+            if partes == ['salud']:
+                await _responder_json(escritor, {'ok': True})
+            elif partes == ['estado']:
+                await _responder_json(escritor, self.estado())
+            elif partes == ['verificar']:
+                await _responder_json(escritor, self.verificar(params))
+            elif partes == ['reclamo']:
+                await _responder_json(escritor, self.reclamo(params))
+            elif len(partes) == 2 and partes[0] == 'juegos' and partes[1].endswith('.pdf'):
+                await self._pdf_juego(escritor, _entero(partes[1][:-4]), params)
+            elif len(partes) == 4 and partes[0] == 'juegos' and partes[2] == 'hojas' and partes[3].endswith('.jpg'):
+                await self._jpg_hoja(escritor, _entero(partes[1]), _entero(partes[3][:-4]), params)
+            else:
+                raise ErrorHttp(404, f"Ruta desconocida: {url.path}")
+        except ErrorHttp as error:
+            await _responder_json(escritor, {'error': str(error)}, error.estado)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as error:
+            logging.exception("Error atendiendo pedido")
+            try:
+                await _responder_json(escritor, {'error': str(error)}, 500)
+            except ConnectionError:
+                pass
+        finally:
+            escritor.close()
+
+    def cerrar(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def _entero(texto):
+    try:
+        return int(texto)
+    except ValueError:
+        raise ErrorHttp(400, f"Se esperaba un número: {texto!r}")
+
+def _cantados(params):
+    """Números cantados del parámetro `cantados` (separados por comas), todos entre 1 y 75."""
+    cantados = {_entero(n) for n in params.get('cantados', '').replace(' ', '').split(',') if n}
+    fuera = sorted(n for n in cantados if not 1 <= n <= 75)
+    if fuera:
+        raise ErrorHttp(400, f"Números cantados fuera de rango (1-75): {fuera[:10]}")
+    return cantados
+
+async def _enviar_cabecera(escritor, estado, tipo, largo=None, chunked=False, extra=None):
+    lineas = [f"HTTP/1.1 {estado} {_RAZONES.get(estado, '')}", f"Content-Type: {tipo}", "Connection: close"]
+    if chunked:
+        lineas.append("Transfer-Encoding: chunked")
+    elif largo is not None:
+        lineas.append(f"Content-Length: {largo}")
+    lineas.extend(f"{nombre}: {valor}" for nombre, valor in (extra or {}).items())
+    escritor.write(('\r\n'.join(lineas) + '\r\n\r\n').encode('latin-1'))
+    await escritor.drain()
+
+async def _enviar_chunk(escritor, datos):
+    if datos:
+        escritor.write(f"{len(datos):x}\r\n".encode() + datos + b"\r\n")
+        await escritor.drain()
+
+async def _terminar_chunks(escritor):
+    escritor.write(b"0\r\n\r\n")
+    await escritor.drain()
+
+async def _responder(escritor, estado, tipo, cuerpo):
+    await _enviar_cabecera(escritor, estado, tipo, largo=len(cuerpo))
+    escritor.write(cuerpo)
+    await escritor.drain()
+
+async def _responder_json(escritor, datos, estado=200):
+    await _responder(escritor, estado, 'application/json; charset=utf-8', json.dumps(datos, ensure_ascii=False).encode())
+
+async def servir(host='127.0.0.1', puerto=4065, **opciones):
+    servidor_bingo = ServidorBingo(**opciones)
+    servidor = await asyncio.start_server(servidor_bingo.atender, host, puerto)
+    print(f"Servidor de bingo escuchando en http://{host}:{puerto} (semilla {servidor_bingo.semilla})")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        servidor_bingo.cerrar()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servicio HTTP local para generar cartones de bingo a pedido.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('-p', '--puerto', type=int, default=4065)
+    parser.add_argument('--semilla', type=int, default=None, help='Semilla maestra de la impresión (por defecto, una al azar)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Procesos para dibujar las hojas')
+    parser.add_argument('--cache-mb', type=float, default=512, help='Tamaño máximo de la caché de hojas')
+    parser.add_argument('--cache-dir', default=None, help='Guardar la caché de hojas en este directorio en lugar de memoria')
+    parser.add_argument('--registro', default=None, help='Registro de cartones para verificar reclamos (si no, se derivan de la semilla)')
+    parser.add_argument('--paleta', action='store_true', help='Dibujar las hojas en modo paleta (menos memoria por hoja, no más rápido)')
+    parser.add_argument('--codigo', action='store_true', help='Código QR de reclamo en cada cartón (clave en BINGO_CLAVE_RECLAMO)')
+    args = parser.parse_args()
+    if args.codigo and not qr_disponible():
+        parser.error('--codigo necesita el paquete qrcode (pip install qrcode)')
+
+    logging.basicConfig(format='%(asctime)s %(message)s', level=logging.INFO)
+    if args.codigo and not os.environ.get(VARIABLE_ENTORNO):
+        logging.warning(f"{VARIABLE_ENTORNO} no está definida: los códigos de reclamo no se podrán autenticar")
+    cache = CacheHojas(int(args.cache_mb * 2**20), args.cache_dir)
+    try:
+        asyncio.run(servir(args.host, args.puerto, semilla=args.semilla, workers=args.workers,
+                           cache=cache, registro=args.registro, paleta=args.paleta, codigo=args.codigo))
+    except KeyboardInterrupt:
+        pass
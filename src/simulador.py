@@ -0,0 +1,141 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from generar_numeros_carton import generar_cartones_lote
+from verificador import PATRONES
+
+# Simulación de Monte Carlo de juegos completos contra los cartones de una impresión.
+# Para cada juego se sortea el orden de las 75 bolas y se calcula, para cada celda
+# de cada cartón, en qué bola se marca; un patrón se completa en la bola más tardía
+# de sus celdas, y el primer ganador es el cartón que lo completa antes.
+
+MAX_BOLAS = 75
+
+def _celdas_mascara(mascara):
+    """
+    Celdas de una máscara. Si forman una progresión aritmética (filas, columnas,
+    diagonales, cartón lleno) se devuelven como slice para leerlas sin copiar.
+    """
+    celdas = [celda for celda in range(25) if mascara >> celda & 1]
+    paso = celdas[1] - celdas[0] if len(celdas) > 1 else 1
+    if celdas == list(range(celdas[0], celdas[-1] + 1, paso)):
+        return slice(celdas[0], celdas[-1] + 1, paso)
+    return celdas
+
+def _simular_bloque(cartones, cantidad_juegos, patrones, semilla, tamano_bloque):
+    """
+    Simula `cantidad_juegos` juegos por bloques y devuelve, por patrón, los
+    histogramas de la bola del primer ganador y de la cantidad de ganadores
+    simultáneos en esa bola.
+    """
+    rng = np.random.default_rng(semilla)
+    # celdas[k, c] = número en la celda k del cartón c
+    celdas = np.ascontiguousarray(cartones.reshape(len(cartones), 25).T).astype(np.intp)
+    grupos = {nombre: [_celdas_mascara(m) for m in mascaras] for nombre, mascaras in patrones.items()}
+    bolas = {nombre: np.zeros(MAX_BOLAS + 1, dtype=np.int64) for nombre in patrones}
+    simultaneos = {nombre: np.zeros(len(cartones) + 1, dtype=np.int64) for nombre in patrones}
+    bolas_ordenadas = np.arange(1, MAX_BOLAS + 1, dtype=np.uint8)
+
+    restantes = cantidad_juegos
+    while restantes > 0:
+        juegos = min(restantes, tamano_bloque)
+        restantes -= juegos
+
+        # turno[n, g] = bola en que sale el número n en el juego g (0 = espacio libre);
+        # los turnos de un juego son en sí una permutación al azar de 1..75.
+        # Todo se guarda con los juegos en el eje contiguo, así cada máximo y mínimo
+        # es una operación elemento a elemento sobre arreglos uint8.
+        turno = np.zeros((MAX_BOLAS + 1, juegos), dtype=np.uint8)
+        turno[1:] = rng.permuted(np.broadcast_to(bolas_ordenadas, (juegos, MAX_BOLAS)), axis=1).T
+
+        # marcas[k, c, g] = bola en que se marca la celda k del cartón c en el juego g
+        marcas = turno[celdas]
+
+        for nombre, lista_celdas in grupos.items():
+            tiempo = None
+            for celdas_mascara in lista_celdas:
+                t = marcas[celdas_mascara].max(axis=0)
+                tiempo = t if tiempo is None else np.minimum(tiempo, t, out=tiempo)
+            primero = tiempo.min(axis=0)
+            ganadores = np.count_nonzero(tiempo == primero, axis=0)
+            bolas[nombre] += np.bincount(primero, minlength=MAX_BOLAS + 1)
+            simultaneos[nombre] += np.bincount(ganadores, minlength=len(cartones) + 1)
+
+    return bolas, simultaneos
+
+def _percentil(histograma, q):
+    acumulado = np.cumsum(histograma)
+    return int(np.searchsorted(acumulado, q * acumulado[-1]))
+
+def simular_juegos(cartones, cantidad_juegos, patrones=('linea', 'cuatro_esquinas', 'carton_lleno'),
+                   semilla=None, workers=1, tamano_bloque=500, segundos_por_bola=12):
+    """
+    Juega `cantidad_juegos` juegos al azar contra `cartones` (arreglo (N, 5, 5)).
+
+    Devuelve un dict patrón -> resumen con la distribución de bolas hasta el
+    primer ganador, los ganadores simultáneos esperados y la duración estimada
+    del juego en minutos (a `segundos_por_bola`). Con `workers` > 1 los juegos
+    se reparten entre procesos, cada uno con su propia semilla derivada.
+    """
+    cartones = np.asarray(cartones, dtype=np.uint8)
+    if not isinstance(patrones, dict):
+        patrones = {nombre: PATRONES[nombre] for nombre in patrones}
+
+    workers = max(1, workers or 1)
+    semillas = np.random.SeedSequence(semilla).spawn(workers)
+    partes = [cantidad_juegos // workers + (1 if i < cantidad_juegos % workers else 0) for i in range(workers)]
+    tareas = [(cartones, partes[i], patrones, semillas[i], tamano_bloque) for i in range(workers) if partes[i]]
+
+    if workers == 1:
+        resultados = [_simular_bloque(*tarea) for tarea in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            resultados = list(executor.map(_simular_bloque, *zip(*tareas)))
+
+    resumen = {}
+    for nombre in patrones:
+        bolas = sum(r[0][nombre] for r in resultados)
+        simultaneos = sum(r[1][nombre] for r in resultados)
+        bolas_media = float(np.dot(np.arange(len(bolas)), bolas) / cantidad_juegos)
+        resumen[nombre] = {
+            'juegos': cantidad_juegos,
+            'cartones': len(cartones),
+            'bolas_primer_ganador': {
+                'media': bolas_media,
+                'p10': _percentil(bolas, 0.10),
+                'p50': _percentil(bolas, 0.50),
+                'p90': _percentil(bolas, 0.90),
+                'histograma': bolas.tolist(),
+            },
+            'ganadores_simultaneos': {
+                'media': float(np.dot(np.arange(len(simultaneos)), simultaneos) / cantidad_juegos),
+                'prob_mas_de_uno': float(simultaneos[2:].sum() / cantidad_juegos),
+                'max': int(np.flatnonzero(simultaneos)[-1]),
+            },
+            'duracion_minutos': {
+                'media': bolas_media * segundos_por_bola / 60,
+                'p90': _percentil(bolas, 0.90) * segundos_por_bola / 60,
+            },
+        }
+    return resumen
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simula juegos de bingo para dimensionar una impresión.')
+    parser.add_argument('--cartones', type=int, default=180, help='Cartones vendidos por juego')
+    parser.add_argument('--juegos', type=int, default=100_000, help='Juegos a simular')
+    parser.add_argument('--workers', type=int, default=1, help='Procesos para repartir los juegos')
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--segundos-por-bola', type=float, default=12)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.semilla)
+    cartones = generar_cartones_lote(args.cartones, rng)
+    resumen = simular_juegos(cartones, args.juegos, semilla=args.semilla, workers=args.workers,
+                             segundos_por_bola=args.segundos_por_bola)
+    for nombre, r in resumen.items():
+        b, s, d = r['bolas_primer_ganador'], r['ganadores_simultaneos'], r['duracion_minutos']
+        print(f"{nombre:16s} bolas: media {b['media']:.1f} (p10 {b['p10']}, p50 {b['p50']}, p90 {b['p90']})"
+              f" | ganadores simultáneos: media {s['media']:.2f}, >1 en {s['prob_mas_de_uno']:.1%}"
+              f" | duración: {d['media']:.1f} min (p90 {d['p90']:.1f})")
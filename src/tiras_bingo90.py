@@ -0,0 +1,127 @@
+import numpy as np
+
+from instrumentacion import contar, etapa
+
+# Bingo de 90 bolas: boletos de 3 filas x 9 columnas con 5 números por fila y
+# columnas por decenas (1-9, 10-19, ..., 80-90). Una tira son 6 boletos que
+# juntos tienen cada número del 1 al 90 exactamente una vez; cada columna de
+# cada boleto tiene entre 1 y 3 números, en orden creciente de arriba abajo.
+#
+# Las tiras se construyen en tres pasos vectorizados sobre todo el lote, cada
+# uno factible por construcción (no se descarta ninguna tira):
+#   1. Cuántos números de cada columna lleva cada boleto. Cada boleto parte con
+#      uno por columna y recibe 6 más; se reparten boleto por boleto con un
+#      greedy que respeta el máximo de 3 y fuerza lo necesario para que los
+#      boletos que quedan puedan absorber el resto (a lo más 2 extra cada uno).
+#   2. En qué filas van: columnas de mayor a menor cantidad, cada una a las
+#      filas que más números les faltan (Gale-Ryser), así cada fila queda con 5.
+#   3. Qué números: cada columna se baraja, se reparte entre los boletos según
+#      el paso 1 y se ordena dentro de cada boleto.
+
+BOLETOS_POR_TIRA = 6
+FILAS_BOLETO = 3
+COLUMNAS_BOLETO = 9
+NUMEROS_POR_FILA = 5
+RANGOS_90 = [(1, 9)] + [(10 * c, 10 * c + 9) for c in range(1, 8)] + [(80, 90)]
+
+_TAMANOS = np.array([maximo - minimo + 1 for minimo, maximo in RANGOS_90])
+_MINIMOS = np.array([minimo for minimo, _ in RANGOS_90])
+_EXTRAS_BOLETO = FILAS_BOLETO * NUMEROS_POR_FILA - COLUMNAS_BOLETO
+
+def _cantidades_por_columna(rng, n):
+    """Cantidad de números de cada columna en cada boleto: (n, 6, 9) entre 1 y 3."""
+    demanda = np.tile(_TAMANOS - BOLETOS_POR_TIRA, (n, 1))
+    cantidades = np.ones((n, BOLETOS_POR_TIRA, COLUMNAS_BOLETO), dtype=np.int64)
+    filas = np.arange(n)
+    for boleto in range(BOLETOS_POR_TIRA):
+        restantes = BOLETOS_POR_TIRA - boleto - 1
+        extra = np.maximum(demanda - 2 * restantes, 0)
+        tope = np.minimum(demanda, 2)
+        faltan = _EXTRAS_BOLETO - extra.sum(axis=1)
+        while faltan.any():
+            # Un número más en una columna con cupo, al azar según lo que le queda por repartir
+            activos = faltan > 0
+            peso = np.where(extra < tope, demanda - extra, 0)
+            acumulado = peso.cumsum(axis=1)
+            sorteo = rng.random(n) * acumulado[:, -1]
+            columna = (acumulado <= sorteo[:, None]).sum(axis=1)
+            extra[filas[activos], columna[activos]] += 1
+            faltan -= activos
+        cantidades[:, boleto] += extra
+        demanda -= extra
+    return cantidades
+
+def _marcas_boletos(rng, cantidades):
+    """Celdas con número de cada boleto: (m, 3, 9) bool con 5 por fila, para cantidades (m, 9)."""
+    m = len(cantidades)
+    boletos = np.arange(m)[:, None]
+    orden = np.argsort(-(cantidades + rng.random(cantidades.shape) * 0.5), axis=1)
+    necesidad = np.full((m, FILAS_BOLETO), NUMEROS_POR_FILA)
+    marcas = np.zeros((m, FILAS_BOLETO, COLUMNAS_BOLETO), dtype=bool)
+    for paso in range(COLUMNAS_BOLETO):
+        columna = orden[:, paso:paso + 1]
+        k = np.take_along_axis(cantidades, columna, axis=1)
+        filas = np.argsort(-(necesidad + rng.random(necesidad.shape) * 0.5), axis=1)
+        elegidas = np.arange(FILAS_BOLETO) < k
+        marcas[boletos, filas, columna] = elegidas
+        necesidad[boletos, filas] -= elegidas
+    return marcas
+
+def generar_tiras(cantidad, rng=None):
+    """
+    Genera `cantidad` tiras de 6 boletos de 90 bolas.
+    Devuelve un arreglo uint8 (cantidad, 6, 3, 9) indexado como
+    [tira, boleto, fila, columna], con 0 en las celdas vacías.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if cantidad == 0:
+        return np.zeros((0, BOLETOS_POR_TIRA, FILAS_BOLETO, COLUMNAS_BOLETO), dtype=np.uint8)
+
+    with etapa('generacion_tiras'):
+        cantidades = _cantidades_por_columna(rng, cantidad)
+        marcas = _marcas_boletos(rng, cantidades.reshape(-1, COLUMNAS_BOLETO))
+        marcas = marcas.reshape(cantidad, BOLETOS_POR_TIRA, FILAS_BOLETO, COLUMNAS_BOLETO)
+
+        # Números de cada columna ordenados por (boleto, valor): se barajan, se
+        # etiquetan con el boleto que los recibe y se ordenan por esa clave.
+        acumuladas = cantidades.cumsum(axis=1)
+        valores = []
+        for c, tamano in enumerate(_TAMANOS.tolist()):
+            barajados = rng.random((cantidad, tamano)).argsort(axis=1) + _MINIMOS[c]
+            boleto = (np.arange(tamano)[None, :, None] >= acumuladas[:, None, :, c]).sum(axis=2)
+            valores.append(np.sort(boleto * 128 + barajados, axis=1) % 128)
+        valores = np.concatenate(valores, axis=1)
+
+        # Las celdas marcadas, recorridas por (columna, boleto, fila), quedan en el
+        # mismo orden que los valores: se llenan con una sola asignación.
+        por_columna = marcas.transpose(0, 3, 1, 2).reshape(cantidad, -1)
+        tiras = np.zeros(por_columna.shape, dtype=np.uint8)
+        tiras[por_columna] = valores.reshape(-1)
+        tiras = tiras.reshape(cantidad, COLUMNAS_BOLETO, BOLETOS_POR_TIRA, FILAS_BOLETO).transpose(0, 2, 3, 1)
+    contar('tiras_generadas', cantidad)
+    return np.ascontiguousarray(tiras)
+
+def tira_valida(tira):
+    """True si la tira (6, 3, 9) cumple todas las reglas del bingo de 90 bolas."""
+    tira = np.asarray(tira)
+    if tira.shape != (BOLETOS_POR_TIRA, FILAS_BOLETO, COLUMNAS_BOLETO):
+        return False
+    if sorted(tira[tira > 0].tolist()) != list(range(1, 91)):
+        return False
+    marcas = tira > 0
+    if not (marcas.sum(axis=2) == NUMEROS_POR_FILA).all():
+        return False
+    por_columna = marcas.sum(axis=1)
+    if not ((por_columna >= 1) & (por_columna <= 3)).all():
+        return False
+    for c, (minimo, maximo) in enumerate(RANGOS_90):
+        for boleto in tira[:, :, c]:
+            numeros = boleto[boleto > 0].tolist()
+            if numeros != sorted(numeros) or not all(minimo <= numero <= maximo for numero in numeros):
+                return False
+    return True
+
+def formatear_boleto(boleto):
+    """Da formato de tabla a un boleto de 3x9 (las celdas vacías quedan en blanco)."""
+    return '\n'.join(' '.join(f'{numero:>2}' if numero else '  ' for numero in fila) for fila in boleto.tolist())
@@ -0,0 +1,147 @@
+import numpy as np
+
+from generar_numeros_carton import RANGOS_BINGO
+
+# Cada celda del cartón es un bit: celda = fila * 5 + columna (bit 12 = centro libre).
+CELDA_LIBRE = 1 << 12
+
+def mascara_celdas(celdas):
+    """Máscara de bits para una lista de celdas (fila, columna)."""
+    mascara = 0
+    for fila, columna in celdas:
+        mascara |= 1 << (fila * 5 + columna)
+    return mascara
+
+_FILAS = [mascara_celdas([(f, c) for c in range(5)]) for f in range(5)]
+_COLUMNAS = [mascara_celdas([(f, c) for f in range(5)]) for c in range(5)]
+_DIAGONALES = [mascara_celdas([(i, i) for i in range(5)]), mascara_celdas([(i, 4 - i) for i in range(5)])]
+
+# Patrones ganadores: cada uno es una lista de máscaras; basta completar una.
+PATRONES = {
+    'linea': _FILAS + _COLUMNAS + _DIAGONALES,
+    'diagonal': _DIAGONALES,
+    'cuatro_esquinas': [mascara_celdas([(0, 0), (0, 4), (4, 0), (4, 4)])],
+    'carton_lleno': [(1 << 25) - 1],
+}
+
+def patrones_completos(marcadas, patrones=PATRONES):
+    """
+    Patrones que completa una máscara de celdas marcadas: dict nombre -> máscaras
+    completas, solo con los patrones que tienen alguna. `patrones` es como en
+    MotorVerificacion.
+    """
+    if not isinstance(patrones, dict):
+        patrones = {nombre: PATRONES[nombre] for nombre in patrones}
+    completos = {}
+    for nombre, mascaras in patrones.items():
+        ganadoras = [mascara for mascara in mascaras if marcadas & mascara == mascara]
+        if ganadoras:
+            completos[nombre] = ganadoras
+    return completos
+
+
+class MotorVerificacion:
+    """
+    Verifica en vivo qué cartones completan un patrón a medida que se cantan los números.
+
+    Mantiene un índice invertido número -> (cartón, celda) en formato CSR y el estado
+    de cada cartón como máscara de bits; al cantar un número solo se actualizan y
+    revisan los cartones que lo tienen (un tercio de ellos, en promedio).
+    """
+
+    def __init__(self, cartones, patrones=('linea', 'cuatro_esquinas', 'carton_lleno')):
+        """
+        `cartones` es un arreglo (N, 5, 5) como el de generar_cartones_lote.
+        `patrones` es una lista de nombres de PATRONES o un dict nombre -> máscaras.
+        """
+        cartones = np.asarray(cartones, dtype=np.uint8)
+        celdas = cartones.reshape(len(cartones), 25)
+        tarjetas, posiciones = np.nonzero(celdas)
+        numeros = celdas[tarjetas, posiciones]
+
+        # Índice invertido ordenado por número y luego por celda
+        orden = np.lexsort((posiciones, numeros))
+        self._tarjetas = tarjetas[orden].astype(np.intp)
+        celdas_orden = posiciones[orden]
+        self._bits = (np.uint32(1) << celdas_orden.astype(np.uint32)).astype(np.uint32)
+        self._inicio = np.zeros(77, dtype=np.int64)
+        np.cumsum(np.bincount(numeros, minlength=76)[:76], out=self._inicio[1:])
+
+        if not isinstance(patrones, dict):
+            patrones = {nombre: PATRONES[nombre] for nombre in patrones}
+        self.patrones = {nombre: list(mascaras) for nombre, mascaras in patrones.items()}
+
+        # Para cada celda, las máscaras de cada patrón que pasan por ella: al
+        # marcar una celda solo esas pueden completarse.
+        por_celda = [
+            [(nombre, [np.uint32(m) for m in mascaras if m >> celda & 1]) for nombre, mascaras in self.patrones.items()]
+            for celda in range(25)
+        ]
+
+        # Grupos precalculados por número: tramos del índice (relativos al inicio
+        # del número) que marcan la misma celda, con sus máscaras a revisar.
+        self._grupos = [[] for _ in range(76)]
+        for numero in range(1, 76):
+            inicio, fin = self._inicio[numero], self._inicio[numero + 1]
+            celdas = celdas_orden[inicio:fin]
+            cortes = np.flatnonzero(np.diff(celdas)) + 1
+            for a, b in zip(np.r_[0, cortes], np.r_[cortes, len(celdas)]):
+                if b > a:
+                    self._grupos[numero].append((int(a), int(b), por_celda[celdas[a]]))
+
+        self.cantidad_cartones = len(cartones)
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Vuelve al inicio de un juego: solo el centro libre marcado."""
+        self._estado = np.full(self.cantidad_cartones, CELDA_LIBRE, dtype=np.uint32)
+        self._gano = {nombre: np.zeros(self.cantidad_cartones, dtype=bool) for nombre in self.patrones}
+        self.cantados = []
+
+    def cantar(self, numero):
+        """
+        Marca `numero` en todos los cartones que lo tienen.
+        Devuelve un dict patrón -> arreglo con los índices de los cartones que
+        completaron ese patrón con este número (vacío si no hay nuevos ganadores).
+        """
+        min_val, max_val = RANGOS_BINGO['B'][0], RANGOS_BINGO['O'][1]
+        if not min_val <= numero <= max_val:
+            raise ValueError(f"Número fuera de rango: {numero}")
+        nuevos = {nombre: np.empty(0, dtype=np.intp) for nombre in self.patrones}
+        if numero in self.cantados:
+            return nuevos
+        self.cantados.append(numero)
+
+        inicio, fin = self._inicio[numero], self._inicio[numero + 1]
+        tarjetas = self._tarjetas[inicio:fin]
+        estado = self._estado[tarjetas] | self._bits[inicio:fin]
+        self._estado[tarjetas] = estado
+
+        completos = {nombre: [] for nombre in self.patrones}
+        for a, b, mascaras_patron in self._grupos[numero]:
+            estado_grupo = estado[a:b]
+            for nombre, mascaras in mascaras_patron:
+                completo = None
+                for mascara in mascaras:
+                    c = (estado_grupo & mascara) == mascara
+                    completo = c if completo is None else completo | c
+                if completo is not None:
+                    completos[nombre].append(tarjetas[a:b][completo])
+
+        for nombre, listas in completos.items():
+            if not listas:
+                continue
+            gano = self._gano[nombre]
+            candidatos = np.concatenate(listas)
+            candidatos = candidatos[~gano[candidatos]]
+            gano[candidatos] = True
+            nuevos[nombre] = candidatos
+        return nuevos
+
+    def ganadores(self, nombre):
+        """Índices de todos los cartones que ya completaron el patrón `nombre`."""
+        return np.flatnonzero(self._gano[nombre])
+
+    def marcadas(self, indice_carton):
+        """Máscara de celdas marcadas de un cartón."""
+        return int(self._estado[indice_carton])